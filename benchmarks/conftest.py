@@ -0,0 +1,55 @@
+import os
+import tracemalloc
+
+import pytest
+
+import generators
+
+SIZES = [int(float(size)) for size in
+         os.environ.get("QUERY_FILTER_BENCH_SIZES", "1e3,1e5").split(",")]
+
+
+@pytest.fixture(scope="session", params=SIZES, ids=lambda n: f"n={n:.0e}")
+def size(request):
+    return request.param
+
+
+@pytest.fixture(scope="session")
+def versions(size):
+    return list(generators.launch_template_versions(size))
+
+
+@pytest.fixture(scope="session")
+def sparse_versions(size):
+    return list(generators.launch_template_versions(size, miss_rate=0.6))
+
+
+@pytest.fixture(scope="session")
+def nodes(size):
+    return list(generators.ancestor_trees(size, depth=8))
+
+
+@pytest.fixture
+def run(benchmark):
+    """Benchmark consuming an iterator, recording throughput and peak memory."""
+
+    def consume(make_iterator, objects):
+        def target():
+            for _ in make_iterator():
+                pass
+
+        tracemalloc.start()
+        target()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        benchmark(target)
+        benchmark.extra_info["items"] = len(objects)
+        # There are no stats when benchmarking is disabled
+        if benchmark.stats is not None:
+            benchmark.extra_info["items_per_second"] = (
+                len(objects) / benchmark.stats.stats.mean
+            )
+        benchmark.extra_info["peak_memory_bytes"] = peak
+
+    return consume
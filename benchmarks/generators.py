@@ -0,0 +1,80 @@
+"""Synthetic data for the benchmarks.
+
+The generators are deterministic for a given seed so that runs can be
+compared with one another.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Iterator
+
+EPOCH = datetime(2017, 11, 20)
+CPU_CREDITS = ("standard", "unlimited")
+GROUPS = tuple(f"sg-{i:08x}" for i in range(64))
+SUBNETS = tuple(f"subnet-{i:08x}" for i in range(256))
+
+
+def launch_template_versions(n: int, miss_rate: float = 0.0,
+                             seed: int = 0) -> Iterator[dict]:
+    """Yield boto3-like launch template versions.
+
+    A ``miss_rate`` fraction of versions lack ``NetworkInterfaces``,
+    ``CreditSpecification`` and ``AssociatePublicIpAddress``.
+    """
+    rng = random.Random(seed)
+    for number in range(n):
+        missing = rng.random() < miss_rate
+        interface = {
+            "DeviceIndex": 0,
+            "Groups": rng.sample(GROUPS, 2),
+            "SubnetId": rng.choice(SUBNETS),
+            "PrivateIpAddress": (
+                f"80.141.{rng.randrange(256)}.{rng.randrange(256)}"
+            ),
+        }
+        version = {
+            "CreateTime": EPOCH + timedelta(seconds=number),
+            "DefaultVersion": number == 0,
+            "LaunchTemplateData": {
+                "ImageId": f"ami-{rng.getrandbits(32):08x}",
+                "KeyName": "kp-us-east",
+            },
+            "CpuOptions": {
+                "CoreCount": rng.randrange(1, 9),
+                "ThreadsPerCore": rng.randrange(1, 3),
+            },
+            "LaunchTemplateId": f"lt-{rng.getrandbits(64):016x}",
+            "VersionNumber": number,
+        }
+        if not missing:
+            interface["AssociatePublicIpAddress"] = rng.random() < 0.5
+            version["LaunchTemplateData"]["NetworkInterfaces"] = [interface]
+            version["CreditSpecification"] = {
+                "CpuCredits": rng.choice(CPU_CREDITS)
+            }
+        yield version
+
+
+class Node:
+    def __init__(self, name, mother=None, father=None):
+        self.name = name
+        self.mother = mother
+        self.father = father
+
+
+def ancestor_trees(n: int, depth: int = 4, seed: int = 0) -> Iterator[Node]:
+    """Yield nodes whose maternal line is ``depth`` generations deep.
+
+    Ancestors are shared between nodes so that memory is dominated by
+    the nodes being filtered.
+    """
+    rng = random.Random(seed)
+    lines = []
+    for line in range(32):
+        node = None
+        for generation in range(depth):
+            node = Node(f"Line {line} generation {generation}", mother=node)
+        lines.append(node)
+
+    for number in range(n):
+        yield Node(f"Node {number}", mother=rng.choice(lines),
+                   father=Node(f"Father {number}") if number % 2 else None)
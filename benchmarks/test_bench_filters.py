@@ -0,0 +1,158 @@
+"""Throughput and peak memory of the filter hot paths.
+
+Run with ``pytest benchmarks``. Set ``QUERY_FILTER_BENCH_SIZES`` to a comma
+separated list of collection sizes, e.g. ``1e3,1e5,1e7``.
+"""
+import itertools
+from datetime import datetime
+
+import pytest
+
+from query_filter import (q, q_all, q_any, q_contains, q_distinct, q_filter,
+                          q_filter_any, q_filter_not_any, q_is, q_is_in,
+                          q_is_not, q_matches_regex, q_not)
+from query_filter.pipeline import Pipeline
+from query_filter.select import q_select
+from query_filter.text import q_fuzzy, q_icontains, q_startswith
+
+INTERFACE = q["LaunchTemplateData"]["NetworkInterfaces"][0]
+CUTOFF = datetime(2017, 11, 20, 0, 5)
+
+OPERATORS = {
+    "lt": q["CpuOptions"]["CoreCount"] < 4,
+    "le": q["CpuOptions"]["CoreCount"] <= 4,
+    "eq": q["CreditSpecification"]["CpuCredits"] == "unlimited",
+    "ne": q["CreditSpecification"]["CpuCredits"] != "unlimited",
+    "gt": q["CreateTime"] > CUTOFF,
+    "ge": q["CreateTime"] >= CUTOFF,
+    "truthy": INTERFACE["AssociatePublicIpAddress"],
+    "invert": ~INTERFACE["AssociatePublicIpAddress"],
+    "is": q_is(q["DefaultVersion"], True),
+    "is_not": q_is_not(q["DefaultVersion"], True),
+    "contains": q_contains(INTERFACE["Groups"], "sg-00000007"),
+    "is_in": q_is_in(INTERFACE["SubnetId"],
+                     {"subnet-00000001", "subnet-00000002"}),
+    "regex": q_matches_regex(INTERFACE["PrivateIpAddress"], r"\.1[0-9]{2}$"),
+}
+
+
+@pytest.mark.parametrize("name", OPERATORS)
+def test_operator(run, versions, name):
+    run(lambda: q_filter(versions, OPERATORS[name]), versions)
+
+
+@pytest.mark.parametrize("name", ["eq", "truthy", "is_in", "regex"])
+def test_operator_high_miss_rate(run, sparse_versions, name):
+    run(lambda: q_filter(sparse_versions, OPERATORS[name]), sparse_versions)
+
+
+def test_custom_predicate(run, versions):
+    def threads_gte(version):
+        cpu = version["CpuOptions"]
+        return cpu["CoreCount"] * cpu["ThreadsPerCore"] >= 8
+
+    run(lambda: q_filter(versions, threads_gte), versions)
+
+
+@pytest.mark.parametrize("width", [10, 10_000])
+def test_wide_is_in_set(run, versions, width):
+    subnets = {f"subnet-{i:08x}" for i in range(0, width * 2, 2)}
+    pred = q_is_in(INTERFACE["SubnetId"], subnets)
+
+    run(lambda: q_filter(versions, pred), versions)
+
+
+def test_wide_is_in_list(run, versions):
+    subnets = [f"subnet-{i:08x}" for i in range(0, 1_000, 2)]
+    pred = q_is_in(INTERFACE["SubnetId"], subnets)
+
+    run(lambda: q_filter(versions, pred), versions)
+
+
+@pytest.mark.parametrize("width", [10, 1_000])
+def test_many_terms(run, versions, width):
+    image_ids = [f"AMI-{i:08X}" for i in range(width)]
+    preds = [
+        q_startswith(q["LaunchTemplateData"]["ImageId"],
+                     [image_id[:9] for image_id in image_ids]),
+        q_icontains(q["LaunchTemplateData"]["ImageId"], image_ids),
+        q_fuzzy(q["LaunchTemplateData"]["ImageId"],
+                [image_id.lower() for image_id in image_ids]),
+    ]
+
+    run(lambda: q_filter_any(versions, *preds), versions)
+
+
+def test_deep_attribute_path(run, nodes):
+    pred = q.mother.mother.mother.mother.mother.mother.mother.name == "x"
+
+    run(lambda: q_filter(nodes, pred), nodes)
+
+
+def test_deep_attribute_path_missing(run, nodes):
+    pred = q_contains(q.father.mother.mother.name, "Line")
+
+    run(lambda: q_filter(nodes, pred), nodes)
+
+
+def test_filter_all_composed(run, versions):
+    preds = (
+        q["CreditSpecification"]["CpuCredits"] == "standard",
+        q["CpuOptions"]["CoreCount"] >= 2,
+        q_contains(INTERFACE["Groups"], "sg-00000007"),
+    )
+
+    run(lambda: q_filter(versions, *preds), versions)
+
+
+def test_filter_any_composed(run, versions):
+    preds = (
+        q["CreditSpecification"]["CpuCredits"] == "unlimited",
+        q["CpuOptions"]["CoreCount"] >= 6,
+        INTERFACE["AssociatePublicIpAddress"],
+    )
+
+    run(lambda: q_filter_any(versions, *preds), versions)
+
+
+def test_filter_not_any_composed(run, versions):
+    preds = (
+        q["CreditSpecification"]["CpuCredits"] == "unlimited",
+        q["CpuOptions"]["CoreCount"] >= 6,
+    )
+
+    run(lambda: q_filter_not_any(versions, *preds), versions)
+
+
+def test_nested_combinators(run, versions):
+    pred = q_any(
+        q_all(q["CpuOptions"]["CoreCount"] >= 4,
+              q["CreditSpecification"]["CpuCredits"] == "unlimited"),
+        q_not(q_is_in(INTERFACE["SubnetId"], {"subnet-00000001"})),
+    )
+
+    run(lambda: q_filter(versions, pred), versions)
+
+
+PIPELINE_FIELDS = {"id": q["LaunchTemplateId"], "subnet": INTERFACE["SubnetId"]}
+
+
+def test_chained_stages(run, versions):
+    def chained():
+        matches = q_filter(versions, q["CpuOptions"]["CoreCount"] >= 4,
+                           q["DefaultVersion"])
+        rows = q_select(matches, PIPELINE_FIELDS)
+        distinct = q_distinct(rows, q["subnet"])
+        return itertools.islice(distinct, len(versions))
+
+    run(chained, versions)
+
+
+def test_pipeline_stages(run, versions):
+    pipeline = (Pipeline(versions)
+                .where(q["CpuOptions"]["CoreCount"] >= 4, q["DefaultVersion"])
+                .select(PIPELINE_FIELDS)
+                .distinct(q["subnet"])
+                .limit(len(versions)))
+
+    run(lambda: iter(pipeline), versions)
@@ -0,0 +1,16 @@
+"""Time taken to import the package in a fresh interpreter."""
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.mark.parametrize("statement", [
+    "import query_filter",
+    "from query_filter import q, q_filter",
+    "from query_filter import q_select, q_sort",
+])
+def test_import(benchmark, statement):
+    command = [sys.executable, "-c", statement]
+    benchmark.pedantic(subprocess.run, args=(command,), kwargs={"check": True},
+                       rounds=10)
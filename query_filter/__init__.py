@@ -1,9 +1,45 @@
-from query_filter.filter import (q_all, q_any, q_filter,  # noqa: F401
-                                 q_filter_all, q_filter_any, q_filter_not_any,
-                                 q_not)
+import importlib
+
+from query_filter.filter import (q_all, q_any, q_distinct,  # noqa: F401
+                                 q_filter, q_filter_all, q_filter_any,
+                                 q_filter_not_any, q_first, q_missing, q_not,
+                                 q_top_k)
 from query_filter.query import (Query, q_contains, q_is, q_is_in,  # noqa: F401
                                 q_is_not, q_matches_regex)
 
 q = Query()
 
 __all__ = ("q", "q_filter")
+
+# Loaded on first use, to keep importing the package for q and q_filter fast
+_LAZY = {
+    "q_count": "query_filter.aggregate",
+    "q_group_by": "query_filter.aggregate",
+    "q_max": "query_filter.aggregate",
+    "q_min": "query_filter.aggregate",
+    "q_sum": "query_filter.aggregate",
+    "q_filter_auto": "query_filter.planner",
+    "q_fuzzy": "query_filter.text",
+    "q_icontains": "query_filter.text",
+    "q_join": "query_filter.join",
+    "Pipeline": "query_filter.pipeline",
+    "q_partition": "query_filter.partition",
+    "q_partition_by": "query_filter.partition",
+    "q_select": "query_filter.select",
+    "q_merge": "query_filter.sort",
+    "q_sort": "query_filter.sort",
+    "q_startswith": "query_filter.text",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_LAZY})
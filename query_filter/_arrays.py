@@ -0,0 +1,25 @@
+from typing import Optional
+
+from query_filter.query import MISSING
+
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+# Larger integers can't be converted to floats without losing precision
+_FLOAT_INT_LIMIT = 2 ** 53
+
+
+def numeric_typecode(values: list) -> Optional[str]:
+    """Return the ``array`` typecode that can hold ``values``, if any.
+
+    MISSING values are ignored. Integers are stored as int64, unless mixed
+    with floats, in which case all are stored as float64.
+    """
+    present = [value for value in values if value is not MISSING]
+    if all(type(value) is int for value in present):
+        if all(_INT64_MIN <= value <= _INT64_MAX for value in present):
+            return "q"
+    elif all(type(value) in (int, float) for value in present):
+        if all(type(value) is float or abs(value) <= _FLOAT_INT_LIMIT
+               for value in present):
+            return "d"
+    return None
@@ -0,0 +1,839 @@
+/*
+ * Optional C implementation of the lookup walk, query predicates and the
+ * loops combining predicates.
+ *
+ * query_filter.query imports this module when it has been built and falls
+ * back to the pure Python implementation otherwise. Behaviour must match
+ * query_filter.query._py_retrieve_value, _py_lookup_value, _py_predicate
+ * and _py_combined exactly.
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <structmember.h>
+
+#define STEP_ATTR 0
+#define STEP_ITEM 1
+#define STEP_BROKEN 2
+#define STEP_INVALID 3
+
+#define FAST_NONE -1
+#define FAST_IS 6
+#define FAST_IS_NOT 7
+#define FAST_CONTAINS 8
+
+static PyObject *attr_type = NULL;
+static PyObject *item_type = NULL;
+static PyObject *not_found = NULL;
+static PyObject *missing = NULL;
+static PyObject *unknown = NULL;
+static PyObject *missing_errors = NULL;
+static PyObject *str_lookup_type = NULL;
+static PyObject *str_key = NULL;
+
+/* operator functions with a dedicated fast path, indexed by op code */
+static PyObject *fast_funcs[9];
+
+static int
+clear_missing_error(void)
+{
+    if (PyErr_ExceptionMatches(missing_errors)) {
+        PyErr_Clear();
+        return 1;
+    }
+    return 0;
+}
+
+#if PY_VERSION_HEX >= 0x030D0000
+#define lookup_attr PyObject_GetOptionalAttr
+#else
+#define lookup_attr _PyObject_LookupAttr
+#endif
+
+/*
+ * Look up a single attribute or item. Returns 1 and sets *result to a new
+ * reference if the value was found, 0 if it is missing and -1 with an
+ * exception set on any other error. Common containers are handled without
+ * raising and catching an exception on a miss.
+ */
+static int
+step(PyObject *value, int kind, PyObject *key, PyObject **result)
+{
+    if (kind == STEP_ATTR) {
+        int found;
+
+        if (!PyUnicode_Check(key)) {
+            return 0;
+        }
+        found = lookup_attr(value, key, result);
+        if (found < 0 && clear_missing_error()) {
+            return 0;
+        }
+        return found;
+    }
+    if (PyDict_CheckExact(value)) {
+        PyObject *item = PyDict_GetItemWithError(value, key);
+
+        if (item == NULL) {
+            if (PyErr_Occurred()) {
+                return clear_missing_error() ? 0 : -1;
+            }
+            return 0;
+        }
+        Py_INCREF(item);
+        *result = item;
+        return 1;
+    }
+    if ((PyList_CheckExact(value) || PyTuple_CheckExact(value)) &&
+        PyLong_CheckExact(key)) {
+        Py_ssize_t size = PySequence_Fast_GET_SIZE(value);
+        Py_ssize_t index = PyLong_AsSsize_t(key);
+
+        if (index == -1 && PyErr_Occurred()) {
+            return clear_missing_error() ? 0 : -1;
+        }
+        if (index < 0) {
+            index += size;
+        }
+        if (index < 0 || index >= size) {
+            return 0;
+        }
+        *result = PySequence_Fast_GET_ITEM(value, index);
+        Py_INCREF(*result);
+        return 1;
+    }
+    *result = PyObject_GetItem(value, key);
+    if (*result == NULL) {
+        return clear_missing_error() ? 0 : -1;
+    }
+    return 1;
+}
+
+/*
+ * Resolve the kind and key of a single lookup. Returns 0 on success,
+ * -1 with an exception set on failure.
+ */
+static int
+resolve_lookup(PyObject *lookup, int *kind, PyObject **key)
+{
+    PyObject *lookup_type = PyObject_GetAttr(lookup, str_lookup_type);
+    if (lookup_type == NULL) {
+        return -1;
+    }
+    if (lookup_type == attr_type) {
+        *kind = STEP_ATTR;
+    }
+    else if (lookup_type == item_type) {
+        *kind = STEP_ITEM;
+    }
+    else {
+        PyErr_Format(PyExc_ValueError, "%S is not a valid lookup type",
+                     lookup_type);
+        Py_DECREF(lookup_type);
+        return -1;
+    }
+    Py_DECREF(lookup_type);
+    *key = PyObject_GetAttr(lookup, str_key);
+    return *key == NULL ? -1 : 0;
+}
+
+/*
+ * Walk the lookups from obj. Returns 1 with a new reference in *result,
+ * 0 if a value along the way is missing and -1 with an exception set.
+ */
+static int
+walk(PyObject *obj, PyObject *const *lookups, Py_ssize_t n,
+     PyObject **result)
+{
+    Py_ssize_t i;
+    PyObject *value = obj;
+
+    Py_INCREF(value);
+    for (i = 0; i < n; i++) {
+        int kind, found;
+        PyObject *key, *next;
+
+        if (resolve_lookup(lookups[i], &kind, &key) < 0) {
+            Py_DECREF(value);
+            return clear_missing_error() ? 0 : -1;
+        }
+        found = step(value, kind, key, &next);
+        Py_DECREF(key);
+        Py_DECREF(value);
+        if (found <= 0) {
+            return found;
+        }
+        value = next;
+    }
+    *result = value;
+    return 1;
+}
+
+static int
+check_setup(void)
+{
+    if (not_found == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "_speedups.setup() not called");
+        return -1;
+    }
+    return 0;
+}
+
+static PyObject *
+retrieve_value(PyObject *self, PyObject *args)
+{
+    PyObject *value;
+    int found;
+
+    if (check_setup() < 0) {
+        return NULL;
+    }
+    if (PyTuple_GET_SIZE(args) < 1) {
+        PyErr_SetString(PyExc_TypeError,
+                        "retrieve_value() missing required argument 'obj'");
+        return NULL;
+    }
+    found = walk(PyTuple_GET_ITEM(args, 0), &PyTuple_GET_ITEM(args, 1),
+                 PyTuple_GET_SIZE(args) - 1, &value);
+    if (found == 0) {
+        PyErr_SetNone(not_found);
+    }
+    return found > 0 ? value : NULL;
+}
+
+static PyObject *
+lookup_value(PyObject *self, PyObject *args)
+{
+    PyObject *obj, *lookups, *seq, *value;
+    int found;
+
+    if (check_setup() < 0) {
+        return NULL;
+    }
+    if (!PyArg_ParseTuple(args, "OO:lookup_value", &obj, &lookups)) {
+        return NULL;
+    }
+    seq = PySequence_Fast(lookups, "lookups must be iterable");
+    if (seq == NULL) {
+        return NULL;
+    }
+    found = walk(obj, PySequence_Fast_ITEMS(seq), PySequence_Fast_GET_SIZE(seq),
+                 &value);
+    Py_DECREF(seq);
+    if (found == 0) {
+        Py_INCREF(missing);
+        return missing;
+    }
+    return found > 0 ? value : NULL;
+}
+
+typedef struct {
+    PyObject_HEAD
+    PyObject *func;
+    PyObject *lookups;
+    PyObject *criteria;
+    PyObject *missing;
+    /* Returned when a value is missing, or NULL to raise ObjNotFound */
+    PyObject *missing_result;
+    PyObject *keys;
+    char *kinds;
+    PyObject *invalid;
+    Py_ssize_t nsteps;
+    int op;
+    vectorcallfunc vectorcall;
+} PredicateObject;
+
+static PyObject *
+predicate_call_value(PredicateObject *self, PyObject *value)
+{
+    Py_ssize_t ncriteria = PyTuple_GET_SIZE(self->criteria);
+    PyObject *criterion;
+    int result;
+
+    if (self->op != FAST_NONE && ncriteria == 1) {
+        criterion = PyTuple_GET_ITEM(self->criteria, 0);
+        switch (self->op) {
+        case FAST_IS:
+            return PyBool_FromLong(value == criterion);
+        case FAST_IS_NOT:
+            return PyBool_FromLong(value != criterion);
+        case FAST_CONTAINS:
+            result = PySequence_Contains(value, criterion);
+            if (result < 0) {
+                return NULL;
+            }
+            return PyBool_FromLong(result);
+        default:
+            return PyObject_RichCompare(value, criterion, self->op);
+        }
+    }
+    else {
+        PyObject *small[8];
+        PyObject **args = small;
+        PyObject *res;
+        Py_ssize_t i;
+
+        if (ncriteria + 1 > 8) {
+            args = PyMem_Malloc((ncriteria + 1) * sizeof(PyObject *));
+            if (args == NULL) {
+                return PyErr_NoMemory();
+            }
+        }
+        args[0] = value;
+        for (i = 0; i < ncriteria; i++) {
+            args[i + 1] = PyTuple_GET_ITEM(self->criteria, i);
+        }
+        res = PyObject_Vectorcall(self->func, args, ncriteria + 1, NULL);
+        if (args != small) {
+            PyMem_Free(args);
+        }
+        return res;
+    }
+}
+
+static PyObject *
+predicate_missing(PredicateObject *self)
+{
+    PyObject *exc;
+
+    if (self->missing_result != NULL) {
+        Py_INCREF(self->missing_result);
+        return self->missing_result;
+    }
+    exc = PyObject_CallOneArg(not_found, self->lookups);
+    if (exc != NULL) {
+        PyErr_SetObject(not_found, exc);
+        Py_DECREF(exc);
+    }
+    return NULL;
+}
+
+static PyObject *
+predicate_evaluate(PredicateObject *self, PyObject *obj)
+{
+    Py_ssize_t i;
+    PyObject *value = obj, *next, *result;
+
+    Py_INCREF(value);
+    for (i = 0; i < self->nsteps; i++) {
+        int kind = self->kinds[i], found;
+
+        if (kind == STEP_BROKEN) {
+            Py_DECREF(value);
+            return predicate_missing(self);
+        }
+        if (kind == STEP_INVALID) {
+            Py_DECREF(value);
+            PyErr_Format(PyExc_ValueError, "%S is not a valid lookup type",
+                         self->invalid);
+            return NULL;
+        }
+        found = step(value, kind, PyTuple_GET_ITEM(self->keys, i), &next);
+        Py_DECREF(value);
+        if (found <= 0) {
+            if (found == 0) {
+                return predicate_missing(self);
+            }
+            return NULL;
+        }
+        value = next;
+    }
+    result = predicate_call_value(self, value);
+    Py_DECREF(value);
+    return result;
+}
+
+static PyObject *
+predicate_vectorcall(PyObject *self, PyObject *const *args, size_t nargsf,
+                     PyObject *kwnames)
+{
+    if (PyVectorcall_NARGS(nargsf) != 1 ||
+        (kwnames != NULL && PyTuple_GET_SIZE(kwnames) != 0)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "predicate takes exactly one positional argument");
+        return NULL;
+    }
+    return predicate_evaluate((PredicateObject *)self, args[0]);
+}
+
+/*
+ * Map a missing value policy to the result returned for missing values.
+ * Returns 0 and sets *result, which is NULL for "raise", or -1 with an
+ * exception set if the policy is invalid.
+ */
+static int
+missing_result(PyObject *policy, PyObject **result)
+{
+    if (policy == Py_None) {
+        *result = Py_False;
+        return 0;
+    }
+    if (PyUnicode_Check(policy)) {
+        if (PyUnicode_CompareWithASCIIString(policy, "false") == 0) {
+            *result = Py_False;
+            return 0;
+        }
+        if (PyUnicode_CompareWithASCIIString(policy, "true") == 0) {
+            *result = Py_True;
+            return 0;
+        }
+        if (PyUnicode_CompareWithASCIIString(policy, "raise") == 0) {
+            *result = NULL;
+            return 0;
+        }
+        if (PyUnicode_CompareWithASCIIString(policy, "skip") == 0 &&
+            unknown != NULL) {
+            *result = unknown;
+            return 0;
+        }
+    }
+    PyErr_Format(PyExc_ValueError,
+                 "missing must be one of ('false', 'true', 'raise', 'skip'), "
+                 "not %R", policy);
+    return -1;
+}
+
+static PyObject *
+predicate_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"func", "lookups", "criteria", "missing", NULL};
+    PyObject *func, *lookups, *criteria, *policy = Py_None, *result;
+    PredicateObject *self;
+    Py_ssize_t i;
+
+    if (check_setup() < 0) {
+        return NULL;
+    }
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO!O!|O:Predicate", kwlist,
+                                     &func, &PyTuple_Type, &lookups,
+                                     &PyTuple_Type, &criteria, &policy)) {
+        return NULL;
+    }
+    if (missing_result(policy, &result) < 0) {
+        return NULL;
+    }
+    self = (PredicateObject *)type->tp_alloc(type, 0);
+    if (self == NULL) {
+        return NULL;
+    }
+    Py_INCREF(func);
+    self->func = func;
+    Py_INCREF(lookups);
+    self->lookups = lookups;
+    Py_INCREF(criteria);
+    self->criteria = criteria;
+    Py_INCREF(policy);
+    self->missing = policy;
+    Py_XINCREF(result);
+    self->missing_result = result;
+    self->vectorcall = predicate_vectorcall;
+    self->op = FAST_NONE;
+    for (i = 0; i < 9; i++) {
+        if (fast_funcs[i] == func) {
+            self->op = (int)i;
+            break;
+        }
+    }
+
+    self->nsteps = PyTuple_GET_SIZE(lookups);
+    self->keys = PyTuple_New(self->nsteps);
+    self->kinds = PyMem_Malloc(self->nsteps ? self->nsteps : 1);
+    if (self->keys == NULL || self->kinds == NULL) {
+        Py_DECREF(self);
+        return PyErr_NoMemory();
+    }
+    /*
+     * Lookups are resolved once here. Lookups that would fail at call time
+     * are recorded as such, so that errors surface in the same order as
+     * they would when walking the lookups one by one.
+     */
+    for (i = 0; i < self->nsteps; i++) {
+        int kind;
+        PyObject *key = NULL;
+
+        if (resolve_lookup(PyTuple_GET_ITEM(lookups, i), &kind, &key) < 0) {
+            if (PyErr_ExceptionMatches(PyExc_ValueError)) {
+                PyObject *lookup = PyTuple_GET_ITEM(lookups, i);
+                PyErr_Clear();
+                kind = STEP_INVALID;
+                self->invalid = PyObject_GetAttr(lookup, str_lookup_type);
+                if (self->invalid == NULL) {
+                    Py_DECREF(self);
+                    return NULL;
+                }
+            }
+            else if (clear_missing_error()) {
+                kind = STEP_BROKEN;
+            }
+            else {
+                Py_DECREF(self);
+                return NULL;
+            }
+            Py_INCREF(Py_None);
+            key = Py_None;
+        }
+        self->kinds[i] = (char)kind;
+        PyTuple_SET_ITEM(self->keys, i, key);
+        if (kind == STEP_BROKEN || kind == STEP_INVALID) {
+            self->nsteps = i + 1;
+            for (i = i + 1; i < PyTuple_GET_SIZE(lookups); i++) {
+                Py_INCREF(Py_None);
+                PyTuple_SET_ITEM(self->keys, i, Py_None);
+            }
+            break;
+        }
+    }
+    return (PyObject *)self;
+}
+
+static PyObject *
+predicate_call(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    if (PyTuple_GET_SIZE(args) != 1 || (kwds && PyDict_GET_SIZE(kwds))) {
+        PyErr_SetString(PyExc_TypeError,
+                        "predicate takes exactly one positional argument");
+        return NULL;
+    }
+    return predicate_evaluate((PredicateObject *)self,
+                              PyTuple_GET_ITEM(args, 0));
+}
+
+static int
+predicate_traverse(PredicateObject *self, visitproc visit, void *arg)
+{
+    Py_VISIT(self->func);
+    Py_VISIT(self->lookups);
+    Py_VISIT(self->criteria);
+    Py_VISIT(self->missing);
+    Py_VISIT(self->missing_result);
+    Py_VISIT(self->keys);
+    Py_VISIT(self->invalid);
+    return 0;
+}
+
+static int
+predicate_clear(PredicateObject *self)
+{
+    Py_CLEAR(self->func);
+    Py_CLEAR(self->lookups);
+    Py_CLEAR(self->criteria);
+    Py_CLEAR(self->missing);
+    Py_CLEAR(self->missing_result);
+    Py_CLEAR(self->keys);
+    Py_CLEAR(self->invalid);
+    return 0;
+}
+
+static void
+predicate_dealloc(PredicateObject *self)
+{
+    PyObject_GC_UnTrack(self);
+    predicate_clear(self);
+    PyMem_Free(self->kinds);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyMemberDef predicate_members[] = {
+    {"func", T_OBJECT, offsetof(PredicateObject, func), READONLY, NULL},
+    {"lookups", T_OBJECT, offsetof(PredicateObject, lookups), READONLY, NULL},
+    {"criteria", T_OBJECT, offsetof(PredicateObject, criteria), READONLY,
+     NULL},
+    {"missing", T_OBJECT, offsetof(PredicateObject, missing), READONLY, NULL},
+    {NULL}
+};
+
+static PyTypeObject PredicateType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "query_filter._speedups.Predicate",
+    .tp_basicsize = sizeof(PredicateObject),
+    .tp_dealloc = (destructor)predicate_dealloc,
+    .tp_vectorcall_offset = offsetof(PredicateObject, vectorcall),
+    .tp_call = predicate_call,
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC |
+                Py_TPFLAGS_HAVE_VECTORCALL,
+    .tp_traverse = (traverseproc)predicate_traverse,
+    .tp_clear = (inquiry)predicate_clear,
+    .tp_members = predicate_members,
+    .tp_new = predicate_new,
+};
+
+/*
+ * Modes of Combined, matching the _COMBINE_* constants in query_filter.query.
+ * The first three are the predicates of the filter functions, which are
+ * either true or false, and the others are q_all, q_any and q_not.
+ */
+#define COMBINE_EVERY 0
+#define COMBINE_SOME 1
+#define COMBINE_NONE 2
+#define COMBINE_Q_ALL 3
+#define COMBINE_Q_ANY 4
+#define COMBINE_Q_NOT 5
+
+typedef struct {
+    PyObject_HEAD
+    PyObject *preds;
+    PyObject *dict;
+    int mode;
+    vectorcallfunc vectorcall;
+} CombinedObject;
+
+static PyObject *
+combined_evaluate(CombinedObject *self, PyObject *obj)
+{
+    Py_ssize_t i, npreds = PyTuple_GET_SIZE(self->preds);
+    int seen_unknown = 0;
+
+    for (i = 0; i < npreds; i++) {
+        PyObject *result = PyObject_Vectorcall(
+            PyTuple_GET_ITEM(self->preds, i), &obj, 1, NULL);
+        int is_unknown, truth;
+
+        if (result == NULL) {
+            return NULL;
+        }
+        is_unknown = result == unknown;
+        truth = is_unknown ? 0 : PyObject_IsTrue(result);
+        Py_DECREF(result);
+        if (truth < 0) {
+            return NULL;
+        }
+        switch (self->mode) {
+        case COMBINE_EVERY:
+            if (!truth) {
+                Py_RETURN_FALSE;
+            }
+            break;
+        case COMBINE_SOME:
+            if (truth) {
+                Py_RETURN_TRUE;
+            }
+            break;
+        case COMBINE_NONE:
+            /* An unknown result means the object isn't known to match none */
+            if (truth || is_unknown) {
+                Py_RETURN_FALSE;
+            }
+            break;
+        case COMBINE_Q_ALL:
+            if (!truth) {
+                if (!is_unknown) {
+                    Py_RETURN_FALSE;
+                }
+                seen_unknown = 1;
+            }
+            break;
+        case COMBINE_Q_ANY:
+            if (truth) {
+                Py_RETURN_TRUE;
+            }
+            seen_unknown |= is_unknown;
+            break;
+        default:
+            if (is_unknown) {
+                Py_INCREF(unknown);
+                return unknown;
+            }
+            return PyBool_FromLong(!truth);
+        }
+    }
+    if (seen_unknown) {
+        Py_INCREF(unknown);
+        return unknown;
+    }
+    return PyBool_FromLong(self->mode != COMBINE_SOME &&
+                           self->mode != COMBINE_Q_ANY);
+}
+
+static PyObject *
+combined_vectorcall(PyObject *self, PyObject *const *args, size_t nargsf,
+                    PyObject *kwnames)
+{
+    if (PyVectorcall_NARGS(nargsf) != 1 ||
+        (kwnames != NULL && PyTuple_GET_SIZE(kwnames) != 0)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "predicate takes exactly one positional argument");
+        return NULL;
+    }
+    return combined_evaluate((CombinedObject *)self, args[0]);
+}
+
+static PyObject *
+combined_call(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    if (PyTuple_GET_SIZE(args) != 1 || (kwds && PyDict_GET_SIZE(kwds))) {
+        PyErr_SetString(PyExc_TypeError,
+                        "predicate takes exactly one positional argument");
+        return NULL;
+    }
+    return combined_evaluate((CombinedObject *)self,
+                             PyTuple_GET_ITEM(args, 0));
+}
+
+static PyObject *
+combined_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"mode", "preds", NULL};
+    CombinedObject *self;
+    PyObject *preds;
+    int mode;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "iO!:Combined", kwlist,
+                                     &mode, &PyTuple_Type, &preds)) {
+        return NULL;
+    }
+    if (mode < COMBINE_EVERY || mode > COMBINE_Q_NOT) {
+        PyErr_Format(PyExc_ValueError, "%d is not a valid mode", mode);
+        return NULL;
+    }
+    if (mode == COMBINE_Q_NOT && PyTuple_GET_SIZE(preds) != 1) {
+        PyErr_SetString(PyExc_ValueError, "q_not takes exactly one predicate");
+        return NULL;
+    }
+    self = (CombinedObject *)type->tp_alloc(type, 0);
+    if (self == NULL) {
+        return NULL;
+    }
+    Py_INCREF(preds);
+    self->preds = preds;
+    self->mode = mode;
+    self->vectorcall = combined_vectorcall;
+    return (PyObject *)self;
+}
+
+static int
+combined_traverse(CombinedObject *self, visitproc visit, void *arg)
+{
+    Py_VISIT(self->preds);
+    Py_VISIT(self->dict);
+    return 0;
+}
+
+static int
+combined_clear(CombinedObject *self)
+{
+    Py_CLEAR(self->preds);
+    Py_CLEAR(self->dict);
+    return 0;
+}
+
+static void
+combined_dealloc(CombinedObject *self)
+{
+    PyObject_GC_UnTrack(self);
+    combined_clear(self);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyTypeObject CombinedType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "query_filter._speedups.Combined",
+    .tp_basicsize = sizeof(CombinedObject),
+    .tp_dealloc = (destructor)combined_dealloc,
+    .tp_vectorcall_offset = offsetof(CombinedObject, vectorcall),
+    .tp_call = combined_call,
+    .tp_getattro = PyObject_GenericGetAttr,
+    .tp_setattro = PyObject_GenericSetAttr,
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC |
+                Py_TPFLAGS_HAVE_VECTORCALL,
+    .tp_traverse = (traverseproc)combined_traverse,
+    .tp_clear = (inquiry)combined_clear,
+    /* A __dict__ holds attributes such as combinator, as on functions */
+    .tp_dictoffset = offsetof(CombinedObject, dict),
+    .tp_new = combined_new,
+};
+
+static PyObject *
+setup(PyObject *self, PyObject *args)
+{
+    PyObject *attr, *item, *exc, *sentinel, *unknown_sentinel = NULL;
+
+    if (!PyArg_ParseTuple(args, "OOOO|O:setup", &attr, &item, &exc,
+                          &sentinel, &unknown_sentinel)) {
+        return NULL;
+    }
+    Py_XINCREF(unknown_sentinel);
+    Py_XSETREF(unknown, unknown_sentinel);
+    Py_INCREF(attr);
+    Py_XSETREF(attr_type, attr);
+    Py_INCREF(item);
+    Py_XSETREF(item_type, item);
+    Py_INCREF(exc);
+    Py_XSETREF(not_found, exc);
+    Py_INCREF(sentinel);
+    Py_XSETREF(missing, sentinel);
+    Py_RETURN_NONE;
+}
+
+static PyMethodDef speedups_methods[] = {
+    {"setup", setup, METH_VARARGS,
+     "Register the lookup types, ObjNotFound exception, and MISSING and "
+     "UNKNOWN sentinels."},
+    {"retrieve_value", retrieve_value, METH_VARARGS,
+     "C implementation of query_filter.query.retrieve_value."},
+    {"lookup_value", lookup_value, METH_VARARGS,
+     "C implementation of query_filter.query.lookup_value."},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef speedups_module = {
+    PyModuleDef_HEAD_INIT,
+    "query_filter._speedups",
+    NULL,
+    -1,
+    speedups_methods
+};
+
+PyMODINIT_FUNC
+PyInit__speedups(void)
+{
+    static const char *fast_names[] = {
+        "lt", "le", "eq", "ne", "gt", "ge", "is_", "is_not", "contains"
+    };
+    PyObject *module, *operator_module;
+    int i;
+
+    if (PyType_Ready(&PredicateType) < 0 ||
+        PyType_Ready(&CombinedType) < 0) {
+        return NULL;
+    }
+    operator_module = PyImport_ImportModule("operator");
+    if (operator_module == NULL) {
+        return NULL;
+    }
+    /* Indexes 0-5 line up with Py_LT, Py_LE, Py_EQ, Py_NE, Py_GT, Py_GE */
+    for (i = 0; i < 9; i++) {
+        fast_funcs[i] = PyObject_GetAttrString(operator_module, fast_names[i]);
+        if (fast_funcs[i] == NULL) {
+            Py_DECREF(operator_module);
+            return NULL;
+        }
+    }
+    Py_DECREF(operator_module);
+
+    str_lookup_type = PyUnicode_InternFromString("lookup_type");
+    str_key = PyUnicode_InternFromString("key");
+    missing_errors = PyTuple_Pack(4, PyExc_IndexError, PyExc_KeyError,
+                                  PyExc_TypeError, PyExc_AttributeError);
+    if (str_lookup_type == NULL || str_key == NULL || missing_errors == NULL) {
+        return NULL;
+    }
+
+    module = PyModule_Create(&speedups_module);
+    if (module == NULL) {
+        return NULL;
+    }
+    Py_INCREF(&PredicateType);
+    if (PyModule_AddObject(module, "Predicate",
+                           (PyObject *)&PredicateType) < 0) {
+        Py_DECREF(&PredicateType);
+        Py_DECREF(module);
+        return NULL;
+    }
+    Py_INCREF(&CombinedType);
+    if (PyModule_AddObject(module, "Combined",
+                           (PyObject *)&CombinedType) < 0) {
+        Py_DECREF(&CombinedType);
+        Py_DECREF(module);
+        return NULL;
+    }
+    return module;
+}
@@ -0,0 +1,131 @@
+from typing import Any, Hashable, Iterable, Optional, Union
+
+from query_filter.filter import q_filter_all
+from query_filter.query import MISSING, Query, Resolver, lookup_value
+
+
+class Count:
+    """Counts objects, or the objects with a value at ``query`` if given."""
+
+    def __init__(self, query: Optional[Query] = None):
+        self.query = query
+
+    def start(self) -> int:
+        return 0
+
+    def add(self, total: int, value: Any) -> int:
+        return total + 1
+
+    def finish(self, total: int) -> int:
+        return total
+
+
+class Sum:
+    def __init__(self, query: Query, start: Any = 0):
+        self.query = query
+        self._start = start
+
+    def start(self) -> Any:
+        return self._start
+
+    def add(self, total: Any, value: Any) -> Any:
+        return total + value
+
+    def finish(self, total: Any) -> Any:
+        return total
+
+
+class Min:
+    def __init__(self, query: Query, default: Any = None):
+        self.query = query
+        self.default = default
+
+    def start(self) -> Any:
+        return MISSING
+
+    def add(self, current: Any, value: Any) -> Any:
+        if current is MISSING or value < current:
+            return value
+        return current
+
+    def finish(self, current: Any) -> Any:
+        return self.default if current is MISSING else current
+
+
+class Max(Min):
+    def add(self, current: Any, value: Any) -> Any:
+        if current is MISSING or value > current:
+            return value
+        return current
+
+
+Aggregator = Union[Count, Sum, Min, Max]
+
+
+def _paths(aggs: Iterable[Aggregator]) -> list[Query]:
+    return [agg.query if agg.query is not None else Query() for agg in aggs]
+
+
+def _aggregate(objects: Iterable, preds: tuple, agg: Aggregator) -> Any:
+    lookups = () if agg.query is None else tuple(agg.query)
+    total = agg.start()
+    add = agg.add
+    for obj in q_filter_all(objects, *preds):
+        value = lookup_value(obj, lookups)
+        if value is not MISSING:
+            total = add(total, value)
+    return agg.finish(total)
+
+
+def q_count(objects: Iterable, *preds) -> int:
+    return _aggregate(objects, preds, Count())
+
+
+def q_sum(objects: Iterable, query: Query, *preds, start: Any = 0) -> Any:
+    return _aggregate(objects, preds, Sum(query, start=start))
+
+
+def q_min(objects: Iterable, query: Query, *preds, default: Any = None) -> Any:
+    return _aggregate(objects, preds, Min(query, default=default))
+
+
+def q_max(objects: Iterable, query: Query, *preds, default: Any = None) -> Any:
+    return _aggregate(objects, preds, Max(query, default=default))
+
+
+def q_group_by(objects: Iterable, key: Query, *preds,
+               agg: Union[Aggregator, dict[str, Aggregator], None] = None
+               ) -> dict[Hashable, Any]:
+    """Group the objects matching all ``preds`` by the value at ``key``.
+
+    Each group is reduced by ``agg``, which defaults to counting its
+    objects. If ``agg`` is a dictionary of aggregators, each group maps to
+    a dictionary of their results. Objects without a value at ``key`` are
+    left out.
+    """
+    named = isinstance(agg, dict)
+    aggs = list(agg.values()) if named else [Count() if agg is None else agg]
+    resolver = Resolver([key, *_paths(aggs)])
+    starts = [aggregator.start for aggregator in aggs]
+    adds = [aggregator.add for aggregator in aggs]
+    groups = {}
+
+    for obj in q_filter_all(objects, *preds):
+        group, *values = resolver(obj)
+        if group is MISSING:
+            continue
+        totals = groups.get(group)
+        if totals is None:
+            totals = groups[group] = [start() for start in starts]
+        for i, value in enumerate(values):
+            if value is not MISSING:
+                totals[i] = adds[i](totals[i], value)
+
+    if named:
+        return {
+            group: {name: aggregator.finish(total)
+                    for name, aggregator, total in zip(agg, aggs, totals)}
+            for group, totals in groups.items()
+        }
+    (agg,) = aggs
+    return {group: agg.finish(total) for group, (total,) in groups.items()}
@@ -0,0 +1,391 @@
+"""Columnar snapshots of collections in shared memory.
+
+A snapshot stores the values at a set of query paths in a single shared
+memory block: integers and floats as typed arrays with a validity mask, and
+other values as dictionary-encoded codes. Worker processes attach to the
+block by name and evaluate predicates against it without copying, returning
+the positions of matching objects.
+"""
+import dataclasses
+import functools
+import itertools
+import multiprocessing
+import operator
+import pickle
+from array import array
+from multiprocessing import shared_memory
+from typing import Any, Callable, Iterable, Optional
+
+from query_filter._arrays import numeric_typecode
+from query_filter.filter import _ensure_callable
+from query_filter.query import (MISSING, PREDICATE_MAKERS, Lookup,
+                                ObjNotFound, Query, Resolver)
+
+_FUNC_NAMES = {maker.func: name for name, maker in PREDICATE_MAKERS.items()}
+
+_VECTORISED_FUNCS = {
+    operator.lt, operator.le, operator.eq, operator.ne, operator.gt,
+    operator.ge, operator.is_, operator.is_not, operator.truth,
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class ColumnSpec:
+    lookups: tuple[Lookup, ...]
+    kind: str
+    offset: int
+    valid_offset: int = 0
+    dictionary_offset: int = 0
+    dictionary_size: int = 0
+
+
+@dataclasses.dataclass(frozen=True)
+class SnapshotHandle:
+    """A picklable reference to a snapshot, used to attach to it."""
+    name: str
+    length: int
+    columns: tuple[ColumnSpec, ...]
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+
+def _code_typecode(size: int) -> str:
+    if size < 2 ** 8:
+        return "B"
+    if size < 2 ** 16:
+        return "H"
+    return "I"
+
+
+def _encode(values: list) -> tuple[str, list[bytes], Any]:
+    kind = numeric_typecode(values)
+    if kind is not None:
+        placeholder = 0 if kind == "q" else 0.0
+        data = array(kind, (placeholder if value is MISSING else value
+                            for value in values))
+        valid = bytes(value is not MISSING for value in values)
+        return kind, [data.tobytes(), valid], None
+
+    codes = {}
+    dictionary = []
+    for value in values:
+        if value is MISSING:
+            continue
+        # Keyed by type too so that 1, 1.0 and True get separate codes
+        key = (type(value), value)
+        if key not in codes:
+            codes[key] = len(dictionary)
+            dictionary.append(value)
+    missing = len(dictionary)
+    typecode = _code_typecode(missing)
+    data = array(typecode, (missing if value is MISSING
+                            else codes[type(value), value]
+                            for value in values))
+    return typecode, [data.tobytes()], pickle.dumps(dictionary)
+
+
+class _Column:
+    def __init__(self, spec: ColumnSpec, buffer: memoryview, length: int):
+        self.spec = spec
+        self.kind = spec.kind
+        self.dictionary = None
+        self.valid = None
+        size = array(spec.kind).itemsize * length
+        self.values = buffer[spec.offset:spec.offset + size].cast(spec.kind)
+        if spec.kind in ("q", "d"):
+            self.valid = buffer[spec.valid_offset:spec.valid_offset + length]
+        else:
+            end = spec.dictionary_offset + spec.dictionary_size
+            self.dictionary = pickle.loads(buffer[spec.dictionary_offset:end])
+
+    def release(self):
+        self.values.release()
+        if self.valid is not None:
+            self.valid.release()
+
+
+def _and(first: bytes, second: bytes) -> bytes:
+    result = int.from_bytes(first, "little") & int.from_bytes(second, "little")
+    return result.to_bytes(len(first), "little")
+
+
+def _or(first: bytes, second: bytes) -> bytes:
+    result = int.from_bytes(first, "little") | int.from_bytes(second, "little")
+    return result.to_bytes(len(first), "little")
+
+
+def _not(mask: bytes) -> bytes:
+    return mask.translate(bytes([1, 0]) + bytes(254))
+
+
+class ColumnarSnapshot:
+    """Values at a set of paths, stored column by column in shared memory.
+
+    Create a snapshot with ``ColumnarSnapshot.create`` in the process that
+    owns the data and ``ColumnarSnapshot.attach`` in other processes.
+    The creating process is responsible for calling ``unlink`` once the
+    snapshot is no longer needed; using it as a context manager does so.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory,
+                 handle: SnapshotHandle, owner: bool = False):
+        self._shm = shm
+        self._owner = owner
+        self._buffer = shm.buf
+        self.handle = handle
+        self._columns = {
+            spec.lookups: _Column(spec, self._buffer, handle.length)
+            for spec in handle.columns
+        }
+
+    @classmethod
+    def create(cls, objects: Iterable,
+               paths: Iterable[Query]) -> "ColumnarSnapshot":
+        """Snapshot the values at ``paths`` in ``objects``.
+
+        Paths whose values are all integers or floats are stored as typed
+        arrays; the integers are converted to floats if the two are mixed.
+        Values at other paths must be hashable and picklable.
+        """
+        paths = [tuple(path) for path in paths]
+        resolver = Resolver(paths)
+        columns = [[] for _ in paths]
+        for obj in objects:
+            for column, value in zip(columns, resolver(obj)):
+                column.append(value)
+        length = len(columns[0]) if columns else 0
+
+        encoded = [_encode(values) for values in columns]
+        size = 0
+        layout = []
+        for kind, parts, dictionary in encoded:
+            offsets = []
+            for part in parts:
+                offsets.append(size)
+                size = _align(size + len(part))
+            dictionary_offset = size
+            if dictionary is not None:
+                size = _align(size + len(dictionary))
+            layout.append((offsets, dictionary_offset))
+
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        specs = []
+        for path, (kind, parts, dictionary), (offsets, dictionary_offset) in (
+                zip(paths, encoded, layout)):
+            for offset, part in zip(offsets, parts):
+                shm.buf[offset:offset + len(part)] = part
+            if dictionary is not None:
+                end = dictionary_offset + len(dictionary)
+                shm.buf[dictionary_offset:end] = dictionary
+            specs.append(ColumnSpec(
+                lookups=path,
+                kind=kind,
+                offset=offsets[0],
+                valid_offset=offsets[1] if len(offsets) > 1 else 0,
+                dictionary_offset=dictionary_offset,
+                dictionary_size=0 if dictionary is None else len(dictionary),
+            ))
+
+        handle = SnapshotHandle(name=shm.name, length=length,
+                                columns=tuple(specs))
+        return cls(shm, handle, owner=True)
+
+    @classmethod
+    def attach(cls, handle: SnapshotHandle) -> "ColumnarSnapshot":
+        return cls(shared_memory.SharedMemory(name=handle.name), handle)
+
+    def __len__(self) -> int:
+        return self.handle.length
+
+    def __enter__(self) -> "ColumnarSnapshot":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        if self._owner:
+            self.unlink()
+
+    @property
+    def paths(self) -> list[Query]:
+        return [Query(spec.lookups) for spec in self.handle.columns]
+
+    def close(self):
+        for column in self._columns.values():
+            column.release()
+        self._columns = {}
+        self._buffer.release()
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+    def column(self, path: Query) -> list:
+        """Decode the values at ``path``, with MISSING for missing values."""
+        column = self._column(tuple(path))
+        if column.dictionary is not None:
+            dictionary = column.dictionary + [MISSING]
+            return [dictionary[code] for code in column.values]
+        return [value if valid else MISSING
+                for value, valid in zip(column.values, column.valid)]
+
+    def plan(self, *preds: Any) -> tuple:
+        """Translate predicates into a picklable plan over the columns.
+
+        Raises TypeError for predicates that are not built from queries on
+        the snapshot's paths, such as custom functions.
+        """
+        return ("all", tuple(self._plan(_ensure_callable(pred))
+                             for pred in preds))
+
+    def filter(self, *preds: Any, start: int = 0,
+               stop: Optional[int] = None) -> list[int]:
+        """Return the positions of objects for which all ``preds`` are true."""
+        return self.execute(self.plan(*preds), start, stop)
+
+    def execute(self, plan: tuple, start: int = 0,
+                stop: Optional[int] = None) -> list[int]:
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return []
+        mask, _ = self._mask(plan, start, stop)
+        return list(itertools.compress(range(start, stop), mask))
+
+    def _column(self, lookups: tuple) -> _Column:
+        try:
+            return self._columns[lookups]
+        except KeyError:
+            raise ValueError(f"{Query(lookups)!r} is not in the snapshot")
+
+    def _plan(self, pred: Any) -> tuple:
+        combined = getattr(pred, "preds", None)
+        if combined is not None:
+            name = pred.combinator.removeprefix("q_")
+            return (name, tuple(self._plan(_ensure_callable(inner))
+                                for inner in combined))
+
+        lookups = getattr(pred, "lookups", None)
+        if lookups is None:
+            raise TypeError(f"{pred!r} can't be evaluated against a snapshot")
+        self._column(tuple(lookups))
+        func = _FUNC_NAMES.get(pred.func, pred.func)
+        return ("pred", tuple(lookups), func, tuple(pred.criteria),
+                getattr(pred, "missing", None))
+
+    def _mask(self, plan: tuple, start: int,
+              stop: int) -> tuple[bytes, Optional[bytes]]:
+        """Evaluate a plan with three-valued logic.
+
+        Returns a mask of the objects for which the plan is true and one of
+        those for which its result is known, which is None if it's known for
+        all. Objects with unknown results are 0 in the first mask.
+        """
+        kind = plan[0]
+        if kind == "pred":
+            _, lookups, func, criteria, missing = plan
+            if isinstance(func, str):
+                func = PREDICATE_MAKERS[func].func
+            return self._pred_mask(lookups, func, criteria, missing,
+                                   start, stop)
+        if kind == "not":
+            (inner,) = plan[1]
+            mask, known = self._mask(inner, start, stop)
+            mask = _not(mask)
+            return (mask if known is None else _and(mask, known)), known
+
+        parts = [self._mask(inner, start, stop) for inner in plan[1]]
+        combine, initial = (_and, 1) if kind == "all" else (_or, 0)
+        mask = bytes([initial]) * (stop - start)
+        for part, _ in parts:
+            mask = combine(mask, part)
+        partly_known = [known for _, known in parts if known is not None]
+        if not partly_known:
+            return mask, None
+
+        all_known = functools.reduce(_and, partly_known)
+        if kind == "any":
+            # Known if every part is known or any part is true
+            return mask, _or(all_known, mask)
+        # Known if every part is known or any part is known to be false
+        known = all_known
+        for part, part_known in parts:
+            false = _not(part)
+            known = _or(known, false if part_known is None
+                        else _and(false, part_known))
+        return mask, known
+
+    def _pred_mask(self, lookups: tuple, func: Callable, criteria: tuple,
+                   missing: Optional[str], start: int,
+                   stop: int) -> tuple[bytes, Optional[bytes]]:
+        column = self._column(lookups)
+        mask = self._present_mask(column, func, criteria, start, stop)
+        if missing in (None, "false"):
+            return mask, None
+
+        if column.dictionary is not None:
+            table = b"\1" * len(column.dictionary) + b"\0"
+            valid = bytes(map(table.__getitem__, column.values[start:stop]))
+        else:
+            valid = bytes(column.valid[start:stop])
+        if missing == "true":
+            return _or(mask, _not(valid)), None
+        if missing == "skip":
+            return mask, valid
+        if missing == "raise" and 0 in valid:
+            raise ObjNotFound(lookups)
+        return mask, None
+
+    def _present_mask(self, column: _Column, func: Callable, criteria: tuple,
+                      start: int, stop: int) -> bytes:
+        values = column.values[start:stop]
+        if column.dictionary is not None:
+            # Evaluate once per distinct value, plus a False for missing
+            table = bytes(bool(func(value, *criteria))
+                          for value in column.dictionary) + b"\0"
+            if column.kind == "B":
+                return values.tobytes().translate(table.ljust(256, b"\0"))
+            return bytes(map(table.__getitem__, values))
+
+        valid = column.valid[start:stop]
+        if func in _VECTORISED_FUNCS and len(criteria) <= 1:
+            # Safe to apply to the placeholders stored for missing values,
+            # which are then masked out
+            results = map(func, values, *map(itertools.repeat, criteria))
+            return _and(bytes(map(bool, results)), valid)
+        return bytes(bool(is_valid) and bool(func(value, *criteria))
+                     for value, is_valid in zip(values, valid))
+
+
+_worker_snapshot = None
+
+
+def _attach_worker(handle: SnapshotHandle):
+    global _worker_snapshot
+    _worker_snapshot = ColumnarSnapshot.attach(handle)
+
+
+def _execute_chunk(args: tuple) -> list[int]:
+    plan, start, stop = args
+    return _worker_snapshot.execute(plan, start, stop)
+
+
+def q_filter_parallel(snapshot: ColumnarSnapshot, *preds: Any,
+                      processes: Optional[int] = None,
+                      chunk_size: Optional[int] = None) -> list[int]:
+    """Return the positions of objects for which all ``preds`` are true.
+
+    The snapshot is split into chunks which are evaluated by a pool of
+    worker processes attached to the snapshot's shared memory.
+    """
+    plan = snapshot.plan(*preds)
+    processes = processes or multiprocessing.cpu_count()
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(snapshot) // (processes * 4)))
+    chunks = [(plan, start, start + chunk_size)
+              for start in range(0, len(snapshot), chunk_size)]
+
+    with multiprocessing.Pool(processes, initializer=_attach_worker,
+                              initargs=(snapshot.handle,)) as pool:
+        return [position for positions in pool.imap(_execute_chunk, chunks)
+                for position in positions]
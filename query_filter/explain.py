@@ -0,0 +1,195 @@
+import dataclasses
+import operator
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from query_filter import query
+from query_filter.filter import _ensure_callable
+from query_filter.query import MISSING, Query, describe, lookup_value
+
+_FAST_FUNCS = {
+    operator.lt, operator.le, operator.eq, operator.ne, operator.gt,
+    operator.ge, operator.is_, operator.is_not, operator.contains,
+}
+
+_INDEXABLE_FUNCS = {
+    operator.lt, operator.le, operator.eq, operator.gt, operator.ge,
+    query.is_in.func,
+}
+
+_MODES = ("all", "any", "not_any")
+
+
+@dataclasses.dataclass
+class PredicateExplanation:
+    """How a single predicate passed to a filter will be evaluated.
+
+    ``engine`` is one of ``"C kernel"``, ``"compiled accessor"``,
+    ``"combinator"`` or ``"opaque callable"``. ``indexable`` is true for
+    equality, membership and range predicates on a path, which an index
+    can answer. The sample statistics are ``None`` unless a sample was
+    explained.
+    """
+    description: str
+    engine: str
+    paths: list[Query]
+    indexable: bool
+    selectivity: Optional[float] = None
+    missing_rate: Optional[float] = None
+    cost: Optional[float] = None
+
+
+@dataclasses.dataclass
+class Explanation:
+    mode: str
+    predicates: list[PredicateExplanation]
+    paths: list[Query]
+    shared_prefixes: list[tuple[Query, int]]
+    order: list[int]
+    suggested_order: Optional[list[int]] = None
+    sample_size: int = 0
+
+    def __str__(self) -> str:
+        lines = [f"Filter: {self.mode} of {len(self.predicates)} predicates"]
+        lines.append("Paths:")
+        lines.extend(f"  {path!r}" for path in self.paths)
+        if self.shared_prefixes:
+            lines.append("Shared prefixes:")
+            lines.extend(f"  {prefix!r} ({count} paths)"
+                         for prefix, count in self.shared_prefixes)
+        lines.append("Predicates, in evaluation order:")
+        for position in self.order:
+            pred = self.predicates[position]
+            details = [pred.engine]
+            if pred.indexable:
+                details.append("indexable")
+            line = (f"  {position + 1}. {pred.description}"
+                    f"  [{', '.join(details)}]")
+            if pred.selectivity is not None:
+                line += (f"  selectivity {pred.selectivity:.2f}"
+                         f"  missing {pred.missing_rate:.2f}"
+                         f"  cost {pred.cost * 1e6:.2f} us")
+            lines.append(line)
+        if self.suggested_order is not None:
+            suggested = ", ".join(str(i + 1) for i in self.suggested_order)
+            lines.append(f"Suggested order (from {self.sample_size} samples): "
+                         f"{suggested}")
+        return "\n".join(lines)
+
+
+def _engine(pred: Any) -> str:
+    if getattr(pred, "preds", None) is not None:
+        return "combinator"
+    if getattr(pred, "lookups", None) is None:
+        return "opaque callable"
+    if query._speedups is not None and pred.func in _FAST_FUNCS:
+        return "C kernel"
+    return "compiled accessor"
+
+
+def _paths(pred: Any) -> list[Query]:
+    combined = getattr(pred, "preds", None)
+    if combined is not None:
+        return [path for inner in combined
+                for path in _paths(_ensure_callable(inner))]
+    lookups = getattr(pred, "lookups", None)
+    if lookups is None:
+        return []
+    return [Query(tuple(lookups))]
+
+
+def _distinct(paths: Iterable[Query]) -> list[Query]:
+    return list({tuple(path): path for path in paths}.values())
+
+
+def _shared_prefixes(paths: list[Query]) -> list[tuple[Query, int]]:
+    counts = {}
+    for path in paths:
+        lookups = tuple(path)
+        for end in range(1, len(lookups) + 1):
+            counts[lookups[:end]] = counts.get(lookups[:end], 0) + 1
+    shared = {prefix: count for prefix, count in counts.items() if count > 1}
+
+    def extended_by_same_paths(prefix, count):
+        return any(len(other) == len(prefix) + 1
+                   and other[:len(prefix)] == prefix
+                   and shared[other] == count
+                   for other in shared)
+
+    return [(Query(prefix), count) for prefix, count in shared.items()
+            if not extended_by_same_paths(prefix, count)]
+
+
+def _sample_stats(pred: Callable, explanation: PredicateExplanation,
+                  sample: list):
+    paths = explanation.paths
+    passed = missing = 0
+    clock = time.perf_counter
+    start = clock()
+    results = [pred(item) for item in sample]
+    elapsed = clock() - start
+
+    for item, result in zip(sample, results):
+        if result:
+            passed += 1
+        elif len(paths) == 1 and lookup_value(item, paths[0]) is MISSING:
+            missing += 1
+
+    explanation.selectivity = passed / len(sample)
+    explanation.missing_rate = missing / len(sample)
+    explanation.cost = elapsed / len(sample)
+
+
+def _rank(explanation: PredicateExplanation, mode: str) -> float:
+    # Evaluate cheap predicates that are likely to decide the outcome first
+    deciding = (1 - explanation.selectivity if mode == "all"
+                else explanation.selectivity)
+    if deciding == 0:
+        return float("inf")
+    return explanation.cost / deciding
+
+
+def explain(*preds: Any, sample: Optional[Iterable] = None,
+            mode: str = "all") -> Explanation:
+    """Describe how ``q_filter_<mode>(objects, *preds)`` will be evaluated.
+
+    If ``sample`` is given, each predicate is evaluated against every object
+    in it to estimate its selectivity, missing value rate and cost per call,
+    and an evaluation order that should decide the outcome sooner is
+    suggested.
+    """
+    if mode not in _MODES:
+        raise ValueError(f"mode must be one of {_MODES}, not {mode!r}")
+
+    callables = [_ensure_callable(pred) for pred in preds]
+    predicates = []
+    for pred in callables:
+        predicates.append(PredicateExplanation(
+            description=describe(pred),
+            engine=_engine(pred),
+            paths=_distinct(_paths(pred)),
+            indexable=(getattr(pred, "func", None) in _INDEXABLE_FUNCS
+                       and getattr(pred, "lookups", None) is not None),
+        ))
+
+    paths = _distinct(path for pred in predicates for path in pred.paths)
+    explanation = Explanation(
+        mode=mode,
+        predicates=predicates,
+        paths=paths,
+        shared_prefixes=_shared_prefixes(paths),
+        order=list(range(len(predicates))),
+    )
+
+    if sample is not None:
+        sample = list(sample)
+        if sample:
+            for pred, predicate in zip(callables, predicates):
+                _sample_stats(pred, predicate, sample)
+            explanation.sample_size = len(sample)
+            explanation.suggested_order = sorted(
+                explanation.order,
+                key=lambda position: _rank(predicates[position], mode)
+            )
+
+    return explanation
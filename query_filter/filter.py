@@ -1,58 +1,208 @@
-from typing import Any, Callable, Iterable, Union
+import collections
+import heapq
+import itertools
+import operator
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence, Union
 
-from query_filter.query import ObjNotFound, Query, retrieve_value
+from query_filter import profiling
+from query_filter.query import (_COMBINE_EVERY, _COMBINE_NONE, _COMBINE_Q_ALL,
+                                _COMBINE_Q_ANY, _COMBINE_Q_NOT, _COMBINE_SOME,
+                                MISSING, Query, Resolver, _combined,
+                                _predicate, describe, lookup_value, truthy)
+
+Keys = Union[Query, Sequence[Query], None]
 
 
 def _ensure_callable(obj: Union[Callable, Query]):
     if callable(obj):
         return obj
 
-    def truthy_pred(item: Any):
-        try:
-            return retrieve_value(item, *obj)
-        except ObjNotFound:
+    return truthy(obj)
+
+
+def _prepare(preds: tuple, missing: Optional[str] = None) -> tuple:
+    preds = tuple(_ensure_callable(pred) for pred in preds)
+    if missing is not None:
+        preds = tuple(_with_missing(pred, missing, explicit=False)
+                      for pred in preds)
+    profiler = profiling.active_profiler()
+    if profiler is not None:
+        preds = profiler.instrument(preds)
+    return preds
+
+
+def _key_function(keys: tuple) -> Callable[[Any], Any]:
+    if not keys:
+        return lambda obj: obj
+    if len(keys) == 1:
+        lookups = tuple(keys[0])
+        return lambda obj: lookup_value(obj, lookups)
+    resolver = Resolver(keys)
+    return lambda obj: tuple(resolver(obj))
+
+
+def _unseen(keys: tuple, window: Optional[int]) -> Callable[[Any], bool]:
+    """Return a predicate true for the first object with each key."""
+    key_of = _key_function(keys)
+    if window is None:
+        seen = set()
+        add = seen.add
+
+        def unseen(obj: Any) -> bool:
+            key = key_of(obj)
+            if key in seen:
+                return False
+            add(key)
+            return True
+
+        return unseen
+
+    # Remember the most recently seen keys only
+    recent = collections.OrderedDict()
+
+    def unseen_recently(obj: Any) -> bool:
+        key = key_of(obj)
+        if key in recent:
+            recent.move_to_end(key)
             return False
+        recent[key] = None
+        if len(recent) > window:
+            recent.popitem(last=False)
+        return True
+
+    return unseen_recently
+
 
-    return truthy_pred
+def _distinct(objects: Iterable, keys: tuple,
+              window: Optional[int]) -> Iterator[Any]:
+    return filter(_unseen(keys, window), objects)
 
 
-def q_filter_any(objects: Iterable, *preds) -> Iterable[Any]:
-    def main_predicate(item):
-        return any(_ensure_callable(pred)(item) for pred in preds)
+def _restrict(results: Iterable, limit: Optional[int],
+              distinct: Keys = None) -> Iterable[Any]:
+    if distinct is not None:
+        keys = (distinct,) if isinstance(distinct, Query) else tuple(distinct)
+        results = _distinct(results, keys, None)
+    if limit is None:
+        return results
+    return itertools.islice(results, limit)
 
-    return filter(main_predicate, objects)
 
+def _filter(mode: int, objects: Iterable, preds: tuple,
+            limit: Optional[int], distinct: Keys,
+            missing: Optional[str]) -> Iterable[Any]:
+    preds = _prepare(preds, missing)
+    if len(preds) == 1 and mode != _COMBINE_NONE:
+        # A lone predicate is as true as the filter's predicate would be
+        (main_predicate,) = preds
+    else:
+        main_predicate = _combined(mode, preds)
+    return _restrict(filter(main_predicate, objects), limit, distinct)
 
-def q_filter_not_any(objects: Iterable, *preds) -> Iterable[Any]:
-    def main_predicate(item):
-        return not any(_ensure_callable(pred)(item) for pred in preds)
 
-    return filter(main_predicate, objects)
+def q_filter_any(objects: Iterable, *preds, limit: Optional[int] = None,
+                 distinct: Keys = None,
+                 missing: Optional[str] = None) -> Iterable[Any]:
+    return _filter(_COMBINE_SOME, objects, preds, limit, distinct, missing)
 
 
-def q_filter_all(objects: Iterable, *preds) -> Iterable[Any]:
-    def main_predicate(item):
-        return all(_ensure_callable(pred)(item) for pred in preds)
+def q_filter_not_any(objects: Iterable, *preds, limit: Optional[int] = None,
+                     distinct: Keys = None,
+                     missing: Optional[str] = None) -> Iterable[Any]:
+    return _filter(_COMBINE_NONE, objects, preds, limit, distinct, missing)
 
-    return filter(main_predicate, objects)
+
+def q_filter_all(objects: Iterable, *preds, limit: Optional[int] = None,
+                 distinct: Keys = None,
+                 missing: Optional[str] = None) -> Iterable[Any]:
+    return _filter(_COMBINE_EVERY, objects, preds, limit, distinct, missing)
 
 
 q_filter = q_filter_all
 
 
+def q_distinct(objects: Iterable, *keys: Query,
+               window: Optional[int] = None) -> Iterator[Any]:
+    """Lazily yield the first object for each distinct value at ``keys``.
+
+    With several keys, objects are distinct by the tuple of their values,
+    and with none, by the objects themselves, which must then be hashable.
+    A missing value counts as a value of its own. If ``window`` is given,
+    only the ``window`` most recently seen keys are remembered, bounding the
+    memory used at the cost of letting duplicates further apart through.
+    """
+    return _distinct(objects, keys, window)
+
+
+def q_first(objects: Iterable, *preds, default: Any = None) -> Any:
+    return next(iter(q_filter_all(objects, *preds)), default)
+
+
+def q_top_k(objects: Iterable, key: Query, k: int, *preds,
+            largest: bool = True) -> list[Any]:
+    lookups = tuple(key)
+
+    def keyed():
+        for obj in q_filter_all(objects, *preds):
+            value = lookup_value(obj, lookups)
+            if value is not MISSING:
+                yield value, obj
+
+    select = heapq.nlargest if largest else heapq.nsmallest
+    return [obj for _, obj in select(k, keyed(), key=operator.itemgetter(0))]
+
+
 def q_all(*preds: Callable) -> Callable:
-    def all_pred(obj: Any):
-        return all(_ensure_callable(pred)(obj) for pred in preds)
+    all_pred = _combined(_COMBINE_Q_ALL,
+                         tuple(_ensure_callable(pred) for pred in preds))
+    all_pred.combinator = "q_all"
+    all_pred.preds = preds
     return all_pred
 
 
 def q_any(*preds: Callable) -> Callable:
-    def any_pred(obj: Any):
-        return any(_ensure_callable(pred)(obj) for pred in preds)
+    any_pred = _combined(_COMBINE_Q_ANY,
+                         tuple(_ensure_callable(pred) for pred in preds))
+    any_pred.combinator = "q_any"
+    any_pred.preds = preds
     return any_pred
 
 
 def q_not(pred: Callable) -> Callable:
-    def not_pred(obj: Any):
-        return not _ensure_callable(pred)(obj)
+    not_pred = _combined(_COMBINE_Q_NOT, (_ensure_callable(pred),))
+    not_pred.combinator = "q_not"
+    not_pred.preds = (pred,)
     return not_pred
+
+
+_COMBINATORS = {"q_all": q_all, "q_any": q_any, "q_not": q_not}
+
+
+def _with_missing(pred: Any, missing: str, explicit: bool) -> Callable:
+    pred = _ensure_callable(pred)
+    combined = getattr(pred, "preds", None)
+    if combined is not None:
+        return _COMBINATORS[pred.combinator](*(
+            _with_missing(inner, missing, explicit) for inner in combined
+        ))
+
+    lookups = getattr(pred, "lookups", None)
+    if lookups is None or getattr(pred, "func", None) is None:
+        if explicit:
+            raise TypeError(f"{describe(pred)} doesn't look up a path")
+        return pred
+    if not explicit and pred.missing is not None:
+        return pred
+    return _predicate(pred.func, tuple(lookups), tuple(pred.criteria), missing)
+
+
+def q_missing(pred: Any, missing: str) -> Callable:
+    """Rebuild ``pred`` to handle missing values with the ``missing`` policy.
+
+    The policy applies to every path looked up by ``pred``, including
+    those inside ``q_all``, ``q_any`` and ``q_not``: ``"false"`` and
+    ``"true"`` make the predicate false or true, ``"raise"`` raises
+    ObjNotFound and ``"skip"`` returns UNKNOWN, which is falsy but which
+    ``q_not`` leaves unknown, so filters skip the object.
+    """
+    return _with_missing(pred, missing, explicit=True)
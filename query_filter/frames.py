@@ -0,0 +1,311 @@
+"""Evaluate predicates against pandas DataFrames and Arrow tables.
+
+Predicates are translated into boolean masks computed by pandas or Arrow
+over whole columns, giving the rows ``q_filter_all`` would return for the
+records ``DataFrame.to_dict("records")`` or ``Table.to_pylist()`` produce.
+A path's first item lookup names a column, and for Arrow, further item
+lookups name fields of struct columns.
+
+Predicates that can't be translated exactly, such as custom functions,
+paths into other nested values and comparisons on columns with null
+values, are evaluated against the records instead, so results never
+depend on which were translated.
+
+pandas and pyarrow are optional dependencies, imported when first needed.
+"""
+import operator
+import re
+from typing import Any, Optional
+
+from query_filter import query
+from query_filter.filter import _ensure_callable, _with_missing
+from query_filter.query import UNKNOWN, LookupType
+
+_COMPARISONS = {operator.lt, operator.le, operator.eq, operator.ne,
+                operator.gt, operator.ge}
+
+_ARROW_COMPARISONS = {
+    operator.lt: "less",
+    operator.le: "less_equal",
+    operator.eq: "equal",
+    operator.ne: "not_equal",
+    operator.gt: "greater",
+    operator.ge: "greater_equal",
+}
+
+
+class _Untranslatable(Exception):
+    pass
+
+
+class _Frame:
+    """A DataFrame or Table, with its records computed when first needed."""
+
+    def __init__(self, frame: Any):
+        self.frame = frame
+        self._records = None
+
+    def records(self) -> list:
+        if self._records is None:
+            self._records = self._to_records()
+        return self._records
+
+    def evaluate(self, pred: Any) -> tuple:
+        """Return ``pred``'s results for each record, as a mask of true
+        results and a mask of known results, or None if all are known."""
+        np = self.numpy
+        results = [pred(record) for record in self.records()]
+        mask = np.fromiter(map(bool, results), dtype=bool,
+                           count=len(results))
+        if not any(result is UNKNOWN for result in results):
+            return mask, None
+        known = np.fromiter((result is not UNKNOWN for result in results),
+                            dtype=bool, count=len(results))
+        return mask, known
+
+    def leaf(self, pred: Any) -> tuple:
+        try:
+            return self.translate(pred), None
+        except _Untranslatable:
+            return self.evaluate(pred)
+
+
+class _PandasFrame(_Frame):
+    def __init__(self, frame: Any):
+        super().__init__(frame)
+        import numpy
+        import pandas
+        self.numpy = numpy
+        self.pandas = pandas
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _to_records(self) -> list:
+        return self.frame.to_dict("records")
+
+    def column(self, lookups: tuple) -> Any:
+        if len(lookups) != 1 or lookups[0].lookup_type is not LookupType.ITEM:
+            raise _Untranslatable
+        key = lookups[0].key
+        if key not in self.frame.columns:
+            raise _Untranslatable
+        column = self.frame[key]
+        if not isinstance(column, self.pandas.Series) or column.hasnans:
+            raise _Untranslatable
+        return column
+
+    def translate(self, pred: Any) -> Any:
+        column = self.column(tuple(pred.lookups))
+        func, criteria = pred.func, pred.criteria
+        try:
+            if func in _COMPARISONS:
+                (criterion,) = criteria
+                # pandas compares lists and arrays element by element
+                if not self.pandas.api.types.is_scalar(criterion):
+                    raise _Untranslatable
+                result = func(column, criterion)
+            elif func is query.is_in.func:
+                (container,) = criteria
+                if not isinstance(container, (set, frozenset, list, tuple,
+                                              dict)):
+                    raise _Untranslatable
+                result = column.isin(list(container))
+            elif func is query.regex.func:
+                (pattern,) = criteria
+                if (not isinstance(pattern, str)
+                        or self.pandas.api.types.infer_dtype(column)
+                        != "string"):
+                    raise _Untranslatable
+                # Object columns are matched with Python's re module, as
+                # q_matches_regex is, where string columns might use RE2
+                result = column.astype(object).str.contains(pattern)
+            elif func is operator.truth:
+                result = self._truth(column)
+            elif func is query.negate.func:
+                result = ~self._truth(column)
+            else:
+                raise _Untranslatable
+            return self.numpy.asarray(result, dtype=bool)
+        except (TypeError, ValueError, NotImplementedError, re.error):
+            raise _Untranslatable
+
+    def _truth(self, column: Any) -> Any:
+        if column.dtype.kind == "b":
+            return column.to_numpy(dtype=bool)
+        if column.dtype.kind in "iuf":
+            return column.to_numpy() != 0
+        raise _Untranslatable
+
+    def select(self, mask: Any) -> Any:
+        return self.frame[mask]
+
+
+class _ArrowTable(_Frame):
+    def __init__(self, frame: Any):
+        super().__init__(frame)
+        import numpy
+        import pyarrow
+        import pyarrow.compute
+        self.numpy = numpy
+        self.pyarrow = pyarrow
+        self.compute = pyarrow.compute
+
+    def __len__(self) -> int:
+        return self.frame.num_rows
+
+    def _to_records(self) -> list:
+        return self.frame.to_pylist()
+
+    def column(self, lookups: tuple) -> Any:
+        if not lookups or any(lookup.lookup_type is not LookupType.ITEM
+                              for lookup in lookups):
+            raise _Untranslatable
+        name, *fields = [lookup.key for lookup in lookups]
+        if name not in self.frame.column_names:
+            raise _Untranslatable
+        column = self.frame.column(name).combine_chunks()
+        for field in fields:
+            # A null struct's fields are missing from its record, not None
+            if (column.null_count or not isinstance(field, str)
+                    or not self.pyarrow.types.is_struct(column.type)
+                    or column.type.get_field_index(field) < 0):
+                raise _Untranslatable
+            column = self.compute.struct_field(column, [field])
+        if column.null_count:
+            raise _Untranslatable
+        return column
+
+    def translate(self, pred: Any) -> Any:
+        column = self.column(tuple(pred.lookups))
+        func, criteria = pred.func, pred.criteria
+        compute = self.compute
+        types = self.pyarrow.types
+        try:
+            if func in _COMPARISONS:
+                (criterion,) = criteria
+                comparable = (
+                    (types.is_integer(column.type)
+                     or types.is_floating(column.type))
+                    and type(criterion) in (int, float)
+                    or types.is_string(column.type) and type(criterion) is str
+                    or types.is_binary(column.type)
+                    and type(criterion) is bytes
+                    or types.is_boolean(column.type)
+                    and type(criterion) is bool
+                )
+                if not comparable:
+                    raise _Untranslatable
+                result = getattr(compute, _ARROW_COMPARISONS[func])(
+                    column, criterion
+                )
+            elif func is query.is_in.func:
+                (container,) = criteria
+                if not isinstance(container, (set, frozenset, list, tuple,
+                                              dict)):
+                    raise _Untranslatable
+                values = self.pyarrow.array(list(container))
+                if values.type != column.type:
+                    raise _Untranslatable
+                result = compute.is_in(column, value_set=values)
+            elif func is operator.truth:
+                result = self._truth(column)
+            elif func is query.negate.func:
+                result = compute.invert(self._truth(column))
+            else:
+                # Arrow's regular expressions aren't Python's, so regex
+                # predicates are among those evaluated against the records
+                raise _Untranslatable
+            return result.to_numpy(zero_copy_only=False).astype(bool)
+        except (TypeError, ValueError, self.pyarrow.ArrowException):
+            raise _Untranslatable
+
+    def _truth(self, column: Any) -> Any:
+        types = self.pyarrow.types
+        if types.is_boolean(column.type):
+            return column
+        if types.is_integer(column.type) or types.is_floating(column.type):
+            return self.compute.not_equal(column, 0)
+        if types.is_string(column.type) or types.is_binary(column.type):
+            return self.compute.greater(self.compute.binary_length(column), 0)
+        raise _Untranslatable
+
+    def select(self, mask: Any) -> Any:
+        return self.frame.filter(self.pyarrow.array(mask))
+
+
+def _adapt(frame: Any) -> _Frame:
+    package = type(frame).__module__.partition(".")[0]
+    if package == "pandas":
+        return _PandasFrame(frame)
+    if package == "pyarrow":
+        return _ArrowTable(frame)
+    raise TypeError(f"{type(frame).__name__} is not a pandas DataFrame or "
+                    f"an Arrow table")
+
+
+def _mask(frame: _Frame, pred: Any) -> tuple:
+    pred = _ensure_callable(pred)
+    combined = getattr(pred, "preds", None)
+    if combined is not None:
+        parts = [_mask(frame, inner) for inner in combined]
+        return _combine(frame.numpy, pred.combinator, parts, len(frame))
+    if getattr(pred, "lookups", None) is None:
+        return frame.evaluate(pred)
+    return frame.leaf(pred)
+
+
+def _combine(np: Any, combinator: str, parts: list, length: int) -> tuple:
+    """Combine masks with the three-valued logic of the combinators."""
+    if combinator == "q_not":
+        ((mask, known),) = parts
+        mask = ~mask
+        return (mask if known is None else mask & known), known
+
+    if combinator == "q_all":
+        mask = np.ones(length, dtype=bool)
+        for part, _ in parts:
+            mask &= part
+    else:
+        mask = np.zeros(length, dtype=bool)
+        for part, _ in parts:
+            mask |= part
+    partly_known = [known for _, known in parts if known is not None]
+    if not partly_known:
+        return mask, None
+
+    known = np.logical_and.reduce(partly_known)
+    if combinator == "q_any":
+        # Known if every part is known or any part is true
+        return mask, known | mask
+    # Known if every part is known or any part is known to be false
+    for part, part_known in parts:
+        false = ~part
+        known |= false if part_known is None else false & part_known
+    return mask, known
+
+
+def _filter_mask(adapted: _Frame, preds: tuple) -> Any:
+    mask, _ = _combine(adapted.numpy, "q_all",
+                       [_mask(adapted, pred) for pred in preds], len(adapted))
+    return mask
+
+
+def to_mask(frame: Any, *preds: Any) -> Any:
+    """Return a NumPy boolean array of the rows for which all ``preds`` are
+    true."""
+    return _filter_mask(_adapt(frame), preds)
+
+
+def q_filter_frame(frame: Any, *preds: Any,
+                   missing: Optional[str] = None) -> Any:
+    """Return the rows of a DataFrame or Table for which all ``preds`` are
+    true, as a DataFrame or Table.
+
+    ``missing`` sets a missing value policy, as for ``q_filter_all``.
+    """
+    if missing is not None:
+        preds = tuple(_with_missing(pred, missing, explicit=False)
+                      for pred in preds)
+    adapted = _adapt(frame)
+    return adapted.select(_filter_mask(adapted, preds))
@@ -0,0 +1,342 @@
+"""Persistent equality and range indexes over query paths.
+
+An index file holds, for each indexed path, the values found at that path
+in a collection, sorted, along with the position of each value's object in
+the collection. The file is memory-mapped, so workers can open an index
+built once and answer ``==``, ``q_is_in`` and range predicates by binary
+search instead of rebuilding it or scanning the collection.
+
+Each file records a fingerprint of the indexed values, so an index can be
+checked against the collection it's used with.
+"""
+import bisect
+import hashlib
+import json
+import math
+import mmap
+import operator
+import os
+import struct
+from array import array
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from query_filter import query
+from query_filter._arrays import numeric_typecode
+from query_filter.filter import _ensure_callable, q_filter_all
+from query_filter.query import MISSING, Lookup, LookupType, Query, Resolver
+
+_MAGIC = b"QFIX\x01"
+_HEADER = struct.Struct("<5s32sQQQ")
+
+_RANGE_FUNCS = {
+    operator.lt: (None, bisect.bisect_left),
+    operator.le: (None, bisect.bisect_right),
+    operator.gt: (bisect.bisect_right, None),
+    operator.ge: (bisect.bisect_left, None),
+}
+
+_INDEXED_FUNCS = {operator.eq, query.is_in.func, *_RANGE_FUNCS}
+
+# q_is_in containers whose members are the values they iterate over
+_CONTAINERS = (set, frozenset, list, tuple, dict)
+
+# Criteria the index compares exactly as a scan would. Others, such as NumPy
+# scalars and Decimal, may equal indexed values without being one of these
+_CRITERION_TYPES = {int, float, bool, str, bytes, type(None)}
+
+
+class StaleIndexError(Exception):
+    """Raised when an index doesn't match the collection it's used with."""
+
+
+def _fingerprint_value(value: Any) -> bytes:
+    if value is MISSING:
+        return b"-"
+    return f"{type(value).__name__}:{value!r}".encode(
+        "utf-8", "surrogatepass"
+    )
+
+
+def dataset_fingerprint(objects: Iterable, paths: Iterable[Query]) -> bytes:
+    """Return a digest of the values at ``paths`` in ``objects``, in order."""
+    digest = hashlib.blake2b(digest_size=32)
+    resolver = Resolver(paths)
+    for obj in objects:
+        digest.update(b"\0".join(map(_fingerprint_value, resolver(obj))))
+        digest.update(b"\n")
+    return digest.digest()
+
+
+def _kind(values: list) -> str:
+    kind = numeric_typecode(values)
+    if kind is not None:
+        return kind
+    if all(type(value) is str for value in values):
+        return "s"
+    if all(type(value) is bytes for value in values):
+        return "b"
+    raise TypeError("indexed values must all be numbers, strings or bytes")
+
+
+def _encode_key(kind: str, value: Any) -> bytes:
+    return value.encode("utf-8", "surrogatepass") if kind == "s" else value
+
+
+def _dump_lookups(lookups: tuple) -> list:
+    return [["attr" if lookup.lookup_type is LookupType.ATTR else "item",
+             lookup.key] for lookup in lookups]
+
+
+def _load_lookups(data: list) -> tuple:
+    return tuple(Lookup(LookupType.ATTR if kind == "attr" else LookupType.ITEM,
+                        key) for kind, key in data)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+
+class _Blobs:
+    """Sequence of the variable-length keys in the file, for ``bisect``."""
+
+    def __init__(self, buffer: memoryview, offsets: memoryview):
+        self._buffer = buffer
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self._buffer[self._offsets[i]:self._offsets[i + 1]])
+
+
+class _PathIndex:
+    def __init__(self, kind: str, keys: Sequence, positions: memoryview):
+        self.kind = kind
+        self.keys = keys
+        self.positions = positions
+
+    def _key(self, value: Any, strict: bool) -> Any:
+        """Convert a criterion to a key, or return MISSING if it can't match.
+
+        With ``strict``, criteria that can't be ordered against the indexed
+        values raise TypeError, as comparing them would.
+        """
+        if self.kind in ("q", "d"):
+            valid = type(value) in (int, float, bool)
+        else:
+            valid = type(value) is (str if self.kind == "s" else bytes)
+        if not valid:
+            if strict:
+                raise TypeError(f"{value!r} can't be compared with values "
+                                f"of the indexed path")
+            return MISSING
+        if self.kind in ("q", "d"):
+            if isinstance(value, float) and math.isnan(value):
+                return MISSING
+            return value
+        return _encode_key(self.kind, value)
+
+    def equal(self, value: Any) -> list[int]:
+        key = self._key(value, strict=False)
+        if key is MISSING:
+            return []
+        start = bisect.bisect_left(self.keys, key)
+        stop = bisect.bisect_right(self.keys, key, lo=start)
+        return self.positions[start:stop].tolist()
+
+    def range(self, func: Callable, value: Any) -> list[int]:
+        key = self._key(value, strict=True)
+        if key is MISSING:
+            return []
+        lower, upper = _RANGE_FUNCS[func]
+        start = 0 if lower is None else lower(self.keys, key)
+        stop = len(self.keys) if upper is None else upper(self.keys, key)
+        return sorted(self.positions[start:stop])
+
+
+class Index:
+    """Equality and range indexes over query paths, stored in a file.
+
+    Build an index with ``Index.build`` and open it with ``Index``. If a
+    ``fingerprint`` is given when opening, from ``dataset_fingerprint`` or
+    as recorded when the collection was indexed, StaleIndexError is raised
+    if it doesn't match the index's.
+    """
+
+    def __init__(self, path: str, fingerprint: Optional[bytes] = None):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        self._views = [buffer]
+        magic, self.fingerprint, self.length, directory_offset, \
+            directory_size = _HEADER.unpack_from(buffer)
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an index file")
+        if fingerprint is not None and fingerprint != self.fingerprint:
+            self.close()
+            raise StaleIndexError(f"{path} was built from different data")
+
+        end = directory_offset + directory_size
+        directory = json.loads(bytes(buffer[directory_offset:end]))
+        self._indexes = {}
+        for entry in directory:
+            count = entry["count"]
+            positions = self._view(entry["positions"], count * 8, "Q")
+            if entry["kind"] in ("s", "b"):
+                offsets = self._view(entry["keys"], (count + 1) * 8, "Q")
+                keys = _Blobs(buffer, offsets)
+            else:
+                keys = self._view(entry["keys"], count * 8, entry["kind"])
+            lookups = _load_lookups(entry["path"])
+            self._indexes[lookups] = _PathIndex(entry["kind"], keys, positions)
+
+    def _view(self, offset: int, size: int, kind: str) -> memoryview:
+        view = self._views[0][offset:offset + size].cast(kind)
+        self._views.append(view)
+        return view
+
+    @classmethod
+    def build(cls, objects: Iterable, paths: Iterable[Query],
+              path: str) -> "Index":
+        """Index the values at ``paths`` in ``objects`` in a file at ``path``.
+
+        Values at each path must all be numbers, all strings or all bytes.
+        Objects without a value at a path, and NaN, aren't indexed for it.
+        """
+        paths = [tuple(query_path) for query_path in paths]
+        resolver = Resolver(paths)
+        digest = hashlib.blake2b(digest_size=32)
+        columns = [[] for _ in paths]
+        length = 0
+        for position, obj in enumerate(objects):
+            values = resolver(obj)
+            digest.update(b"\0".join(map(_fingerprint_value, values)))
+            digest.update(b"\n")
+            for column, value in zip(columns, values):
+                if value is not MISSING and value == value:
+                    column.append((value, position))
+            length = position + 1
+
+        directory = []
+        parts = []
+        offset = _HEADER.size
+        for lookups, column in zip(paths, columns):
+            kind = _kind([value for value, _ in column])
+            column.sort()
+            entry = {"path": _dump_lookups(lookups), "kind": kind,
+                     "count": len(column), "keys": offset}
+            if kind in ("s", "b"):
+                blobs = [_encode_key(kind, value) for value, _ in column]
+                # Blob offsets are relative to the start of the file
+                offsets = array("Q", [offset + (len(blobs) + 1) * 8])
+                for blob in blobs:
+                    offsets.append(offsets[-1] + len(blob))
+                keys = offsets.tobytes() + b"".join(blobs)
+            else:
+                keys = array(kind, (value for value, _ in column)).tobytes()
+            offset = _align(offset + len(keys))
+            entry["positions"] = offset
+            positions = array("Q", (position for _, position in column))
+            offset = _align(offset + len(positions) * 8)
+            directory.append(entry)
+            parts.append((entry["keys"], keys))
+            parts.append((entry["positions"], positions.tobytes()))
+
+        encoded = json.dumps(directory).encode()
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(_HEADER.pack(_MAGIC, digest.digest(), length, offset,
+                                    len(encoded)))
+            for part_offset, part in parts:
+                file.seek(part_offset)
+                file.write(part)
+            file.seek(offset)
+            file.write(encoded)
+        os.replace(temporary, path)
+        return cls(path)
+
+    def __enter__(self) -> "Index":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._indexes = {}
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    @property
+    def paths(self) -> list[Query]:
+        return [Query(lookups) for lookups in self._indexes]
+
+    def check(self, objects: Iterable):
+        """Raise StaleIndexError unless ``objects`` are those indexed."""
+        if dataset_fingerprint(objects, self.paths) != self.fingerprint:
+            raise StaleIndexError(f"{self.path} was built from different data")
+
+    def can_answer(self, pred: Any) -> bool:
+        """Whether ``pred`` is ``==``, ``q_is_in`` with a set, frozenset,
+        list, tuple or dict, or a range on an indexed path, with a missing
+        value policy that excludes missing values and criteria that are
+        numbers, strings, bytes or None of the built-in types."""
+        pred = _ensure_callable(pred)
+        lookups = getattr(pred, "lookups", None)
+        if not (lookups is not None
+                and getattr(pred, "func", None) in _INDEXED_FUNCS
+                and tuple(lookups) in self._indexes
+                and pred.missing in (None, "false", "skip")
+                and len(pred.criteria) == 1):
+            return False
+        (criterion,) = pred.criteria
+        if pred.func is not query.is_in.func:
+            return type(criterion) in _CRITERION_TYPES
+        return (isinstance(criterion, _CONTAINERS)
+                and all(type(value) in _CRITERION_TYPES
+                        for value in criterion))
+
+    def positions(self, pred: Any) -> list[int]:
+        """Return the sorted positions of the objects for which ``pred`` is
+        true, for a predicate the index can answer."""
+        pred = _ensure_callable(pred)
+        if not self.can_answer(pred):
+            raise ValueError(f"{query.describe(pred)} can't be answered by "
+                             f"the index")
+        index = self._indexes[tuple(pred.lookups)]
+        (criterion,) = pred.criteria
+        if pred.func is operator.eq:
+            return index.equal(criterion)
+        if pred.func is query.is_in.func:
+            return sorted({position for value in criterion
+                           for position in index.equal(value)})
+        return index.range(pred.func, criterion)
+
+    def filter(self, objects: Sequence, *preds: Any) -> list[Any]:
+        """Return the objects for which all ``preds`` are true.
+
+        Predicates the index can answer select candidate positions, and the
+        others are evaluated against the candidates only. ``objects`` must
+        be the indexed collection.
+        """
+        if len(objects) != self.length:
+            raise StaleIndexError(f"{self.path} indexes {self.length} objects,"
+                                  f" not {len(objects)}")
+        preds = [_ensure_callable(pred) for pred in preds]
+        indexed = [pred for pred in preds if self.can_answer(pred)]
+        if not indexed:
+            return list(q_filter_all(objects, *preds))
+
+        candidates = None
+        for pred in indexed:
+            positions = self.positions(pred)
+            candidates = (set(positions) if candidates is None
+                          else candidates.intersection(positions))
+        others = [pred for pred in preds if not self.can_answer(pred)]
+        return list(q_filter_all((objects[position]
+                                  for position in sorted(candidates)),
+                                 *others))
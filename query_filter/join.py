@@ -0,0 +1,94 @@
+from typing import Any, Iterable, Iterator, Optional
+
+from query_filter.filter import q_filter_all
+from query_filter.query import MISSING, Accessor, Query
+
+_HOWS = ("inner", "left")
+_SIDES = ("left", "right")
+
+
+def _build(objects: Iterable, accessor: Accessor) -> tuple[dict, list]:
+    table = {}
+    unkeyed = []
+    for obj in objects:
+        key = accessor(obj)
+        if key is MISSING:
+            unkeyed.append(obj)
+        else:
+            table.setdefault(key, []).append(obj)
+    return table, unkeyed
+
+
+def _build_side(left: Iterable, right: Iterable) -> str:
+    try:
+        smaller_left = len(left) < len(right)
+    except TypeError:
+        # Sizes are unknown, so stream the left side, which preserves its order
+        return "right"
+    return "left" if smaller_left else "right"
+
+
+def q_join(left: Iterable, right: Iterable, on: tuple[Query, Query],
+           how: str = "inner", left_where: Iterable = (),
+           right_where: Iterable = (), build: Optional[str] = None
+           ) -> Iterator[tuple[Any, Any]]:
+    """Join two collections where the values at the ``on`` paths are equal.
+
+    Yields ``(left_obj, right_obj)`` pairs. With ``how="left"``, left objects
+    without a match are yielded once as ``(left_obj, None)``. Objects without
+    a value at their ``on`` path match nothing.
+
+    The predicates in ``left_where`` and ``right_where`` are applied to each
+    side before joining. One side, ``build``, is loaded into a hash table and
+    the other is streamed. By default the smaller side is built when both
+    sides have a length, and otherwise the right side is. Pairs are yielded
+    in the order of the streamed side, and when the left side is built,
+    unmatched left objects come last.
+    """
+    if how not in _HOWS:
+        raise ValueError(f"how must be one of {_HOWS}, not {how!r}")
+    if build is None:
+        build = _build_side(left, right)
+    elif build not in _SIDES:
+        raise ValueError(f"build must be one of {_SIDES}, not {build!r}")
+
+    left_on, right_on = (Accessor(path) for path in on)
+    left = q_filter_all(left, *left_where)
+    right = q_filter_all(right, *right_where)
+    if build == "right":
+        table, _ = _build(right, right_on)
+        return _probe_left(left, table, left_on, how)
+    table, unkeyed = _build(left, left_on)
+    return _probe_right(right, table, unkeyed, right_on, how)
+
+
+def _probe_left(left: Iterable, table: dict, accessor: Accessor,
+                how: str) -> Iterator[tuple[Any, Any]]:
+    outer = how == "left"
+    for obj in left:
+        key = accessor(obj)
+        matches = None if key is MISSING else table.get(key)
+        if matches:
+            for match in matches:
+                yield obj, match
+        elif outer:
+            yield obj, None
+
+
+def _probe_right(right: Iterable, table: dict, unkeyed: list,
+                 accessor: Accessor, how: str) -> Iterator[tuple[Any, Any]]:
+    matched = set()
+    for obj in right:
+        key = accessor(obj)
+        matches = None if key is MISSING else table.get(key)
+        if matches:
+            matched.add(key)
+            for match in matches:
+                yield match, obj
+    if how == "left":
+        for key, objs in table.items():
+            if key not in matched:
+                for obj in objs:
+                    yield obj, None
+        for obj in unkeyed:
+            yield obj, None
@@ -0,0 +1,168 @@
+"""Compact, file-backed sets for membership predicates on large key sets.
+
+A ``MembershipSet`` file holds a Bloom filter followed by the sorted,
+encoded keys. Membership tests check the Bloom filter first and only
+binary search the keys for candidates, so results are exact. The file is
+memory-mapped, so processes using the same file share its pages instead of
+each holding a copy of the keys.
+"""
+import bisect
+import hashlib
+import math
+import mmap
+import os
+import struct
+from array import array
+from typing import Any, Iterable, Optional
+
+_MAGIC = b"QFMS\x01"
+_HEADER = struct.Struct("<5sQIQ")
+
+
+def _encode(key: Any) -> Optional[bytes]:
+    # Keys equal to each other in a set share an encoding, as 1 and True do
+    if isinstance(key, float) and key.is_integer():
+        key = int(key)
+    if isinstance(key, int):
+        return b"i" + str(int(key)).encode()
+    if isinstance(key, str):
+        return b"s" + key.encode("utf-8", "surrogatepass")
+    if isinstance(key, bytes):
+        return b"b" + key
+    return None
+
+
+def _positions(encoded: bytes, num_bits: int, num_hashes: int):
+    digest = hashlib.blake2b(encoded, digest_size=16).digest()
+    first = int.from_bytes(digest[:8], "little")
+    second = int.from_bytes(digest[8:], "little") | 1
+    return [(first + i * second) % num_bits for i in range(num_hashes)]
+
+
+def _bloom_size(count: int, false_positive_rate: float) -> tuple[int, int]:
+    count = max(count, 1)
+    num_bits = math.ceil(-count * math.log(false_positive_rate)
+                         / math.log(2) ** 2)
+    num_bits = max(64, (num_bits + 7) // 8 * 8)
+    num_hashes = max(1, round(num_bits / count * math.log(2)))
+    return num_bits, num_hashes
+
+
+class _KeyView:
+    """Sequence of the encoded keys in the file, for ``bisect``."""
+
+    def __init__(self, buffer: memoryview, offsets: memoryview):
+        self._buffer = buffer
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self._buffer[self._offsets[i]:self._offsets[i + 1]])
+
+
+class MembershipSet:
+    """An exact, read-only set of integers, strings and bytes in a file.
+
+    Use it as the container of ``q_is_in``, e.g.
+    ``q_is_in(q.id, MembershipSet(path))``. Values of other types are never
+    members. Build the file with ``MembershipSet.build``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        magic, num_bits, num_hashes, count = _HEADER.unpack_from(buffer)
+        if magic != _MAGIC:
+            buffer.release()
+            self._mmap.close()
+            raise ValueError(f"{path} is not a membership set file")
+
+        self._num_bits = num_bits
+        self._num_hashes = num_hashes
+        self._count = count
+        start = _HEADER.size
+        self._bloom = buffer[start:start + num_bits // 8]
+        start += num_bits // 8
+        end = start + (count + 1) * 8
+        self._offsets = buffer[start:end].cast("Q")
+        self._keys = _KeyView(buffer, self._offsets)
+        self._buffer = buffer
+
+    @classmethod
+    def build(cls, keys: Iterable, path: str,
+              false_positive_rate: float = 0.01) -> "MembershipSet":
+        """Write the distinct ``keys`` to a file at ``path`` and open it.
+
+        ``false_positive_rate`` sizes the Bloom filter, and is the fraction
+        of non-members expected to need a binary search of the keys.
+        """
+        encoded = set()
+        for key in keys:
+            data = _encode(key)
+            if data is None:
+                raise TypeError(f"{key!r} can't be stored in a membership set")
+            encoded.add(data)
+        encoded = sorted(encoded)
+
+        num_bits, num_hashes = _bloom_size(len(encoded), false_positive_rate)
+        bloom = bytearray(num_bits // 8)
+        offsets = array("Q", [0])
+        for data in encoded:
+            for position in _positions(data, num_bits, num_hashes):
+                bloom[position >> 3] |= 1 << (position & 7)
+            offsets.append(offsets[-1] + len(data))
+        data_start = _HEADER.size + len(bloom) + len(offsets) * 8
+        offsets = array("Q", (offset + data_start for offset in offsets))
+
+        # Written to a temporary file first so readers never see a partial one
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(_HEADER.pack(_MAGIC, num_bits, num_hashes,
+                                    len(encoded)))
+            file.write(bloom)
+            file.write(offsets.tobytes())
+            for data in encoded:
+                file.write(data)
+        os.replace(temporary, path)
+        return cls(path)
+
+    def __enter__(self) -> "MembershipSet":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, key: Any) -> bool:
+        data = _encode(key)
+        if data is None or not self._might_contain(data):
+            return False
+        i = bisect.bisect_left(self._keys, data)
+        return i < self._count and self._keys[i] == data
+
+    def might_contain(self, key: Any) -> bool:
+        """Check only the Bloom filter, which may give false positives."""
+        data = _encode(key)
+        return data is not None and self._might_contain(data)
+
+    def _might_contain(self, data: bytes) -> bool:
+        bloom = self._bloom
+        for position in _positions(data, self._num_bits, self._num_hashes):
+            if not bloom[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def close(self):
+        self._offsets.release()
+        self._bloom.release()
+        self._buffer.release()
+        self._mmap.close()
+
+    def __repr__(self) -> str:
+        return f"MembershipSet({self.path!r})"
@@ -0,0 +1,137 @@
+import collections
+import operator
+from typing import Any, Callable, Hashable, Iterable, Iterator, Optional
+
+from query_filter.filter import _prepare
+from query_filter.query import MISSING, Query, lookup_value
+
+_DROP = object()
+
+
+def _dispatch_table(preds: list) -> Optional[tuple[tuple, dict]]:
+    """Map values to bucket names if every predicate is ``==`` on one path."""
+    lookups = None
+    table = {}
+    for name, pred in preds:
+        if (getattr(pred, "func", None) is not operator.eq
+                or getattr(pred, "lookups", None) is None
+                or pred.missing not in (None, "false")):
+            return None
+        if lookups is None:
+            lookups = tuple(pred.lookups)
+        elif tuple(pred.lookups) != lookups:
+            return None
+        (criterion,) = pred.criteria
+        try:
+            table.setdefault(criterion, name)
+        except TypeError:
+            return None
+    return lookups, table
+
+
+def _router(buckets: dict, default: Optional[Hashable]
+            ) -> Callable[[Any], Any]:
+    names = list(buckets)
+    preds = list(zip(names, _prepare(tuple(buckets.values()))))
+    fallback = _DROP if default is None else default
+    dispatch = _dispatch_table(preds)
+
+    def route(obj: Any) -> Any:
+        for name, pred in preds:
+            if pred(obj):
+                return name
+        return fallback
+
+    if dispatch is None:
+        return route
+
+    lookups, table = dispatch
+
+    def dispatch_route(obj: Any) -> Any:
+        value = lookup_value(obj, lookups)
+        if value is MISSING:
+            return fallback
+        try:
+            return table.get(value, fallback)
+        except TypeError:
+            # Unhashable values may still compare equal to a criterion
+            return route(obj)
+
+    return dispatch_route
+
+
+class _Buckets:
+    """Routes objects from a shared iterator into per-bucket queues."""
+
+    def __init__(self, objects: Iterable, route: Callable, names: Iterable):
+        self._objects = iter(objects)
+        self._route = route
+        self._queues = {name: collections.deque() for name in names}
+
+    def _advance(self) -> bool:
+        for obj in self._objects:
+            name = self._route(obj)
+            if name is not _DROP:
+                self._queues[name].append(obj)
+                return True
+        return False
+
+    def bucket(self, name: Hashable) -> Iterator[Any]:
+        queue = self._queues[name]
+        while True:
+            if queue:
+                yield queue.popleft()
+            elif not self._advance():
+                return
+
+
+def q_partition(objects: Iterable, buckets: dict[Hashable, Any],
+                default: Optional[Hashable] = None, lazy: bool = False
+                ) -> dict[Hashable, Any]:
+    """Split objects between named buckets in a single pass.
+
+    Each object goes into the first bucket, in the order of ``buckets``,
+    whose predicate is true, or into a bucket named ``default`` if none is.
+    Objects matching no predicate are dropped if ``default`` is None. When
+    every predicate is ``==`` on the same path, the value at that path is
+    looked up once per object and the bucket found by hashing it.
+
+    Returns a dictionary of lists, or, if ``lazy`` is true, of iterators
+    that consume ``objects`` as needed. Objects routed to buckets that
+    aren't being iterated are queued until they are.
+    """
+    route = _router(buckets, default)
+    names = list(buckets)
+    if default is not None and default not in buckets:
+        names.append(default)
+
+    if lazy:
+        split = _Buckets(objects, route, names)
+        return {name: split.bucket(name) for name in names}
+
+    results = {name: [] for name in names}
+    appends = {name: bucket.append for name, bucket in results.items()}
+    for obj in objects:
+        name = route(obj)
+        if name is not _DROP:
+            appends[name](obj)
+    return results
+
+
+def q_partition_by(objects: Iterable, key: Query) -> dict[Hashable, list]:
+    """Split objects into lists by the value at ``key``, in a single pass.
+
+    Buckets are ordered by the first object with each value. Objects
+    without a value at ``key`` are left out.
+    """
+    lookups = tuple(key)
+    results = {}
+    for obj in objects:
+        value = lookup_value(obj, lookups)
+        if value is MISSING:
+            continue
+        bucket = results.get(value)
+        if bucket is None:
+            bucket = results[value] = []
+        bucket.append(obj)
+    return results
@@ -0,0 +1,133 @@
+"""Chained filtering, selecting, deduplicating and limiting stages.
+
+A pipeline's stages run in one loop over its source, each item passing
+through the stages in turn, rather than as a chain of generators resumed
+once per stage per item. Items are read from the source one at a time as
+the pipeline is iterated, and no further items are read once a limit is
+reached.
+"""
+import dataclasses
+from typing import Any, Iterable, Iterator, Optional
+
+from query_filter.filter import _prepare, _unseen
+from query_filter.query import _COMBINE_EVERY, Query, _combined, describe
+from query_filter.select import Fields, _fields, _row_function
+
+_WHERE, _SELECT, _DISTINCT, _LIMIT = range(4)
+
+
+@dataclasses.dataclass
+class StageStats:
+    """Counts of the items that reached and left a stage of a pipeline."""
+    description: str
+    items_in: int = 0
+    items_out: int = 0
+
+
+class Pipeline:
+    """A source of objects followed by stages, built by chaining methods.
+
+    Each method returns a new pipeline with a stage added, leaving this one
+    unchanged. Iterating a pipeline runs its stages over its source.
+    """
+
+    def __init__(self, source: Iterable, stages: tuple = ()):
+        self._source = source
+        self._stages = stages
+        self._counts = [0] * (len(stages) + 1)
+
+    def _add(self, kind: int, description: str, argument: Any
+             ) -> "Pipeline":
+        return Pipeline(self._source,
+                        self._stages + ((kind, description, argument),))
+
+    def where(self, *preds: Any, missing: Optional[str] = None
+              ) -> "Pipeline":
+        """Keep the objects for which all ``preds`` are true.
+
+        ``missing`` sets a missing value policy, as for ``q_filter_all``.
+        Consecutive ``where`` stages are fused into one.
+        """
+        preds = _prepare(preds, missing)
+        if self._stages and self._stages[-1][0] == _WHERE:
+            preds = self._stages[-1][2] + preds
+            stages = self._stages[:-1]
+        else:
+            stages = self._stages
+        description = f"where({', '.join(map(describe, preds))})"
+        return Pipeline(self._source,
+                        stages + ((_WHERE, description, preds),))
+
+    def select(self, fields: Fields, output: str = "dict",
+               default: Any = None) -> "Pipeline":
+        """Replace each object with the values at ``fields``, as a
+        ``"dict"``, ``"tuple"`` or ``"namedtuple"`` row like ``q_select``
+        returns."""
+        names, paths = _fields(fields)
+        row = _row_function(names, paths, output, default)
+        return self._add(_SELECT, f"select({', '.join(names)})", row)
+
+    def distinct(self, *keys: Query, window: Optional[int] = None
+                 ) -> "Pipeline":
+        """Keep the first object with each distinct value at ``keys``, as
+        ``q_distinct`` does."""
+        description = f"distinct({', '.join(map(repr, keys))})"
+        return self._add(_DISTINCT, description, (keys, window))
+
+    def limit(self, count: int) -> "Pipeline":
+        """Stop after ``count`` objects have passed this stage."""
+        if count < 0:
+            raise ValueError("limit must not be negative")
+        return self._add(_LIMIT, f"limit({count})", count)
+
+    def stats(self) -> list[StageStats]:
+        """Return counts of the items in and out of each stage during the
+        most recent, or current, iteration of this pipeline."""
+        read, *dropped = self._counts
+        results = []
+        for (_, description, _), stage_dropped in zip(self._stages, dropped):
+            results.append(StageStats(description, read,
+                                      read - stage_dropped))
+            read -= stage_dropped
+        return results
+
+    def __iter__(self) -> Iterator[Any]:
+        steps = []
+        left = [0] * (len(self._stages) + 1)
+        for position, (kind, _, argument) in enumerate(self._stages, 1):
+            if kind == _WHERE:
+                steps.append((_WHERE, _combined(_COMBINE_EVERY, argument),
+                              position))
+            elif kind == _DISTINCT:
+                # Keys seen are remembered for one iteration
+                steps.append((_WHERE, _unseen(*argument), position))
+            else:
+                steps.append((kind, argument, position))
+                if kind == _LIMIT:
+                    left[position] = argument
+        # Only items read and items dropped are counted, once per item
+        self._counts = counts = [0] * (len(self._stages) + 1)
+        return self._run(tuple(steps), left, counts)
+
+    def _run(self, steps: tuple, left: list, counts: list) -> Iterator[Any]:
+        if any(kind == _LIMIT and not left[position]
+               for kind, _, position in steps):
+            return
+        for obj in self._source:
+            counts[0] += 1
+            stop = False
+            for kind, step, position in steps:
+                if kind == _WHERE:
+                    if not step(obj):
+                        counts[position] += 1
+                        break
+                elif kind == _SELECT:
+                    obj = step(obj)
+                else:
+                    left[position] -= 1
+                    if not left[position]:
+                        stop = True
+            else:
+                yield obj
+            if stop:
+                return
@@ -0,0 +1,237 @@
+"""Choosing between a scan, an index and a columnar snapshot for a filter.
+
+The planner estimates the cost of each strategy available for a call from
+the size of the collection and, for a sample of its objects, the cost and
+selectivity of each predicate. Costs are in seconds, using timings for
+index positions and snapshot columns measured on typical hardware, so the
+estimates are only good for comparing strategies.
+"""
+import collections
+import dataclasses
+import math
+import operator
+import time
+from typing import Any, Optional, Sequence
+
+from query_filter import profiling, query
+from query_filter.columnar import ColumnarSnapshot
+from query_filter.explain import PredicateExplanation, explain
+from query_filter.filter import _ensure_callable, q_filter_all
+from query_filter.index import Index
+
+STRATEGIES = ("scan", "index", "columnar")
+
+# Collections smaller than this are scanned without planning
+SCAN_BELOW = 10_000
+
+_SAMPLE_SIZE = 128
+
+# Time to produce and look up one position from an index or snapshot, and
+# from an index range, whose positions are sorted
+_POSITION_COST = 90e-9
+_RANGE_POSITION_COST = 200e-9
+# Time to evaluate a predicate per value of a typed column, or per code of a
+# column of dictionary encoded values, plus the time to evaluate it for each
+# value in the dictionary
+_COLUMN_COST = 100e-9
+_CODE_COST = 25e-9
+_VALUE_COST = 150e-9
+
+_EQUALITY_FUNCS = {operator.eq, query.is_in.func}
+
+
+@dataclasses.dataclass
+class Plan:
+    """The strategy chosen for a call to ``q_filter_auto``, and why.
+
+    ``costs`` maps each strategy considered to its estimated cost in
+    seconds, from a sample of ``sample_size`` objects.
+    """
+    strategy: str
+    reason: str
+    costs: dict[str, float] = dataclasses.field(default_factory=dict)
+    sample_size: int = 0
+
+
+def _sample(objects: Sequence) -> list:
+    step = len(objects) / _SAMPLE_SIZE
+    return [objects[int(i * step)] for i in range(_SAMPLE_SIZE)]
+
+
+def _selectivity(explanation: PredicateExplanation, sample_size: int
+                 ) -> float:
+    # A predicate true for none of the sample may still be true for some
+    return max(explanation.selectivity, 1 / (sample_size + 1))
+
+
+def _chain_cost(explanations: list, sample_size: int) -> float:
+    """Cost per object of evaluating predicates in turn until one is false."""
+    cost = 0.0
+    reached = 1.0
+    for explanation in explanations:
+        cost += reached * explanation.cost
+        reached *= _selectivity(explanation, sample_size)
+    return cost
+
+
+def _column_cost(snapshot: ColumnarSnapshot, pred: Any, length: int,
+                 explanation: PredicateExplanation) -> float:
+    combined = getattr(pred, "preds", None)
+    if combined is not None:
+        # Each inner predicate's cost is estimated as a share of the whole
+        inner = [_ensure_callable(inner) for inner in combined]
+        share = dataclasses.replace(explanation,
+                                    cost=explanation.cost / len(inner))
+        return length * _CODE_COST + sum(
+            _column_cost(snapshot, pred, length, share) for pred in inner
+        )
+    column = snapshot._column(tuple(pred.lookups))
+    if column.dictionary is None:
+        return length * _COLUMN_COST
+    return (length * _CODE_COST
+            + len(column.dictionary) * (explanation.cost + _VALUE_COST))
+
+
+def _translatable(snapshot: ColumnarSnapshot, pred: Any) -> bool:
+    try:
+        snapshot.plan(pred)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _costs(objects: Sequence, preds: list, index: Optional[Index],
+           snapshot: Optional[ColumnarSnapshot]) -> tuple[dict, int]:
+    length = len(objects)
+    sample = _sample(objects)
+    explanations = explain(*preds, sample=sample).predicates
+
+    # Predicates are timed one at a time by explain, which costs more per
+    # call than a filter does, so their costs are scaled to a timed scan.
+    # The scan isn't a filter function, so an active profiler doesn't count
+    # its calls.
+    combined = query._combined(query._COMBINE_EVERY, tuple(preds))
+    clock = time.perf_counter
+    timings = []
+    for _ in range(3):
+        start = clock()
+        collections.deque(filter(combined, sample), maxlen=0)
+        timings.append(clock() - start)
+    scan = min(timings) / len(sample)
+    estimate = _chain_cost(explanations, len(sample))
+    if estimate > 0:
+        explanations = [dataclasses.replace(explanation,
+                                            cost=explanation.cost * scan
+                                            / estimate)
+                        for explanation in explanations]
+    costs = {"scan": length * scan}
+
+    if index is not None and index.length == length:
+        indexed = [index.can_answer(pred) for pred in preds]
+        if any(indexed):
+            cost = 0.0
+            candidates = length
+            for pred, explanation, answered in zip(preds, explanations,
+                                                   indexed):
+                if answered:
+                    selectivity = _selectivity(explanation, len(sample))
+                    position_cost = (_POSITION_COST
+                                     if pred.func in _EQUALITY_FUNCS
+                                     else _RANGE_POSITION_COST)
+                    cost += math.log2(length) * explanation.cost
+                    cost += length * selectivity * position_cost
+                    candidates *= selectivity
+            others = [explanation for explanation, answered
+                      in zip(explanations, indexed) if not answered]
+            costs["index"] = cost + candidates * _chain_cost(others,
+                                                             len(sample))
+
+    if snapshot is not None and len(snapshot) == length:
+        translated = [_translatable(snapshot, pred) for pred in preds]
+        if any(translated):
+            cost = 0.0
+            candidates = length
+            for pred, explanation, done in zip(preds, explanations,
+                                               translated):
+                if done:
+                    cost += _column_cost(snapshot, pred, length, explanation)
+                    candidates *= _selectivity(explanation, len(sample))
+            others = [explanation for explanation, done
+                      in zip(explanations, translated) if not done]
+            costs["columnar"] = cost + candidates * (
+                _POSITION_COST + _chain_cost(others, len(sample))
+            )
+
+    return costs, len(sample)
+
+
+def plan_filter(objects: Any, *preds: Any, index: Optional[Index] = None,
+                snapshot: Optional[ColumnarSnapshot] = None,
+                strategy: Optional[str] = None) -> Plan:
+    """Choose how ``q_filter_auto`` will filter ``objects`` by ``preds``.
+
+    Collections that aren't sequences, and those with fewer than
+    ``SCAN_BELOW`` objects, are scanned without sampling them. Otherwise the
+    strategy with the lowest estimated cost is chosen, from a scan,
+    ``index`` if it can answer any of the predicates, and ``snapshot`` if
+    it can evaluate any.
+    Both must have been built from ``objects``. ``strategy`` overrides the
+    choice, raising ValueError if it isn't available.
+    """
+    if strategy is not None and strategy not in STRATEGIES:
+        raise ValueError(f"strategy must be one of {STRATEGIES}, not "
+                         f"{strategy!r}")
+    if strategy == "scan":
+        return Plan("scan", "requested")
+    sequence = hasattr(objects, "__len__") and hasattr(objects, "__getitem__")
+    if strategy is None:
+        if index is None and snapshot is None:
+            return Plan("scan", "no index or snapshot")
+        if not sequence:
+            return Plan("scan", "not a sequence")
+        if len(objects) < SCAN_BELOW:
+            return Plan("scan", "small collection")
+    elif not sequence:
+        raise ValueError(f"the {strategy} strategy needs a sequence")
+    if not len(objects):
+        return Plan("scan", "empty collection")
+
+    costs, sample_size = _costs(objects,
+                                [_ensure_callable(pred) for pred in preds],
+                                index, snapshot)
+    if strategy is not None:
+        if strategy not in costs:
+            raise ValueError(f"the {strategy} strategy can't be used for "
+                             f"these predicates")
+        return Plan(strategy, "requested", costs, sample_size)
+    cheapest = min(costs, key=costs.get)
+    return Plan(cheapest, "lowest estimated cost", costs, sample_size)
+
+
+def q_filter_auto(objects: Any, *preds: Any, index: Optional[Index] = None,
+                  snapshot: Optional[ColumnarSnapshot] = None,
+                  strategy: Optional[str] = None) -> list[Any]:
+    """Return the objects for which all ``preds`` are true, as a list, using
+    the strategy chosen by ``plan_filter``.
+
+    The result is the same whichever strategy is used, as predicates that
+    the index or snapshot can't evaluate exactly are evaluated against the
+    objects. If a profiler is active, the plan is recorded by it.
+    """
+    plan = plan_filter(objects, *preds, index=index, snapshot=snapshot,
+                       strategy=strategy)
+    profiler = profiling.active_profiler()
+    if profiler is not None:
+        profiler.record_plan(plan)
+
+    if plan.strategy == "index":
+        return index.filter(objects, *preds)
+    if plan.strategy == "columnar":
+        preds = [_ensure_callable(pred) for pred in preds]
+        translated = [_translatable(snapshot, pred) for pred in preds]
+        others = [pred for pred, done in zip(preds, translated) if not done]
+        preds = [pred for pred, done in zip(preds, translated) if done]
+        candidates = [objects[position]
+                      for position in snapshot.filter(*preds)]
+        return list(q_filter_all(candidates, *others))
+    return list(q_filter_all(objects, *preds))
@@ -0,0 +1,110 @@
+import dataclasses
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from query_filter.query import MISSING, describe, lookup_value
+
+
+@dataclasses.dataclass
+class PredicateStats:
+    """Counters for a predicate passed to one of the filter functions.
+
+    ``missing`` counts evaluations that failed because the queried value
+    was not present, and ``failed`` those that failed for any other reason.
+    ``time`` is the cumulative time spent evaluating the predicate in seconds.
+    """
+    description: str
+    calls: int = 0
+    passed: int = 0
+    failed: int = 0
+    missing: int = 0
+    time: float = 0.0
+
+
+class Profiler:
+    """Records per-predicate statistics for filters created while active.
+
+    Filters created by ``q_filter_all``, ``q_filter_any`` and
+    ``q_filter_not_any`` while the profiler is active wrap their predicates
+    in instrumented versions. Filters created while no profiler is active
+    call their predicates directly, so profiling costs nothing when off.
+
+    ``callback`` is called with the list of statistics when the profiler
+    stops, which is convenient for exporting them to a metrics system.
+
+    The plans chosen by ``q_filter_auto`` while the profiler is active are
+    recorded too, and returned by ``plans``.
+    """
+
+    def __init__(self,
+                 callback: Optional[Callable[[list[PredicateStats]], Any]] = None):
+        self.callback = callback
+        self._stats = {}
+        self._plans = []
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        global _active
+        if _active is not None:
+            raise RuntimeError("Another profiler is already active")
+        _active = self
+
+    def stop(self):
+        global _active
+        if _active is self:
+            _active = None
+        if self.callback is not None:
+            self.callback(self.stats())
+
+    def stats(self) -> list[PredicateStats]:
+        return [stats for _, stats in self._stats.values()]
+
+    def plans(self) -> list:
+        return list(self._plans)
+
+    def record_plan(self, plan: Any):
+        self._plans.append(plan)
+
+    def reset(self):
+        self._stats.clear()
+        self._plans.clear()
+
+    def instrument(self, preds: Iterable[Callable]) -> tuple:
+        return tuple(self._instrument(pred) for pred in preds)
+
+    def _instrument(self, pred: Callable) -> Callable:
+        if id(pred) not in self._stats:
+            # The predicate is stored to keep its id from being reused
+            self._stats[id(pred)] = (pred, PredicateStats(describe(pred)))
+        _, stats = self._stats[id(pred)]
+        lookups = getattr(pred, "lookups", None)
+        clock = time.perf_counter
+
+        def instrumented(obj: Any):
+            start = clock()
+            result = pred(obj)
+            stats.time += clock() - start
+            stats.calls += 1
+            if result:
+                stats.passed += 1
+            elif (lookups is not None
+                  and lookup_value(obj, lookups) is MISSING):
+                stats.missing += 1
+            else:
+                stats.failed += 1
+            return result
+
+        return instrumented
+
+
+_active = None
+
+
+def active_profiler() -> Optional[Profiler]:
+    return _active
@@ -1,10 +1,12 @@
 import dataclasses
 import enum
 import operator
+import os
 import re
+import types
 from collections.abc import Container
 from operator import getitem
-from typing import Any, Callable, Hashable, Iterable, Iterator
+from typing import Any, Callable, Hashable, Iterable, Iterator, Optional
 
 
 class LookupType(enum.Enum):
@@ -57,6 +59,27 @@ class Query:
     def __invert__(self) -> Callable[[Any], bool]:
         return negate(self)
 
+    def __neg__(self) -> "SortKey":
+        return SortKey(self, descending=True)
+
+    def __pos__(self) -> "SortKey":
+        return SortKey(self)
+
+    def __repr__(self) -> str:
+        parts = ["q"]
+        for lookup in self._lookups:
+            if lookup.lookup_type == LookupType.ATTR:
+                parts.append(f".{lookup.key}")
+            else:
+                parts.append(f"[{lookup.key!r}]")
+        return "".join(parts)
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class SortKey:
+    query: Query
+    descending: bool = False
+
 
 def q_contains(query: Query, item: Any) -> Callable[[Container], bool]:
     return contains(query, item)
@@ -79,38 +102,391 @@ def q_is_not(query: Query, criterion: Any) -> Callable[[Any], bool]:
 
 
 class ObjNotFound(Exception):
-    """Raised when the requested attr or item is not found."""
+    """Raised by retrieve_value when the requested attr or item is not found.
+
+    lookup_value returns the MISSING sentinel instead, which is cheaper
+    when many objects lack the requested value.
+    """
+
+
+class _Missing:
+    def __repr__(self):
+        return "MISSING"
+
+    def __bool__(self):
+        return False
 
 
-def retrieve_value(obj: Any, *lookups: Lookup):
+MISSING = _Missing()
+
+
+class _Unknown:
+    def __repr__(self):
+        return "UNKNOWN"
+
+    def __bool__(self):
+        return False
+
+
+# The result of a predicate with the "skip" policy on a missing value. It's
+# falsy, and combinators treat it as neither true nor false.
+UNKNOWN = _Unknown()
+
+MISSING_POLICIES = ("false", "true", "raise", "skip")
+
+_MISSING_RESULTS = {None: False, "false": False, "true": True, "skip": UNKNOWN}
+
+
+def _py_lookup_value(obj: Any, lookups: Iterable[Lookup]):
     value = obj
     try:
         for lookup in lookups:
-            if lookup.lookup_type == LookupType.ATTR:
-                value = getattr(value, lookup.key)
-            elif lookup.lookup_type == LookupType.ITEM:
-                value = getitem(value, lookup.key)
+            lookup_type = lookup.lookup_type
+            key = lookup.key
+            if lookup_type is LookupType.ITEM:
+                value_type = type(value)
+                if value_type is dict:
+                    value = value.get(key, MISSING)
+                    if value is MISSING:
+                        return MISSING
+                elif ((value_type is list or value_type is tuple)
+                      and type(key) is int):
+                    if not -len(value) <= key < len(value):
+                        return MISSING
+                    value = value[key]
+                else:
+                    value = getitem(value, key)
+            elif lookup_type is LookupType.ATTR:
+                value = getattr(value, key, MISSING)
+                if value is MISSING:
+                    return MISSING
             else:
-                raise ValueError(f"{lookup.lookup_type} is not a valid lookup type")
+                raise ValueError(f"{lookup_type} is not a valid lookup type")
     except (IndexError, KeyError, TypeError, AttributeError):
-        raise ObjNotFound()
+        return MISSING
 
     return value
 
 
-def query_predicate(func: Callable):
+def _py_retrieve_value(obj: Any, *lookups: Lookup):
+    value = _py_lookup_value(obj, lookups)
+    if value is MISSING:
+        raise ObjNotFound()
+
+    return value
 
-    def pred_maker(lookups: Iterable[Lookup], *criteria: Any):
+
+@dataclasses.dataclass(frozen=True)
+class StepStats:
+    lookup: Lookup
+    hits: int
+    misses: int
+    types: tuple
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _item_getter(value_type: type, key: Hashable) -> Callable[[Any], Any]:
+    if value_type is dict:
+        return operator.methodcaller("get", key, MISSING)
+
+    if (value_type is list or value_type is tuple) and type(key) is int:
+        def sequence_getter(value):
+            if -len(value) <= key < len(value):
+                return value[key]
+            return MISSING
+
+        return sequence_getter
+
+    return operator.itemgetter(key)
+
+
+def _attr_getter(value_type: type, key: str) -> Callable[[Any], Any]:
+    if "." in key:
+        return lambda value: getattr(value, key)
+
+    generic = operator.attrgetter(key)
+    if (value_type.__getattribute__ is not object.__getattribute__
+            or hasattr(value_type, "__getattr__")):
+        return generic
+
+    for klass in value_type.__mro__:
+        if key in klass.__dict__:
+            descriptor = klass.__dict__[key]
+            break
+    else:
+        # Instance attributes may be missing, and getattr with a default
+        # doesn't create an AttributeError for each object without one
+        return lambda value: getattr(value, key, MISSING)
+
+    if isinstance(descriptor, property) and descriptor.fget is not None:
+        return descriptor.fget
+    if isinstance(descriptor, types.MemberDescriptorType):
+        return descriptor.__get__
+    return generic
+
+
+class _Step:
+    __slots__ = ("lookup", "cache", "generic", "hits", "misses")
+
+    max_types = 4
+
+    def __init__(self, lookup: Lookup):
+        self.lookup = lookup
+        self.cache = {}
+        self.generic = None
+        self.hits = 0
+        self.misses = 0
+
+    def specialise(self, value_type: type) -> Callable[[Any], Any]:
+        """Return a getter for a type that isn't cached, building one for
+        each of the first few types and then one generic getter for all
+        the others."""
+        if self.generic is not None:
+            self.hits += 1
+            return self.generic
+        self.misses += 1
+        full = len(self.cache) >= self.max_types
+        if full:
+            value_type = object
+        lookup_type = self.lookup.lookup_type
+        key = self.lookup.key
+        if lookup_type is LookupType.ITEM:
+            getter = _item_getter(value_type, key)
+        elif lookup_type is LookupType.ATTR:
+            if type(key) is not str:
+                raise TypeError("attribute name must be string")
+            getter = _attr_getter(value_type, key)
+        else:
+            raise ValueError(f"{lookup_type} is not a valid lookup type")
+
+        if full:
+            self.generic = getter
+        else:
+            self.cache[value_type] = getter
+        return getter
+
+
+class Accessor:
+    """Compiled lookups that specialise each step on the type it sees.
+
+    Each step keeps an inline cache mapping the types of the values it has
+    looked up to a getter specialised for that type, such as ``dict.get``
+    for dictionaries or the slot descriptor of a class using ``__slots__``.
+    Types beyond the first few seen by a step use the generic getter.
+    Specialisations assume classes are not modified once they've been seen.
+
+    Calling an accessor returns the value or MISSING.
+    """
+
+    def __init__(self, lookups: Iterable[Lookup]):
+        self.lookups = tuple(lookups)
+        self._steps = tuple(_Step(lookup) for lookup in self.lookups)
+
+    def __call__(self, obj: Any):
+        value = obj
+        try:
+            for step in self._steps:
+                getter = step.cache.get(type(value))
+                if getter is None:
+                    getter = step.specialise(type(value))
+                else:
+                    step.hits += 1
+                value = getter(value)
+                if value is MISSING:
+                    return MISSING
+        except (IndexError, KeyError, TypeError, AttributeError):
+            return MISSING
+
+        return value
+
+    def stats(self) -> list[StepStats]:
+        return [
+            StepStats(lookup=step.lookup,
+                      hits=step.hits,
+                      misses=step.misses,
+                      types=tuple(step.cache))
+            for step in self._steps
+        ]
+
+
+class Resolver:
+    """Resolves several paths against an object, sharing common prefixes.
+
+    Paths are compiled into a tree of single-step accessors, so a prefix
+    shared by several paths is looked up once per object. Calling a
+    resolver returns a list with the value, or MISSING, for each path.
+    """
+
+    def __init__(self, paths: Iterable[Iterable[Lookup]]):
+        self.paths = [tuple(path) for path in paths]
+        slots = {(): 0}
+        self._steps = []
+        for path in self.paths:
+            for end in range(1, len(path) + 1):
+                if path[:end] not in slots:
+                    slots[path[:end]] = len(slots)
+                    self._steps.append((slots[path[:end - 1]],
+                                        Accessor(path[end - 1:end])))
+        self._slots = [slots[path] for path in self.paths]
+
+    def __call__(self, obj: Any) -> list:
+        values = [obj]
+        append = values.append
+        for parent, accessor in self._steps:
+            value = values[parent]
+            append(MISSING if value is MISSING else accessor(value))
+        return [values[slot] for slot in self._slots]
+
+
+def _py_predicate(func: Callable, lookups: tuple, criteria: tuple,
+                  missing: Optional[str] = None):
+    if missing != "raise" and missing not in _MISSING_RESULTS:
+        raise ValueError(
+            f"missing must be one of {MISSING_POLICIES}, not {missing!r}"
+        )
+    accessor = Accessor(lookups)
+    raise_missing = missing == "raise"
+    missing_result = _MISSING_RESULTS.get(missing)
+
+    # Criteria are passed individually where possible, rather than unpacked
+    # into a new tuple of arguments on every call
+    if len(criteria) == 0:
+        def pred(obj: Any):
+            evaluated = accessor(obj)
+            if evaluated is MISSING:
+                if raise_missing:
+                    raise ObjNotFound(lookups)
+                return missing_result
+            return func(evaluated)
+    elif len(criteria) == 1:
+        (criterion,) = criteria
 
         def pred(obj: Any):
-            try:
-                evaluated = retrieve_value(obj, *lookups)
-            except ObjNotFound:
-                return False
+            evaluated = accessor(obj)
+            if evaluated is MISSING:
+                if raise_missing:
+                    raise ObjNotFound(lookups)
+                return missing_result
+            return func(evaluated, criterion)
+    else:
+        def pred(obj: Any):
+            evaluated = accessor(obj)
+            if evaluated is MISSING:
+                if raise_missing:
+                    raise ObjNotFound(lookups)
+                return missing_result
             return func(evaluated, *criteria)
 
-        return pred
+    pred.func = func
+    pred.lookups = lookups
+    pred.criteria = criteria
+    pred.missing = missing
+    pred.accessor = accessor
+    return pred
+
+
+# Modes of _combined. The first three are the predicates of the filter
+# functions, and the others q_all, q_any and q_not.
+(_COMBINE_EVERY, _COMBINE_SOME, _COMBINE_NONE, _COMBINE_Q_ALL, _COMBINE_Q_ANY,
+ _COMBINE_Q_NOT) = range(6)
+
+
+def _py_combined(mode: int, preds: tuple) -> Callable[[Any], Any]:
+    if mode == _COMBINE_EVERY:
+        def combined(obj: Any):
+            for pred in preds:
+                if not pred(obj):
+                    return False
+            return True
+    elif mode == _COMBINE_SOME:
+        def combined(obj: Any):
+            for pred in preds:
+                if pred(obj):
+                    return True
+            return False
+    elif mode == _COMBINE_NONE:
+        def combined(obj: Any):
+            # An unknown result means the object isn't known to match none
+            for pred in preds:
+                result = pred(obj)
+                if result or result is UNKNOWN:
+                    return False
+            return True
+    elif mode == _COMBINE_Q_ALL:
+        def combined(obj: Any):
+            unknown = False
+            for pred in preds:
+                result = pred(obj)
+                if not result:
+                    if result is not UNKNOWN:
+                        return False
+                    unknown = True
+            return UNKNOWN if unknown else True
+    elif mode == _COMBINE_Q_ANY:
+        def combined(obj: Any):
+            unknown = False
+            for pred in preds:
+                result = pred(obj)
+                if result:
+                    return True
+                if result is UNKNOWN:
+                    unknown = True
+            return UNKNOWN if unknown else False
+    elif mode == _COMBINE_Q_NOT:
+        if len(preds) != 1:
+            raise ValueError("q_not takes exactly one predicate")
+        (inner,) = preds
+
+        def combined(obj: Any):
+            result = inner(obj)
+            if result is UNKNOWN:
+                return UNKNOWN
+            return not result
+    else:
+        raise ValueError(f"{mode} is not a valid mode")
+    return combined
+
+
+def _setup_speedups(speedups):
+    speedups.setup(LookupType.ATTR, LookupType.ITEM, ObjNotFound, MISSING,
+                   UNKNOWN)
+
+
+def _load_speedups():
+    if os.environ.get("QUERY_FILTER_PURE_PYTHON"):
+        return None
+    try:
+        from query_filter import _speedups
+    except ImportError:
+        return None
+    _setup_speedups(_speedups)
+    return _speedups
 
+
+_speedups = _load_speedups()
+
+if _speedups is None:
+    lookup_value = _py_lookup_value
+    retrieve_value = _py_retrieve_value
+    _predicate = _py_predicate
+    _combined = _py_combined
+else:
+    lookup_value = _speedups.lookup_value
+    retrieve_value = _speedups.retrieve_value
+    _predicate = _speedups.Predicate
+    _combined = _speedups.Combined
+
+
+def query_predicate(func: Callable):
+
+    def pred_maker(lookups: Iterable[Lookup], *criteria: Any):
+        return _predicate(func, tuple(lookups), criteria)
+
+    pred_maker.func = func
     return pred_maker
 
 
@@ -123,6 +499,7 @@ ge = query_predicate(operator.ge)
 is_ = query_predicate(operator.is_)
 is_not = query_predicate(operator.is_not)
 contains = query_predicate(operator.contains)
+truthy = query_predicate(operator.truth)
 
 
 @query_predicate
@@ -138,3 +515,76 @@ def negate(obj: Any):
 @query_predicate
 def regex(obj: str | bytes, pattern: str | bytes):
     return bool(re.search(pattern, obj))
+
+
+_OPERATOR_SYMBOLS = {
+    operator.lt: "<",
+    operator.le: "<=",
+    operator.eq: "==",
+    operator.ne: "!=",
+    operator.gt: ">",
+    operator.ge: ">=",
+}
+
+_FUNCTION_NAMES = {
+    operator.is_: "q_is",
+    operator.is_not: "q_is_not",
+    operator.contains: "q_contains",
+    is_in.func: "q_is_in",
+    regex.func: "q_matches_regex",
+}
+
+
+def describe(pred: Any) -> str:
+    """Return a readable, Python-like description of a predicate."""
+    if isinstance(pred, Query):
+        return repr(pred)
+
+    combined = getattr(pred, "preds", None)
+    if combined is not None:
+        described = ", ".join(describe(inner) for inner in combined)
+        return f"{pred.combinator}({described})"
+
+    func = getattr(pred, "func", None)
+    lookups = getattr(pred, "lookups", None)
+    if func is None or lookups is None:
+        return getattr(pred, "__qualname__", repr(pred))
+
+    description = _describe_path_predicate(func, lookups,
+                                           getattr(pred, "criteria", ()))
+    missing = getattr(pred, "missing", None)
+    if missing is not None:
+        return f"q_missing({description}, {missing!r})"
+    return description
+
+
+def _describe_path_predicate(func: Callable, lookups: tuple,
+                             criteria: tuple) -> str:
+    path = repr(Query(tuple(lookups)))
+    if func is operator.truth:
+        return path
+    if func is negate.func:
+        return f"~{path}"
+    if func in _OPERATOR_SYMBOLS and len(criteria) == 1:
+        return f"{path} {_OPERATOR_SYMBOLS[func]} {criteria[0]!r}"
+
+    name = _FUNCTION_NAMES.get(func, getattr(func, "__name__", repr(func)))
+    arguments = ", ".join([path, *map(repr, criteria)])
+    return f"{name}({arguments})"
+
+
+PREDICATE_MAKERS = {
+    "lt": lt,
+    "le": le,
+    "eq": eq,
+    "ne": ne,
+    "gt": gt,
+    "ge": ge,
+    "is": is_,
+    "is_not": is_not,
+    "contains": contains,
+    "is_in": is_in,
+    "negate": negate,
+    "regex": regex,
+    "truthy": truthy,
+}
@@ -0,0 +1,155 @@
+"""Filtering large sources with checkpoints, resuming after interruptions.
+
+A resumable filter writes the records matching its predicates to a
+JSON-lines file and periodically saves a checkpoint of its progress: its
+position in the source, the size of the output, counts of the records read
+and written, and statistics for each predicate. Started again with the
+same checkpoint file, it truncates the output to the checkpointed size and
+continues from the checkpointed position, so its output is the same as if
+it had never been interrupted.
+"""
+import dataclasses
+import json
+import os
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+
+from query_filter.filter import _ensure_callable, _with_missing
+from query_filter.profiling import PredicateStats, Profiler
+from query_filter.query import _COMBINE_EVERY, _combined, describe
+
+Source = Union[str, os.PathLike, Callable[[int], Iterable]]
+
+
+@dataclasses.dataclass
+class Checkpoint:
+    """Progress of a resumable filter, as saved in its checkpoint file.
+
+    ``position`` is a byte offset into a file source, or the number of
+    records taken from a callable source. ``output_size`` is the size of
+    the output file in bytes.
+    """
+    predicates: list[str]
+    position: int = 0
+    output_size: int = 0
+    read: int = 0
+    written: int = 0
+    stats: list[PredicateStats] = dataclasses.field(default_factory=list)
+
+
+def _load(path: str, predicates: list[str]) -> Optional[Checkpoint]:
+    try:
+        with open(path) as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        return None
+    if data["predicates"] != predicates:
+        raise ValueError(f"{path} was saved by a filter with different "
+                         f"predicates")
+    data["stats"] = [PredicateStats(**stats) for stats in data["stats"]]
+    return Checkpoint(**data)
+
+
+def _save(checkpoint: Checkpoint, path: str):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(dataclasses.asdict(checkpoint), file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def _lines(path: Union[str, os.PathLike], position: int,
+           decode: Callable[[bytes], Any]) -> Iterator[tuple]:
+    """Yield the size, record and output line for each line after
+    ``position``."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size < position:
+            raise ValueError(f"{path} is shorter than when it was "
+                             f"checkpointed")
+        file.seek(position)
+        for line in file:
+            if line.strip():
+                yield len(line), decode(line), (line if line.endswith(b"\n")
+                                                else line + b"\n")
+            else:
+                yield len(line), None, None
+
+
+def _records(source: Callable[[int], Iterable], position: int,
+             encode: Callable[[Any], str]) -> Iterator[tuple]:
+    for record in source(position):
+        yield 1, record, (encode(record) + "\n").encode()
+
+
+def q_filter_resumable(source: Source, output_path: str, *preds: Any,
+                       checkpoint_path: str, every: int = 10_000,
+                       missing: Optional[str] = None,
+                       decode: Callable[[bytes], Any] = json.loads,
+                       encode: Callable[[Any], str] = json.dumps
+                       ) -> Checkpoint:
+    """Write the records from ``source`` for which all ``preds`` are true to
+    a JSON-lines file at ``output_path``, saving a checkpoint of progress to
+    ``checkpoint_path`` every ``every`` records and when finished.
+
+    ``source`` is the path of a JSON-lines file, whose matching lines are
+    copied to the output unchanged, or a callable returning the records of
+    a source from the position given, which are written with ``encode``.
+    If the checkpoint file exists, filtering resumes from it. Returns the
+    final checkpoint.
+    """
+    if every < 1:
+        raise ValueError("every must be at least 1")
+    preds = [_ensure_callable(pred) for pred in preds]
+    if missing is not None:
+        preds = [_with_missing(pred, missing, explicit=False)
+                 for pred in preds]
+    descriptions = [describe(pred) for pred in preds]
+    checkpoint = _load(checkpoint_path, descriptions)
+    resuming = checkpoint is not None
+    if not resuming:
+        checkpoint = Checkpoint(descriptions)
+
+    # A profiler that isn't activated counts calls to these predicates only
+    profiler = Profiler()
+    main_predicate = _combined(_COMBINE_EVERY, profiler.instrument(preds))
+    stats = profiler.stats()
+    for current, saved in zip(stats, checkpoint.stats):
+        for field in dataclasses.fields(PredicateStats):
+            setattr(current, field.name, getattr(saved, field.name))
+    checkpoint.stats = stats
+
+    if isinstance(source, (str, os.PathLike)):
+        items = _lines(source, checkpoint.position, decode)
+    else:
+        items = _records(source, checkpoint.position, encode)
+
+    if resuming:
+        if os.path.getsize(output_path) < checkpoint.output_size:
+            raise ValueError(f"{output_path} is shorter than when it was "
+                             f"checkpointed")
+        # Discard anything written after the checkpoint was saved
+        os.truncate(output_path, checkpoint.output_size)
+    with open(output_path, "ab" if resuming else "wb") as output:
+        write = output.write
+
+        def save():
+            output.flush()
+            os.fsync(output.fileno())
+            checkpoint.output_size = output.tell()
+            _save(checkpoint, checkpoint_path)
+
+        since_saved = 0
+        for size, record, line in items:
+            checkpoint.position += size
+            if line is None:
+                continue
+            checkpoint.read += 1
+            if main_predicate(record):
+                write(line)
+                checkpoint.written += 1
+            since_saved += 1
+            if since_saved == every:
+                save()
+                since_saved = 0
+        save()
+    return checkpoint
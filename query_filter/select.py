@@ -0,0 +1,80 @@
+import collections
+from array import array
+from typing import Any, Callable, Iterable, Iterator, Union
+
+from query_filter._arrays import numeric_typecode
+from query_filter.filter import q_filter_all
+from query_filter.query import MISSING, Query, Resolver
+
+_OUTPUTS = ("dict", "tuple", "namedtuple", "columns", "arrays")
+
+Fields = Union[dict[str, Query], Iterable[Query]]
+
+
+def _as_array(values: list) -> Union[array, list]:
+    kind = numeric_typecode(values)
+    if kind is None:
+        return values
+    return array(kind, values)
+
+
+def q_select(objects: Iterable, fields: Fields, where: Iterable = (),
+             output: str = "dict", default: Any = None
+             ) -> Union[Iterator[Any], dict[str, Union[list, array]]]:
+    """Extract the values at several paths from each object matching ``where``.
+
+    ``fields`` maps names to queries, or is a sequence of queries, which are
+    then named by their ``repr``. Paths are resolved together, so shared
+    prefixes are looked up once per object, and missing values are replaced
+    by ``default``.
+
+    Row outputs, ``"dict"``, ``"tuple"`` and ``"namedtuple"``, return an
+    iterator of rows. ``"columns"`` returns a dictionary of lists, and
+    ``"arrays"`` does too except that columns of integers or floats are
+    ``array.array`` instances.
+    """
+    if output not in _OUTPUTS:
+        raise ValueError(f"output must be one of {_OUTPUTS}, not {output!r}")
+    names, paths = _fields(fields)
+    matches = q_filter_all(objects, *where)
+
+    if output in ("columns", "arrays"):
+        resolver = Resolver(paths)
+        columns = [[] for _ in paths]
+        appends = [column.append for column in columns]
+        for obj in matches:
+            for append, value in zip(appends, resolver(obj)):
+                append(default if value is MISSING else value)
+        if output == "arrays":
+            columns = map(_as_array, columns)
+        return dict(zip(names, columns))
+
+    return map(_row_function(names, paths, output, default), matches)
+
+
+def _fields(fields: Fields) -> tuple[list[str], list[Query]]:
+    if isinstance(fields, dict):
+        return list(fields), list(fields.values())
+    paths = list(fields)
+    return [repr(path) for path in paths], paths
+
+
+def _row_function(names: list[str], paths: list[Query], output: str,
+                  default: Any) -> Callable[[Any], Any]:
+    """Return a function building a row of one of the row outputs."""
+    if output == "dict":
+        make = lambda values: dict(zip(names, values))  # noqa: E731
+    elif output == "tuple":
+        make = tuple
+    elif output == "namedtuple":
+        make = collections.namedtuple("Row", names, rename=True)._make
+    else:
+        raise ValueError(f"output must be one of {_OUTPUTS[:3]}, not "
+                         f"{output!r}")
+    resolver = Resolver(paths)
+
+    def row(obj: Any) -> Any:
+        return make([default if value is MISSING else value
+                     for value in resolver(obj)])
+
+    return row
@@ -0,0 +1,276 @@
+"""Text and JSON formats for queries and predicates.
+
+The text format is the Python syntax used to build predicates, restricted
+to queries on ``q``, comparisons, ``~``, ``and``, ``or``, ``not`` and calls
+to the ``q_*`` predicate functions with literal arguments. It's parsed
+without evaluating any code.
+
+The JSON format represents predicates as objects such as
+``{"op": "eq", "path": ["a", {"attr": "b"}], "args": [1]}``, where path
+elements are item keys unless wrapped in ``{"attr": name}``, and
+combinators as ``{"op": "all", "preds": [...]}``. A predicate's missing
+value policy is kept as ``q_missing(pred, policy)`` in the text format and
+as a ``"missing"`` key in the JSON format.
+
+Parsing is memoised, so a query string seen before costs a cache lookup.
+"""
+import ast
+import functools
+import json
+from typing import Any, Callable, Union
+
+from query_filter import filter as filter_
+from query_filter.query import (MISSING_POLICIES, PREDICATE_MAKERS, Lookup,
+                                LookupType, Query, describe)
+
+CACHE_SIZE = 1024
+
+_FUNCTIONS = {
+    "q_is": "is",
+    "q_is_not": "is_not",
+    "q_contains": "contains",
+    "q_is_in": "is_in",
+    "q_matches_regex": "regex",
+}
+
+_COMBINATORS = {
+    "q_all": filter_.q_all,
+    "q_any": filter_.q_any,
+    "q_not": filter_.q_not,
+}
+
+_COMPARISONS = {
+    ast.Lt: "lt",
+    ast.LtE: "le",
+    ast.Eq: "eq",
+    ast.NotEq: "ne",
+    ast.Gt: "gt",
+    ast.GtE: "ge",
+}
+
+_OP_NAMES = {maker.func: name for name, maker in PREDICATE_MAKERS.items()}
+
+Predicate = Union[Callable[[Any], bool], Query]
+
+
+class QuerySyntaxError(ValueError):
+    """Raised when a serialised query or predicate is invalid."""
+
+
+def _with_missing(pred: Predicate, missing: Any) -> Predicate:
+    if missing not in MISSING_POLICIES:
+        raise QuerySyntaxError(f"{missing!r} is not a missing value policy")
+    return filter_.q_missing(pred, missing)
+
+
+def _literal(node: ast.AST) -> Any:
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError):
+        raise QuerySyntaxError(f"{ast.unparse(node)} is not a literal")
+
+
+def _key(key: Any) -> Any:
+    # Paths are hashed by resolvers, indexes and snapshots
+    try:
+        hash(key)
+    except TypeError:
+        raise QuerySyntaxError(f"{key!r} is not a valid key")
+    return key
+
+
+def _query(node: ast.AST) -> Query:
+    if isinstance(node, ast.Name) and node.id == "q":
+        return Query()
+    if isinstance(node, ast.Attribute) and not node.attr.startswith("_"):
+        return getattr(_query(node.value), node.attr)
+    if isinstance(node, ast.Subscript):
+        return _query(node.value)[_key(_literal(node.slice))]
+    raise QuerySyntaxError(f"{ast.unparse(node)} is not a query")
+
+
+def _is_query(node: ast.AST) -> bool:
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        node = node.value
+    return isinstance(node, ast.Name) and node.id == "q"
+
+
+def _predicate(node: ast.AST) -> Predicate:
+    if _is_query(node):
+        return _query(node)
+
+    if isinstance(node, ast.Compare):
+        if len(node.ops) != 1 or type(node.ops[0]) not in _COMPARISONS:
+            raise QuerySyntaxError(
+                f"{ast.unparse(node)} is not a supported comparison"
+            )
+        maker = PREDICATE_MAKERS[_COMPARISONS[type(node.ops[0])]]
+        return maker(_query(node.left), _literal(node.comparators[0]))
+
+    if isinstance(node, ast.UnaryOp):
+        if isinstance(node.op, ast.Invert):
+            return ~_query(node.operand)
+        if isinstance(node.op, ast.Not):
+            return filter_.q_not(_predicate(node.operand))
+
+    if isinstance(node, ast.BoolOp):
+        combinator = (filter_.q_all if isinstance(node.op, ast.And)
+                      else filter_.q_any)
+        return combinator(*map(_predicate, node.values))
+
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+            and not node.keywords):
+        name = node.func.id
+        if name in _COMBINATORS:
+            return _COMBINATORS[name](*map(_predicate, node.args))
+        if name == "q_missing" and len(node.args) == 2:
+            pred, missing = node.args
+            return _with_missing(_predicate(pred), _literal(missing))
+        if name in _FUNCTIONS and node.args:
+            query, *criteria = node.args
+            return PREDICATE_MAKERS[_FUNCTIONS[name]](
+                _query(query), *map(_literal, criteria)
+            )
+
+    raise QuerySyntaxError(f"{ast.unparse(node)} is not a supported predicate")
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parse(text: str) -> Predicate:
+    """Parse a predicate, or a query used as one, from the text format."""
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+        return _predicate(tree.body)
+    except SyntaxError as error:
+        raise QuerySyntaxError(str(error)) from error
+    except (MemoryError, RecursionError) as error:
+        raise QuerySyntaxError("the predicate is nested too deeply") from error
+
+
+def parse_query(text: str) -> Query:
+    """Parse a query, such as ``q["a"].b``, from the text format."""
+    result = parse(text)
+    if not isinstance(result, Query):
+        raise QuerySyntaxError(f"{text} is not a query")
+    return result
+
+
+def to_text(pred: Predicate) -> str:
+    """Format a predicate or query in the text format."""
+    text = describe(pred)
+    parse(text)
+    return text
+
+
+def _dump_path(lookups) -> list:
+    return [{"attr": lookup.key} if lookup.lookup_type is LookupType.ATTR
+            else lookup.key for lookup in lookups]
+
+
+def _load_path(path: list) -> Query:
+    if not isinstance(path, list):
+        raise QuerySyntaxError(f"{path!r} is not a path")
+    lookups = []
+    for element in path:
+        if isinstance(element, dict):
+            if set(element) != {"attr"} or not isinstance(element["attr"],
+                                                          str):
+                raise QuerySyntaxError(f"{element!r} is not a lookup")
+            lookups.append(Lookup(LookupType.ATTR, element["attr"]))
+        else:
+            lookups.append(Lookup(LookupType.ITEM, _key(element)))
+    return Query(tuple(lookups))
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, (set, frozenset)):
+        return {"set": [_dump_value(item) for item in value]}
+    if isinstance(value, tuple):
+        return {"tuple": [_dump_value(item) for item in value]}
+    if isinstance(value, list):
+        return [_dump_value(item) for item in value]
+    if isinstance(value, dict):
+        return {"dict": [[_dump_value(key), _dump_value(item)]
+                         for key, item in value.items()]}
+    return value
+
+
+def _load_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_load_value(item) for item in value]
+    if isinstance(value, dict):
+        if len(value) != 1:
+            raise QuerySyntaxError(f"{value!r} is not a value")
+        ((kind, items),) = value.items()
+        if kind == "set":
+            return {_load_value(item) for item in items}
+        if kind == "tuple":
+            return tuple(_load_value(item) for item in items)
+        if kind == "dict":
+            return {_load_value(key): _load_value(item)
+                    for key, item in items}
+        raise QuerySyntaxError(f"{value!r} is not a value")
+    return value
+
+
+def to_data(pred: Predicate) -> dict:
+    """Convert a predicate or query into JSON-compatible data."""
+    if isinstance(pred, Query):
+        return {"op": "truthy", "path": _dump_path(pred)}
+
+    combined = getattr(pred, "preds", None)
+    if combined is not None:
+        return {"op": pred.combinator.removeprefix("q_"),
+                "preds": [to_data(inner) for inner in combined]}
+
+    lookups = getattr(pred, "lookups", None)
+    op = _OP_NAMES.get(getattr(pred, "func", None))
+    if lookups is None or op is None:
+        raise TypeError(f"{describe(pred)} can't be serialised")
+    data = {"op": op, "path": _dump_path(lookups)}
+    if pred.criteria:
+        data["args"] = [_dump_value(criterion) for criterion in pred.criteria]
+    if getattr(pred, "missing", None) is not None:
+        data["missing"] = pred.missing
+    return data
+
+
+def from_data(data: dict) -> Predicate:
+    """Build a predicate from data produced by ``to_data``."""
+    try:
+        return _from_data(data)
+    except QuerySyntaxError:
+        raise
+    except (TypeError, ValueError, RecursionError) as error:
+        raise QuerySyntaxError(f"{type(error).__name__}: {error}") from error
+
+
+def _from_data(data: dict) -> Predicate:
+    if not isinstance(data, dict) or "op" not in data:
+        raise QuerySyntaxError(f"{data!r} is not a predicate")
+    op = data["op"]
+    if f"q_{op}" in _COMBINATORS:
+        return _COMBINATORS[f"q_{op}"](*map(_from_data,
+                                            data.get("preds", [])))
+    if op not in PREDICATE_MAKERS:
+        raise QuerySyntaxError(f"{op!r} is not a predicate")
+    args = [_load_value(arg) for arg in data.get("args", [])]
+    pred = PREDICATE_MAKERS[op](_load_path(data.get("path")), *args)
+    if "missing" in data:
+        pred = _with_missing(pred, data["missing"])
+    return pred
+
+
+def dumps(pred: Predicate) -> str:
+    """Serialise a predicate or query as compact JSON."""
+    return json.dumps(to_data(pred), separators=(",", ":"))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def loads(text: str) -> Predicate:
+    """Build a predicate from JSON produced by ``dumps``."""
+    try:
+        data = json.loads(text)
+    except (json.JSONDecodeError, RecursionError) as error:
+        raise QuerySyntaxError(f"{type(error).__name__}: {error}") from error
+    return from_data(data)
@@ -0,0 +1,105 @@
+import heapq
+from typing import Any, Iterable, Iterator, Optional, Union
+
+from query_filter.query import MISSING, Query, Resolver, SortKey
+
+_MISSING_POSITIONS = ("first", "last")
+
+Key = Union[Query, SortKey]
+
+
+class _Reversed:
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __lt__(self, other: "_Reversed") -> bool:
+        return other.value < self.value
+
+    def __eq__(self, other: "_Reversed") -> bool:
+        return self.value == other.value
+
+
+def _sort_keys(keys: tuple) -> list[SortKey]:
+    if not keys:
+        return [SortKey(Query())]
+    return [key if isinstance(key, SortKey) else SortKey(key) for key in keys]
+
+
+def _decorator(keys: list[SortKey], missing: str):
+    """Return a function extracting a sort key for each ``SortKey``.
+
+    Each key is a ``(flag, value)`` pair, where the flag places missing
+    values first or last when sorted in that key's direction.
+    """
+    if missing not in _MISSING_POSITIONS:
+        raise ValueError(
+            f"missing must be one of {_MISSING_POSITIONS}, not {missing!r}"
+        )
+    resolver = Resolver(key.query for key in keys)
+    flags = [
+        (1, 0) if (missing == "last") != key.descending else (0, 1)
+        for key in keys
+    ]
+
+    def decorate(obj: Any) -> tuple:
+        return tuple(
+            (missing_flag, None) if value is MISSING else (present_flag, value)
+            for value, (missing_flag, present_flag) in zip(resolver(obj),
+                                                           flags)
+        )
+
+    return decorate
+
+
+def _heap_key(keys: list[SortKey]):
+    descending = [key.descending for key in keys]
+
+    def heap_key(decorated: tuple) -> tuple:
+        return tuple(_Reversed(part) if reverse else part
+                     for part, reverse in zip(decorated[0], descending))
+
+    return heap_key
+
+
+def q_sort(objects: Iterable, *keys: Key, missing: str = "last",
+           limit: Optional[int] = None) -> list[Any]:
+    """Sort objects by the values at one or more query paths.
+
+    Keys are queries, sorted in ascending order, or negated queries such as
+    ``-q.created``, sorted in descending order. Objects without a value at a
+    key's path are placed ``"first"`` or ``"last"`` according to
+    ``missing``. Keys are extracted once per object. If ``limit`` is given,
+    only the first ``limit`` objects are kept, using a bounded heap.
+    """
+    keys = _sort_keys(keys)
+    decorate = _decorator(keys, missing)
+    decorated = ((decorate(obj), obj) for obj in objects)
+
+    if limit is not None:
+        smallest = heapq.nsmallest(limit, decorated, key=_heap_key(keys))
+        return [obj for _, obj in smallest]
+
+    decorated = list(decorated)
+    first = lambda pair: pair[0]  # noqa: E731
+    if len({key.descending for key in keys}) == 1:
+        decorated.sort(key=first, reverse=keys[0].descending)
+    else:
+        # Stable sorts from the last key to the first, each in its direction
+        for position in reversed(range(len(keys))):
+            decorated.sort(key=lambda pair: pair[0][position],
+                           reverse=keys[position].descending)
+    return [obj for _, obj in decorated]
+
+
+def q_merge(iterables: Iterable[Iterable], *keys: Key,
+            missing: str = "last") -> Iterator[Any]:
+    """Lazily merge iterables that are each sorted as by ``q_sort``."""
+    keys = _sort_keys(keys)
+    decorate = _decorator(keys, missing)
+    heap_key = _heap_key(keys)
+    decorated = [((decorate(obj), obj) for obj in iterable)
+                 for iterable in iterables]
+    for _, obj in heapq.merge(*decorated, key=heap_key):
+        yield obj
@@ -0,0 +1,208 @@
+"""Prefix, substring and approximate string predicates over many terms.
+
+The terms of each predicate are compiled once, when it's made, so testing
+a value against many terms costs about one pass over the value rather than
+one per term: prefixes are grouped into a set per length, substrings into
+an Aho-Corasick automaton, and the terms of approximate matches into a trie
+walked with rows of the Levenshtein distance table, sharing the rows of
+common prefixes. Values that aren't strings never match.
+"""
+from typing import Any, Callable, Iterable, Union
+
+from query_filter.query import _FUNCTION_NAMES, Query, query_predicate
+
+Terms = Union[str, Iterable[str]]
+
+# Fewer substrings than this are searched for without the automaton
+_AUTOMATON_TERMS = 16
+
+
+def _terms(terms: Terms, types: tuple = (str,)) -> tuple:
+    if isinstance(terms, (str, bytes)):
+        terms = (terms,)
+    terms = tuple(dict.fromkeys(terms))
+    if not terms:
+        raise ValueError("at least one term is needed")
+    for term in terms:
+        if not isinstance(term, types):
+            raise TypeError(f"{term!r} is not a string")
+    return terms
+
+
+class _Terms:
+    """Compiled terms, shown as the terms they were compiled from."""
+
+    def __init__(self, terms: tuple):
+        self.terms = terms
+
+    def __repr__(self) -> str:
+        return repr(self.terms[0] if len(self.terms) == 1 else self.terms)
+
+
+class _Prefixes(_Terms):
+    def __init__(self, terms: tuple):
+        super().__init__(terms)
+        by_length = {}
+        for term in terms:
+            by_length.setdefault(len(term), set()).add(term)
+        # Shortest first, as most values are ruled out by a short prefix
+        self.groups = tuple(sorted(by_length.items()))
+
+    def match(self, value: Any) -> bool:
+        if not isinstance(value, (str, bytes)):
+            return False
+        for length, group in self.groups:
+            if value[:length] in group:
+                return True
+        return False
+
+
+class _Substrings(_Terms):
+    """An Aho-Corasick automaton for the casefolded terms."""
+
+    def __init__(self, terms: tuple):
+        super().__init__(terms)
+        goto = [{}]
+        final = [False]
+        for term in terms:
+            state = 0
+            for char in term.casefold():
+                if char not in goto[state]:
+                    goto.append({})
+                    final.append(False)
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            final[state] = True
+
+        # Transitions missing from a state are taken from its failure state,
+        # found breadth first, so matching never follows failure links
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for char, target in goto[state].items():
+                queue.append(target)
+                if state:
+                    fail[target] = goto[fail[state]].get(char, 0)
+                final[target] = final[target] or final[fail[target]]
+            if state:
+                goto[state] = {**goto[fail[state]], **goto[state]}
+        self.goto = goto
+        self.final = final
+        # A term that is empty after casefolding is in every string
+        self.always = final[0]
+        # A few terms are faster searched for one at a time by str.find
+        self.few = (tuple(term.casefold() for term in terms)
+                    if len(terms) < _AUTOMATON_TERMS else None)
+
+    def match(self, value: Any) -> bool:
+        if not isinstance(value, str):
+            return False
+        if self.always:
+            return True
+        value = value.casefold()
+        if self.few is not None:
+            for term in self.few:
+                if term in value:
+                    return True
+            return False
+        goto, final = self.goto, self.final
+        state = 0
+        for char in value:
+            state = goto[state].get(char, 0)
+            if final[state]:
+                return True
+        return False
+
+
+class _Fuzzy(_Terms):
+    """A trie of the terms, walked with Levenshtein distance rows."""
+
+    def __init__(self, terms: tuple, max_dist: int):
+        super().__init__(terms)
+        self.max_dist = max_dist
+        self.exact = frozenset(terms)
+        self.lengths = (min(map(len, terms)) - max_dist,
+                        max(map(len, terms)) + max_dist)
+        # Each node is a dict of children, with None mapping to True at the
+        # end of a term
+        self.root = {}
+        for term in terms:
+            node = self.root
+            for char in term:
+                node = node.setdefault(char, {})
+            node[None] = True
+
+    def match(self, value: Any) -> bool:
+        if not isinstance(value, str):
+            return False
+        if value in self.exact:
+            return True
+        low, high = self.lengths
+        if not low <= len(value) <= high:
+            return False
+        max_dist = self.max_dist
+        first_row = list(range(len(value) + 1))
+        if first_row[-1] <= max_dist and None in self.root:
+            return True
+        # Depth first, so only one row per level of the trie is alive
+        stack = [(self.root, first_row)]
+        while stack:
+            node, row = stack.pop()
+            for char, child in node.items():
+                if char is None:
+                    continue
+                new_row = [row[0] + 1]
+                for column, value_char in enumerate(value, 1):
+                    new_row.append(min(
+                        new_row[column - 1] + 1,
+                        row[column] + 1,
+                        row[column - 1] + (value_char != char),
+                    ))
+                if new_row[-1] <= max_dist and None in child:
+                    return True
+                # No term below this node can be closer than its row's minimum
+                if min(new_row) <= max_dist:
+                    stack.append((child, new_row))
+        return False
+
+
+@query_predicate
+def starts_with(obj: Any, prefixes: _Prefixes) -> bool:
+    return prefixes.match(obj)
+
+
+@query_predicate
+def icontains(obj: Any, terms: _Substrings) -> bool:
+    return terms.match(obj)
+
+
+@query_predicate
+def fuzzy(obj: Any, terms: _Fuzzy, max_dist: int) -> bool:
+    return terms.match(obj)
+
+
+_FUNCTION_NAMES.update({
+    starts_with.func: "q_startswith",
+    icontains.func: "q_icontains",
+    fuzzy.func: "q_fuzzy",
+})
+
+
+def q_startswith(query: Query, prefixes: Terms) -> Callable[[Any], bool]:
+    """True for strings starting with any of ``prefixes``, a string or an
+    iterable of them. Byte strings may be matched with byte prefixes."""
+    return starts_with(query, _Prefixes(_terms(prefixes, (str, bytes))))
+
+
+def q_icontains(query: Query, terms: Terms) -> Callable[[Any], bool]:
+    """True for strings containing any of ``terms``, ignoring case."""
+    return icontains(query, _Substrings(_terms(terms)))
+
+
+def q_fuzzy(query: Query, terms: Terms,
+            max_dist: int = 1) -> Callable[[Any], bool]:
+    """True for strings within a Levenshtein distance of ``max_dist`` of any
+    of ``terms``."""
+    if max_dist < 0:
+        raise ValueError("max_dist must not be negative")
+    return fuzzy(query, _Fuzzy(_terms(terms), max_dist), max_dist)
@@ -13,6 +13,17 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/simoncrowe/python-query-filter",
     packages=setuptools.find_packages(),
+    ext_modules=[
+        setuptools.Extension(
+            "query_filter._speedups",
+            sources=["query_filter/_speedups.c"],
+            optional=True,
+        ),
+    ],
+    extras_require={
+        "arrow": ["pyarrow"],
+        "pandas": ["pandas"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -0,0 +1,168 @@
+import collections
+import operator
+
+import pytest
+
+from query_filter import q, query
+from query_filter.query import MISSING, Accessor, Lookup, LookupType, _Step
+
+
+class Slotted:
+    __slots__ = ("name", "parent")
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        if parent is not None:
+            self.parent = parent
+
+
+class WithProperty:
+    def __init__(self, first, last):
+        self.first = first
+        self.last = last
+
+    @property
+    def full_name(self):
+        return f"{self.first} {self.last}"
+
+    @property
+    def broken(self):
+        raise AttributeError("broken")
+
+
+class Dynamic:
+    def __getattr__(self, name):
+        return name.upper()
+
+
+def test_accessor_dict_and_list():
+    accessor = Accessor(q["a"][-1]["b"])
+
+    assert accessor({"a": [{"b": 1}, {"b": 2}]}) == 2
+
+
+@pytest.mark.parametrize("obj", [
+    {},
+    {"a": []},
+    {"a": [{"c": 1}]},
+    {"a": "string"},
+    {"a": [None]},
+])
+def test_accessor_missing_items(obj):
+    accessor = Accessor(q["a"][-1]["b"])
+
+    assert accessor(obj) is MISSING
+
+
+def test_accessor_slots():
+    accessor = Accessor(q.parent.name)
+
+    assert accessor(Slotted("child", Slotted("parent"))) == "parent"
+    assert accessor(Slotted("orphan")) is MISSING
+
+
+def test_accessor_property():
+    accessor = Accessor(q.full_name)
+
+    assert accessor(WithProperty("Ada", "Lovelace")) == "Ada Lovelace"
+
+
+def test_accessor_property_raising_attribute_error():
+    assert Accessor(q.broken)(WithProperty("Ada", "Lovelace")) is MISSING
+
+
+def test_accessor_instance_attribute_after_property_specialisation():
+    accessor = Accessor(q.first)
+
+    assert accessor(WithProperty("Ada", "Lovelace")) == "Ada"
+    assert accessor(WithProperty("Alan", "Turing")) == "Alan"
+
+
+def test_accessor_custom_getattr():
+    assert Accessor(q.anything)(Dynamic()) == "ANYTHING"
+
+
+def test_accessor_dict_subclass_uses_getitem():
+    data = collections.defaultdict(int)
+
+    assert Accessor(q["count"])(data) == 0
+
+
+def test_accessor_polymorphic():
+    accessor = Accessor(q["x"])
+
+    assert accessor({"x": 1}) == 1
+    assert accessor([1, 2]) is MISSING
+    assert accessor(collections.OrderedDict(x=2)) == 2
+
+
+def test_accessor_invalid_lookup_type():
+    accessor = Accessor([Lookup(lookup_type=3.14, key="irrelevant")])
+
+    with pytest.raises(ValueError):
+        accessor({})
+
+
+def test_accessor_non_string_attribute():
+    accessor = Accessor([Lookup(lookup_type=LookupType.ATTR, key=1)])
+
+    assert accessor(object()) is MISSING
+
+
+def test_accessor_stats():
+    accessor = Accessor(q["a"].name)
+
+    for _ in range(3):
+        accessor({"a": Slotted("name")})
+    accessor({"b": None})
+
+    first, second = accessor.stats()
+    assert (first.hits, first.misses, first.types) == (3, 1, (dict,))
+    assert (second.hits, second.misses, second.types) == (2, 1, (Slotted,))
+    assert first.hit_rate == 0.75
+
+
+def test_accessor_stats_megamorphic():
+    accessor = Accessor(q["x"])
+    mappings = [dict, collections.OrderedDict, collections.defaultdict,
+                collections.Counter, collections.ChainMap]
+
+    for mapping in mappings:
+        accessor(mapping())
+        accessor(mapping())
+
+    (stats,) = accessor.stats()
+    assert stats.types == tuple(mappings[:4])
+    # The fifth type builds the generic getter, which the sixth call reuses
+    assert (stats.hits, stats.misses) == (5, 5)
+
+
+def test_accessor_uses_generic_getter_beyond_max_types():
+    classes = [type(f"Class{i}", (), {}) for i in range(_Step.max_types * 2)]
+    objects = []
+    for i, cls in enumerate(classes):
+        obj = cls()
+        obj.x = i
+        objects.append(obj)
+    accessor = Accessor(q.x)
+
+    assert [accessor(obj) for obj in objects] == list(range(len(classes)))
+    (stats,) = accessor.stats()
+    assert stats.misses == _Step.max_types + 1
+
+    for _ in range(3):
+        assert [accessor(obj) for obj in objects] == list(range(len(classes)))
+    (stats,) = accessor.stats()
+    assert stats.misses == _Step.max_types + 1
+    assert stats.hits == len(classes) * 4 - stats.misses
+    assert accessor(classes[-1]()) is MISSING
+
+
+def test_python_predicate_accessor_stats():
+    pred = query._py_predicate(operator.eq, tuple(q["a"]), (1,))
+
+    pred({"a": 1})
+    pred({"a": 2})
+
+    (stats,) = pred.accessor.stats()
+    assert (stats.hits, stats.misses) == (1, 1)
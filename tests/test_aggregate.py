@@ -0,0 +1,95 @@
+import pytest
+
+from query_filter import (q, q_count, q_group_by, q_is_in, q_max, q_min,
+                          q_sum)
+from query_filter.aggregate import Count, Max, Min, Sum
+from query_filter.query import MISSING, Resolver
+
+
+@pytest.fixture
+def orders():
+    return [
+        {"id": 1, "region": "eu", "total": {"amount": 30, "items": 2}},
+        {"id": 2, "region": "us", "total": {"amount": 12, "items": 1}},
+        {"id": 3, "region": "eu", "total": {"amount": 55, "items": 5}},
+        {"id": 4, "region": "us"},
+        {"id": 5, "total": {"amount": 8, "items": 1}},
+    ]
+
+
+def test_q_count(orders):
+    assert q_count(orders) == 5
+    assert q_count(orders, q["region"] == "eu") == 2
+
+
+def test_q_count_consumes_iterators(orders):
+    assert q_count(iter(orders), q["total"]) == 4
+
+
+def test_q_sum(orders):
+    assert q_sum(orders, q["total"]["amount"]) == 105
+    assert q_sum(orders, q["total"]["amount"], q["region"] == "us") == 12
+
+
+def test_q_sum_start(orders):
+    assert q_sum(orders, q["total"]["amount"], q["id"] > 10, start=0.0) == 0.0
+
+
+def test_q_min_and_q_max(orders):
+    assert q_min(orders, q["total"]["amount"]) == 8
+    assert q_max(orders, q["total"]["amount"]) == 55
+    assert q_max(orders, q["total"]["amount"], q["region"] == "us") == 12
+
+
+def test_q_min_and_q_max_default(orders):
+    assert q_min(orders, q["discount"]) is None
+    assert q_max(orders, q["discount"], default=0) == 0
+
+
+def test_q_group_by_counts(orders):
+    assert q_group_by(orders, q["region"]) == {"eu": 2, "us": 2}
+
+
+def test_q_group_by_with_aggregator_and_predicates(orders):
+    results = q_group_by(orders, q["region"], q["id"] < 4,
+                         agg=Sum(q["total"]["amount"]))
+
+    assert results == {"eu": 85, "us": 12}
+
+
+def test_q_group_by_with_named_aggregators(orders):
+    results = q_group_by(orders, q["region"], agg={
+        "orders": Count(),
+        "with_total": Count(q["total"]),
+        "items": Sum(q["total"]["items"]),
+        "smallest": Min(q["total"]["amount"]),
+        "largest": Max(q["total"]["amount"]),
+    })
+
+    assert results == {
+        "eu": {"orders": 2, "with_total": 2, "items": 7,
+               "smallest": 30, "largest": 55},
+        "us": {"orders": 2, "with_total": 1, "items": 1,
+               "smallest": 12, "largest": 12},
+    }
+
+
+def test_q_group_by_nested_key(orders):
+    results = q_group_by(orders, q["total"]["items"],
+                         q_is_in(q["region"], {"eu", "us"}))
+
+    assert results == {1: 1, 2: 1, 5: 1}
+
+
+def test_resolver_shares_prefixes():
+    resolver = Resolver([q["a"]["b"], q["a"]["c"], q["a"], q, q["d"]])
+    obj = {"a": {"b": 1, "c": 2}}
+
+    assert resolver(obj) == [1, 2, obj["a"], obj, MISSING]
+    assert len(resolver._steps) == 4
+
+
+def test_resolver_missing_prefix():
+    resolver = Resolver([q["a"]["b"], q["a"]["c"]])
+
+    assert resolver({"b": 1}) == [MISSING, MISSING]
@@ -0,0 +1,78 @@
+import collections
+import tracemalloc
+from array import array
+
+import pytest
+
+from query_filter import (q, q_all, q_any, q_filter_all, q_filter_any,
+                          q_filter_not_any, q_not, query)
+
+SIZE = 2000
+
+requires_speedups = pytest.mark.skipif(query._speedups is None,
+                                       reason="C extension not built")
+
+
+@pytest.fixture(scope="module")
+def objects():
+    return [{"id": i, "host": {"region": "eu" if i % 2 else "us"}}
+            for i in range(SIZE)]
+
+
+FILTERS = {
+    "all": lambda objects, probe: q_filter_all(
+        objects, q["id"] >= 0, q["host"]["region"] != "ap",
+        q_any(q["id"] < 0, q["host"]["region"]), q_not(q["id"] < 0), probe,
+    ),
+    "any": lambda objects, probe: q_filter_any(
+        objects, q["id"] < 0, q["missing"] == 1, probe,
+    ),
+    "not_any": lambda objects, probe: q_filter_not_any(
+        objects, q["id"] < 0, q["missing"] == 1, q_not(probe),
+    ),
+    "nested": lambda objects, probe: q_filter_all(
+        objects, q_all(q["id"] >= 0, q_any(q["missing"], probe)),
+    ),
+}
+
+
+def live_memory(make_filter, objects):
+    """Return the memory allocated and not yet freed each time a predicate
+    is evaluated, relative to when filtering began.
+
+    Memory freed after each object isn't seen at its end, so a probe
+    evaluated last sees what the evaluation loop holds for each object.
+    Filtering runs twice, so that one-off allocations are made first.
+    """
+    collections.deque(make_filter(objects, lambda obj: True), maxlen=0)
+    observed = array("q", bytes(8 * len(objects)))
+    positions = iter(range(len(objects)))
+
+    def probe(obj):
+        observed[next(positions)] = tracemalloc.get_traced_memory()[0]
+        return True
+
+    results = make_filter(objects, probe)
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        collections.deque(results, maxlen=0)
+    finally:
+        tracemalloc.stop()
+    return [size - start for size in observed]
+
+
+@pytest.mark.parametrize("name", FILTERS)
+def test_no_allocations_per_object(objects, name):
+    sizes = live_memory(FILTERS[name], objects)
+
+    assert sizes[-1] == sizes[SIZE // 2]
+
+
+@requires_speedups
+@pytest.mark.parametrize("name", FILTERS)
+def test_no_allocations_in_evaluation_loop(objects, name):
+    baseline = max(live_memory(lambda objects, probe: filter(probe, objects),
+                               objects))
+
+    assert max(live_memory(FILTERS[name], objects)) <= baseline
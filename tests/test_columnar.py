@@ -0,0 +1,132 @@
+import pytest
+
+from query_filter import (q, q_all, q_any, q_contains, q_filter, q_is,
+                          q_is_in, q_matches_regex, q_not)
+from query_filter.columnar import ColumnarSnapshot, q_filter_parallel
+from query_filter.query import MISSING
+
+PATHS = [q["id"], q["size"]["cores"], q["size"]["ratio"], q["region"],
+         q["tags"], q["flag"]]
+
+
+@pytest.fixture
+def records():
+    regions = ["eu-west-1", "us-east-1", "ap-south-1"]
+    records = []
+    for i in range(200):
+        record = {"id": i, "region": regions[i % 3], "flag": i % 4 == 0}
+        if i % 5:
+            record["size"] = {"cores": i % 8, "ratio": i / 7}
+        if i % 7 == 0:
+            record["tags"] = ("a", "b") if i % 2 else None
+        records.append(record)
+    return records
+
+
+@pytest.fixture
+def snapshot(records):
+    with ColumnarSnapshot.create(records, PATHS) as snapshot:
+        yield snapshot
+
+
+def positions(records, *preds):
+    return [records.index(match) for match in q_filter(records, *preds)]
+
+
+@pytest.mark.parametrize("preds", [
+    (q["id"] < 10,),
+    (q["size"]["cores"] >= 6, q["region"] == "eu-west-1"),
+    (q["size"]["ratio"] > 12.5,),
+    (q["region"] != "us-east-1",),
+    (q_is_in(q["region"], {"ap-south-1", "eu-west-1"}),),
+    (q_matches_regex(q["region"], r"^(eu|ap)-"),),
+    (q_contains(q["region"], "east"),),
+    (q["flag"],),
+    (~q["flag"],),
+    (~q["size"]["cores"],),
+    (q_is(q["tags"], None),),
+    (q["tags"] == ("a", "b"),),
+    (q_not(q["size"]["cores"] > 3),),
+    (q_any(q["size"]["cores"] == 1, q_all(q["flag"], q["id"] > 100)),),
+    (q["id"] >= 0,),
+])
+def test_filter_matches_q_filter(records, snapshot, preds):
+    assert snapshot.filter(*preds) == positions(records, *preds)
+
+
+def test_filter_range(records, snapshot):
+    assert snapshot.filter(q["id"] < 10, start=5, stop=50) == [5, 6, 7, 8, 9]
+
+
+def test_column(records, snapshot):
+    cores = snapshot.column(q["size"]["cores"])
+    tags = snapshot.column(q["tags"])
+
+    assert cores[:6] == [MISSING, 1, 2, 3, 4, MISSING]
+    assert tags[:15] == [None] + [MISSING] * 6 + [("a", "b")] + \
+        [MISSING] * 6 + [None]
+    assert snapshot.column(q["id"]) == list(range(200))
+
+
+def test_column_types(snapshot):
+    kinds = {repr(path): spec.kind
+             for path, spec in zip(snapshot.paths, snapshot.handle.columns)}
+
+    assert kinds == {
+        "q['id']": "q",
+        "q['size']['cores']": "q",
+        "q['size']['ratio']": "d",
+        "q['region']": "B",
+        "q['tags']": "B",
+        "q['flag']": "B",
+    }
+
+
+def test_dictionary_keeps_equal_values_of_different_types():
+    records = [{"x": 1}, {"x": True}, {"x": 1.0}, {"x": "1"}]
+
+    with ColumnarSnapshot.create(records, [q["x"]]) as snapshot:
+        values = snapshot.column(q["x"])
+        assert [type(value) for value in values] == [int, bool, float, str]
+        assert snapshot.filter(q_is(q["x"], True)) == [1]
+
+
+def test_large_dictionary():
+    records = [{"name": f"name-{i}"} for i in range(70_000)]
+
+    with ColumnarSnapshot.create(records, [q["name"]]) as snapshot:
+        assert snapshot.handle.columns[0].kind == "I"
+        assert snapshot.filter(q["name"] == "name-69999") == [69_999]
+
+
+def test_empty_snapshot():
+    with ColumnarSnapshot.create([], [q["a"]]) as snapshot:
+        assert len(snapshot) == 0
+        assert snapshot.filter(q["a"] == 1) == []
+
+
+def test_opaque_predicate_rejected(snapshot):
+    with pytest.raises(TypeError):
+        snapshot.filter(lambda record: True)
+
+
+def test_unknown_path_rejected(snapshot):
+    with pytest.raises(ValueError):
+        snapshot.filter(q["name"] == "x")
+
+
+def test_attach(records, snapshot):
+    attached = ColumnarSnapshot.attach(snapshot.handle)
+    try:
+        assert attached.filter(q["id"] < 3) == [0, 1, 2]
+    finally:
+        attached.close()
+
+
+def test_q_filter_parallel(records, snapshot):
+    preds = (q["size"]["cores"] > 2,
+             q_is_in(q["region"], {"eu-west-1", "ap-south-1"}))
+
+    results = q_filter_parallel(snapshot, *preds, processes=2, chunk_size=16)
+
+    assert results == positions(records, *preds)
@@ -0,0 +1,98 @@
+import pytest
+
+from query_filter import q, q_all, q_is_in, q_not, query
+from query_filter.explain import explain
+
+
+@pytest.fixture
+def sample():
+    return [
+        {"id": 1, "user": {"name": "Ann", "age": 30}},
+        {"id": 2, "user": {"name": "Bob", "age": 17}},
+        {"id": 3, "user": {"name": "Cat"}},
+        {"id": 4},
+    ]
+
+
+def is_even(record):
+    return record["id"] % 2 == 0
+
+
+def paths(queries):
+    return [repr(query_) for query_ in queries]
+
+
+def test_explain_paths_and_prefixes():
+    explanation = explain(q["user"]["age"] >= 18,
+                          q_is_in(q["user"]["name"], {"Ann", "Cat"}),
+                          q_not(q["user"]["age"] == 30))
+
+    assert paths(explanation.paths) == ["q['user']['age']",
+                                        "q['user']['name']"]
+    ((prefix, count),) = explanation.shared_prefixes
+    assert (repr(prefix), count) == ("q['user']", 2)
+
+
+def test_explain_shared_prefixes_keeps_longest():
+    explanation = explain(q.a.b.c, q.a.b.d, q.a.e)
+
+    shared = [(repr(prefix), count)
+              for prefix, count in explanation.shared_prefixes]
+    assert shared == [("q.a", 3), ("q.a.b", 2)]
+
+
+def test_explain_predicates():
+    explanation = explain(q["user"]["age"] >= 18,
+                          q_all(q["id"], q["user"]),
+                          is_even)
+
+    age, combined, custom = explanation.predicates
+    assert age.description == "q['user']['age'] >= 18"
+    assert age.indexable
+    assert age.engine == ("compiled accessor" if query._speedups is None
+                          else "C kernel")
+    assert combined.engine == "combinator"
+    assert paths(combined.paths) == ["q['id']", "q['user']"]
+    assert not combined.indexable
+    assert custom.engine == "opaque callable"
+    assert custom.paths == []
+    assert explanation.order == [0, 1, 2]
+    assert explanation.suggested_order is None
+
+
+def test_explain_sample(sample):
+    explanation = explain(q["user"]["age"] >= 18, is_even, sample=sample)
+
+    age, custom = explanation.predicates
+    assert (age.selectivity, age.missing_rate) == (0.25, 0.5)
+    assert (custom.selectivity, custom.missing_rate) == (0.5, 0)
+    assert age.cost > 0
+    assert explanation.sample_size == 4
+    assert explanation.suggested_order is not None
+
+
+def test_explain_suggests_most_selective_first_for_all(sample):
+    explanation = explain(q["id"], q["user"]["name"] == "Bob", sample=sample)
+
+    assert explanation.suggested_order == [1, 0]
+
+
+def test_explain_suggests_least_selective_first_for_any(sample):
+    explanation = explain(q["user"]["name"] == "Zed", q["id"],
+                          sample=sample, mode="any")
+
+    assert explanation.suggested_order == [1, 0]
+
+
+def test_explain_str(sample):
+    text = str(explain(q["user"]["age"] >= 18, is_even, sample=sample))
+
+    assert "q['user']['age'] >= 18" in text
+    assert "opaque callable" in text
+    assert "selectivity 0.25" in text
+    assert "Suggested order (from 4 samples)" in text
+
+
+def test_explain_invalid_mode():
+    with pytest.raises(ValueError):
+        explain(q.a, mode="some")
@@ -0,0 +1,111 @@
+import re
+
+import pytest
+
+from query_filter import (q, q_all, q_any, q_filter_all, q_is_in,
+                          q_matches_regex, q_missing, q_not)
+from query_filter.frames import q_filter_frame, to_mask
+
+pd = pytest.importorskip("pandas")
+pa = pytest.importorskip("pyarrow")
+
+RECORDS = [
+    {"id": 1, "name": "alpha", "cores": 2, "load": 0.5, "active": True,
+     "tags": ["web"], "host": {"region": "eu", "rack": 1}},
+    {"id": 2, "name": "beta", "cores": 8, "load": 0.0, "active": False,
+     "tags": [], "host": {"region": "us", "rack": 2}},
+    {"id": 3, "name": "Gamma", "cores": 4, "load": 1.5, "active": True,
+     "tags": ["db", "web"], "host": {"region": "eu", "rack": 3}},
+    {"id": 4, "name": "delta", "cores": 0, "load": 2.0, "active": False,
+     "tags": ["db"], "host": {"region": "ap", "rack": 1}},
+]
+
+PREDICATES = [
+    q["cores"] > 2,
+    q["cores"] <= 4,
+    q["load"] == 0.0,
+    q["name"] != "beta",
+    q["name"] >= "beta",
+    q["active"],
+    ~q["cores"],
+    q_is_in(q["name"], {"alpha", "delta"}),
+    q_matches_regex(q["name"], r"^[a-g]"),
+    q_all(q["cores"] > 0, q_not(q["active"])),
+    q_any(q["cores"] == 8, q["load"] > 1),
+    q["host"]["region"] == "eu",
+    q["host"]["rack"] < 3,
+    q["tags"],
+    q["missing"] == 1,
+    q["cores"] == [2, 8, 4, 0],
+    q["name"] == ("alpha", "x"),
+    lambda record: record["id"] % 2,
+]
+
+
+@pytest.fixture(params=["pandas", "arrow"])
+def frame(request):
+    if request.param == "pandas":
+        return pd.DataFrame(RECORDS)
+    return pa.Table.from_pylist(RECORDS)
+
+
+def ids(frame):
+    if isinstance(frame, pd.DataFrame):
+        return frame["id"].tolist()
+    return frame.column("id").to_pylist()
+
+
+@pytest.mark.parametrize("pred", PREDICATES)
+def test_matches_q_filter_all(frame, pred):
+    records = (frame.to_dict("records") if isinstance(frame, pd.DataFrame)
+               else frame.to_pylist())
+    expected = [record["id"] for record in q_filter_all(records, pred)]
+
+    assert ids(q_filter_frame(frame, pred)) == expected
+
+
+def test_multiple_predicates(frame):
+    assert ids(q_filter_frame(frame, q["cores"] > 0, q["load"] < 1)) == [1, 2]
+
+
+def test_returns_frame_type(frame):
+    assert type(q_filter_frame(frame, q["cores"] > 2)) is type(frame)
+
+
+def test_to_mask(frame):
+    assert to_mask(frame, q["cores"] > 2).tolist() == [False, True, True,
+                                                       False]
+
+
+def test_nulls_match_records():
+    records = [{"id": 1, "score": 3}, {"id": 2, "score": None},
+               {"id": 3, "score": 1}]
+    table = pa.Table.from_pylist(records)
+
+    assert ids(q_filter_frame(table, q["score"] != 3)) == [2, 3]
+    with pytest.raises(TypeError):
+        q_filter_frame(table, q["score"] > 2)
+
+
+def test_missing_policy():
+    records = [{"id": 1, "host": {"region": "eu"}}, {"id": 2, "host": {}}]
+    frame = pd.DataFrame(records)
+    pred = q_missing(q_not(q["host"]["region"] == "eu"), "skip")
+
+    assert ids(q_filter_frame(frame, pred)) == []
+    assert ids(q_filter_frame(frame, q["host"]["region"] != "eu",
+                              missing="true")) == [2]
+
+
+def test_regex_uses_python_syntax():
+    frame = pd.DataFrame({"id": [1, 2], "name": ["a1", "b"]})
+    pred = q_matches_regex(q["name"], r"(?=a)\w\d")
+
+    assert ids(q_filter_frame(frame, pred)) == [1]
+    with pytest.raises(re.error):
+        q_filter_frame(frame, q_matches_regex(q["name"], "("))
+
+
+def test_unsupported_type():
+    with pytest.raises(TypeError):
+        q_filter_frame(RECORDS, q["cores"] > 2)
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+
+import pytest
+
+import query_filter
+
+LAZY_MODULES = [
+    "multiprocessing",
+    "query_filter.aggregate",
+    "query_filter.columnar",
+    "query_filter.explain",
+    "query_filter.frames",
+    "query_filter.index",
+    "query_filter.join",
+    "query_filter.membership",
+    "query_filter.partition",
+    "query_filter.pipeline",
+    "query_filter.planner",
+    "query_filter.resumable",
+    "query_filter.select",
+    "query_filter.serialisation",
+    "query_filter.sort",
+    "query_filter.text",
+]
+
+
+def imported_modules(code):
+    script = f"import sys\n{code}\nprint('\\n'.join(sys.modules))"
+    output = subprocess.run([sys.executable, "-c", script], check=True,
+                            capture_output=True, text=True).stdout
+    return set(output.splitlines())
+
+
+def test_import_does_not_load_optional_modules():
+    modules = imported_modules(
+        "from query_filter import q, q_filter\n"
+        "list(q_filter([{'a': 1}], q['a'] == 1))"
+    )
+
+    assert "query_filter.filter" in modules
+    assert modules.isdisjoint(LAZY_MODULES)
+
+
+def test_lazy_function_loads_its_module():
+    modules = imported_modules("from query_filter import q_sort")
+
+    assert "query_filter.sort" in modules
+    assert "multiprocessing" not in modules
+
+
+@pytest.mark.parametrize("name", sorted(query_filter._LAZY))
+def test_lazy_functions(name):
+    assert name in dir(query_filter)
+    assert callable(getattr(query_filter, name))
+
+
+def test_missing_attribute():
+    with pytest.raises(AttributeError):
+        query_filter.q_nonexistent
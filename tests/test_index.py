@@ -0,0 +1,180 @@
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from query_filter import q, q_filter_all, q_is_in, q_missing, q_not
+from query_filter.index import Index, StaleIndexError, dataset_fingerprint
+from query_filter.membership import MembershipSet
+
+
+@pytest.fixture
+def records():
+    return [
+        {"id": i, "region": ["eu", "us", "ap"][i % 3], "score": i * 1.5,
+         "key": f"k{i:03}".encode()}
+        for i in range(100)
+    ] + [{"id": 100}, {"id": 101, "score": float("nan")}]
+
+
+@pytest.fixture
+def paths():
+    return [q["id"], q["region"], q["score"], q["key"]]
+
+
+@pytest.fixture
+def index(records, paths, tmp_path):
+    with Index.build(records, paths, str(tmp_path / "records.qfix")) as index:
+        yield index
+
+
+def scan(records, pred):
+    return [i for i, record in enumerate(records) if pred(record)]
+
+
+@pytest.mark.parametrize("make_pred", [
+    lambda: q["id"] == 42,
+    lambda: q["id"] == 42.0,
+    lambda: q["id"] == "42",
+    lambda: q["region"] == "eu",
+    lambda: q["region"] == "nowhere",
+    lambda: q["key"] == b"k007",
+    lambda: q["id"] < 10,
+    lambda: q["id"] <= 10,
+    lambda: q["id"] > 95,
+    lambda: q["id"] >= 95.5,
+    lambda: q["score"] >= 140,
+    lambda: q["score"] == float("nan"),
+    lambda: q["region"] < "f",
+    lambda: q["key"] > b"k097",
+    lambda: q_is_in(q["region"], {"us", "ap"}),
+    lambda: q_is_in(q["id"], [1, 5, 1000]),
+    lambda: q_missing(q["id"] < 3, "skip"),
+])
+def test_positions_match_scan(index, records, make_pred):
+    pred = make_pred()
+
+    assert index.can_answer(pred)
+    assert index.positions(pred) == scan(records, pred)
+
+
+def test_incomparable_range_criterion(index):
+    with pytest.raises(TypeError):
+        index.positions(q["region"] < 3)
+
+
+@pytest.mark.parametrize("pred", [
+    q["id"] != 3,
+    q_missing(q["id"] < 3, "true"),
+    q["unindexed"] == 1,
+    q_not(q["id"] == 1),
+    q["id"],
+    q_is_in(q["region"], "eus"),
+    q_is_in(q["region"], range(3)),
+])
+def test_cannot_answer(index, pred):
+    assert not index.can_answer(pred)
+    with pytest.raises(ValueError):
+        index.positions(pred)
+
+
+NON_BUILTIN_NUMBERS = [
+    lambda np: q["id"] == np.int64(3),
+    lambda np: q["id"] == np.float64(3.0),
+    lambda np: q["score"] >= np.float64(142.5),
+    lambda np: q["id"] < np.int32(4),
+    lambda np: q_is_in(q["id"], {np.int64(1), 2}),
+    lambda np: q["id"] == Decimal(3),
+    lambda np: q["id"] > Decimal("97.5"),
+    lambda np: q["score"] == Fraction(9, 2),
+    lambda np: q_is_in(q["id"], [Decimal(5), 7]),
+]
+
+
+@pytest.mark.parametrize("make_pred", NON_BUILTIN_NUMBERS)
+def test_non_builtin_numbers_match_scan(index, records, make_pred):
+    np = pytest.importorskip("numpy")
+    pred = make_pred(np)
+
+    assert not index.can_answer(pred)
+    expected = list(q_filter_all(records, pred))
+    assert expected
+    assert index.filter(records, pred) == expected
+
+
+def test_filter_with_string_container(index, records):
+    # "eu" and "us" are in "eus", though iterating it gives "e", "u" and "s"
+    pred = q_is_in(q["region"], "eus")
+
+    assert index.filter(records, pred) == [records[i]
+                                           for i in scan(records, pred)]
+
+
+def test_filter_with_membership_set(index, records, tmp_path):
+    path = str(tmp_path / "ids.qfms")
+    with MembershipSet.build([2, 3, 5, 7], path) as ids:
+        pred = q_is_in(q["id"], ids)
+
+        assert not index.can_answer(pred)
+        assert [record["id"] for record in index.filter(records, pred)] == [
+            2, 3, 5, 7
+        ]
+
+
+def test_filter(index, records):
+    results = index.filter(records, q["region"] == "eu", q["id"] < 30,
+                           q["score"] != 0)
+
+    assert [record["id"] for record in results] == [3, 6, 9, 12, 15, 18, 21,
+                                                    24, 27]
+
+
+def test_filter_without_indexed_predicates(index, records):
+    results = index.filter(records, q["id"] != 0, lambda r: r["id"] < 3)
+
+    assert [record["id"] for record in results] == [1, 2]
+
+
+def test_reopen_with_fingerprint(index, records, paths):
+    fingerprint = dataset_fingerprint(records, paths)
+    assert index.fingerprint == fingerprint
+
+    with Index(index.path, fingerprint=fingerprint) as reopened:
+        assert reopened.length == len(records)
+        assert reopened.positions(q["id"] == 7) == [7]
+        reopened.check(records)
+
+
+def test_stale_index(index, records, paths):
+    changed = [dict(record) for record in records]
+    changed[5]["region"] = "sa"
+
+    with pytest.raises(StaleIndexError):
+        Index(index.path, fingerprint=dataset_fingerprint(changed, paths))
+    with pytest.raises(StaleIndexError):
+        index.check(changed)
+    with pytest.raises(StaleIndexError):
+        index.filter(records[:-1], q["id"] == 1)
+
+
+def test_unindexable_values(tmp_path):
+    with pytest.raises(TypeError):
+        Index.build([{"a": 1}, {"a": "b"}], [q["a"]], str(tmp_path / "x"))
+
+
+def test_not_an_index_file(tmp_path):
+    path = tmp_path / "other"
+    path.write_bytes(bytes(128))
+    with pytest.raises(ValueError):
+        Index(str(path))
+
+
+def test_attribute_paths(tmp_path):
+    class Record:
+        def __init__(self, value):
+            self.value = value
+
+    records = [Record(3), Record(1), Record(2)]
+    with Index.build(records, [q.value], str(tmp_path / "attr")) as index:
+        assert repr(index.paths[0]) == "q.value"
+        assert index.positions(q.value >= 2) == [0, 2]
@@ -0,0 +1,103 @@
+import pytest
+
+from query_filter import q, q_join
+
+
+@pytest.fixture
+def versions():
+    return [
+        {"version": 1, "subnet": "s-1"},
+        {"version": 2, "subnet": "s-2"},
+        {"version": 3, "subnet": "s-1"},
+        {"version": 4, "subnet": "s-9"},
+        {"version": 5},
+    ]
+
+
+@pytest.fixture
+def subnets():
+    return [
+        {"id": "s-1", "zone": "a"},
+        {"id": "s-2", "zone": "b"},
+        {"id": "s-3", "zone": "a"},
+    ]
+
+
+def pairs(joined):
+    return [(left["version"], right and right["id"]) for left, right in joined]
+
+
+@pytest.mark.parametrize("build", ["left", "right"])
+def test_q_join_inner(versions, subnets, build):
+    joined = q_join(versions, subnets, on=(q["subnet"], q["id"]), build=build)
+    assert sorted(pairs(joined)) == [(1, "s-1"), (2, "s-2"), (3, "s-1")]
+
+
+@pytest.mark.parametrize("build", ["left", "right"])
+def test_q_join_left(versions, subnets, build):
+    joined = q_join(versions, subnets, on=(q["subnet"], q["id"]), how="left",
+                    build=build)
+    assert sorted(pairs(joined), key=lambda pair: pair[0]) == [
+        (1, "s-1"), (2, "s-2"), (3, "s-1"), (4, None), (5, None)
+    ]
+
+
+def test_q_join_streams_left_in_order(versions, subnets):
+    joined = q_join(iter(versions), iter(subnets), on=(q["subnet"], q["id"]),
+                    how="left")
+    assert pairs(joined) == [(1, "s-1"), (2, "s-2"), (3, "s-1"), (4, None),
+                             (5, None)]
+
+
+def test_q_join_builds_smaller_side(versions, subnets):
+    class Sized:
+        def __init__(self, objects):
+            self.objects = objects
+            self.consumed = 0
+
+        def __len__(self):
+            return len(self.objects)
+
+        def __iter__(self):
+            for obj in self.objects:
+                self.consumed += 1
+                yield obj
+
+    streamed = Sized(versions)
+    joined = q_join(subnets, streamed, on=(q["id"], q["subnet"]))
+    assert next(joined)[1]["version"] == 1
+    assert streamed.consumed == 1
+
+
+def test_q_join_duplicate_keys(subnets):
+    left = [{"subnet": "s-1", "n": 1}, {"subnet": "s-1", "n": 2}]
+    right = subnets + [{"id": "s-1", "zone": "c"}]
+    joined = q_join(left, right, on=(q["subnet"], q["id"]), build="right")
+    assert [(a["n"], b["zone"]) for a, b in joined] == [
+        (1, "a"), (1, "c"), (2, "a"), (2, "c")
+    ]
+
+
+def test_q_join_where(versions, subnets):
+    joined = q_join(versions, subnets, on=(q["subnet"], q["id"]),
+                    left_where=[q["version"] > 1],
+                    right_where=[q["zone"] == "a"])
+    assert pairs(joined) == [(3, "s-1")]
+
+
+def test_q_join_attributes():
+    class Obj:
+        def __init__(self, **kwargs):
+            self.__dict__.update(kwargs)
+
+    left = [Obj(key=1, name="one"), Obj(key=2, name="two")]
+    right = [Obj(ref=2, value="b")]
+    joined = list(q_join(left, right, on=(q.key, q.ref)))
+    assert [(a.name, b.value) for a, b in joined] == [("two", "b")]
+
+
+def test_q_join_invalid_arguments(versions, subnets):
+    with pytest.raises(ValueError):
+        q_join(versions, subnets, on=(q["subnet"], q["id"]), how="outer")
+    with pytest.raises(ValueError):
+        q_join(versions, subnets, on=(q["subnet"], q["id"]), build="both")
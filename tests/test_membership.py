@@ -0,0 +1,70 @@
+import pytest
+
+from query_filter import q, q_filter, q_is_in
+from query_filter.membership import MembershipSet
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "ids.qfms")
+
+
+@pytest.fixture
+def ids(path):
+    with MembershipSet.build(range(0, 20000, 2), path) as ids:
+        yield ids
+
+
+def test_membership_is_exact(ids):
+    assert len(ids) == 10000
+    assert all(i in ids for i in range(0, 20000, 2))
+    assert not any(i in ids for i in range(1, 20000, 2))
+
+
+def test_bloom_filter_rejects_most_non_members(ids):
+    candidates = sum(ids.might_contain(i) for i in range(1, 20000, 2))
+    assert candidates < 300
+
+
+def test_mixed_key_types(path):
+    with MembershipSet.build(["a", b"a", 1, "é"], path) as keys:
+        assert "a" in keys
+        assert b"a" in keys
+        assert "é" in keys
+        assert 1 in keys and 1.0 in keys and True in keys
+        assert "1" not in keys
+        assert b"b" not in keys
+        assert None not in keys
+        assert [1] not in keys
+
+
+def test_unsupported_keys(path):
+    with pytest.raises(TypeError):
+        MembershipSet.build([("a", 1)], path)
+
+
+def test_empty_set(path):
+    with MembershipSet.build([], path) as keys:
+        assert len(keys) == 0
+        assert "a" not in keys
+
+
+def test_reopen(ids, path):
+    with MembershipSet(path) as reopened:
+        assert 42 in reopened
+        assert 43 not in reopened
+
+
+def test_not_a_membership_set_file(tmp_path):
+    path = tmp_path / "other"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        MembershipSet(str(path))
+
+
+def test_q_is_in_membership_set(ids):
+    objects = [{"id": i} for i in range(10)]
+
+    results = q_filter(objects, q_is_in(q["id"], ids))
+
+    assert [obj["id"] for obj in results] == [0, 2, 4, 6, 8]
@@ -0,0 +1,152 @@
+import pytest
+
+from query_filter import (q, q_all, q_any, q_filter_all, q_filter_any,
+                          q_filter_not_any, q_is_in, q_missing, q_not)
+from query_filter.columnar import ColumnarSnapshot
+from query_filter.query import UNKNOWN, ObjNotFound, describe
+from query_filter.serialisation import dumps, loads, parse, to_text
+
+
+@pytest.fixture
+def hosts():
+    return [
+        {"id": 1, "region": "eu", "cores": 2},
+        {"id": 2, "region": "us", "cores": 8},
+        {"id": 3, "cores": 4},
+        {"id": 4, "region": "eu"},
+    ]
+
+
+def ids(objects):
+    return [obj["id"] for obj in objects]
+
+
+def test_default_policy_is_false(hosts):
+    assert ids(q_filter_all(hosts, q["region"] != "eu")) == [2]
+    assert ids(q_filter_all(hosts, q_not(q["region"] == "eu"))) == [2, 3]
+
+
+@pytest.mark.parametrize("missing, expected", [
+    ("false", [2]),
+    ("true", [2, 3]),
+    ("skip", [2]),
+])
+def test_q_missing(hosts, missing, expected):
+    pred = q_missing(q["region"] != "eu", missing)
+
+    assert ids(q_filter_all(hosts, pred)) == expected
+
+
+def test_q_missing_raise(hosts):
+    pred = q_missing(q["region"] == "eu", "raise")
+
+    with pytest.raises(ObjNotFound):
+        list(q_filter_all(hosts, pred))
+
+
+def test_q_missing_invalid_policy():
+    with pytest.raises(ValueError):
+        q_missing(q["region"] == "eu", "maybe")
+
+
+def test_q_missing_opaque_callable():
+    with pytest.raises(TypeError):
+        q_missing(lambda obj: True, "skip")
+
+
+def test_skip_is_unknown_under_q_not(hosts):
+    pred = q_missing(q["region"] == "eu", "skip")
+
+    assert q_not(pred)(hosts[2]) is UNKNOWN
+    assert ids(q_filter_all(hosts, q_not(pred))) == [2]
+    assert ids(q_filter_all(hosts, q_missing(~q["region"], "skip"))) == []
+
+
+def test_three_valued_combinators(hosts):
+    unknown = q_missing(q["region"] == "eu", "skip")
+    host = hosts[2]
+
+    assert q_all(unknown, q["cores"] > 2)(host) is UNKNOWN
+    assert q_all(unknown, q["cores"] > 8)(host) is False
+    assert q_any(unknown, q["cores"] > 2)(host) is True
+    assert q_any(unknown, q["cores"] > 8)(host) is UNKNOWN
+    assert q_not(q_any(unknown, q["cores"] > 8))(host) is UNKNOWN
+
+
+def test_q_filter_not_any_skips_unknown(hosts):
+    pred = q_missing(q["region"] == "us", "skip")
+
+    assert ids(q_filter_not_any(hosts, pred)) == [1, 4]
+    assert ids(q_filter_not_any(hosts, q["region"] == "us")) == [1, 3, 4]
+
+
+def test_filter_missing_policy(hosts):
+    assert ids(q_filter_all(hosts, q["region"] != "eu",
+                            missing="true")) == [2, 3]
+    assert ids(q_filter_any(hosts, q["region"] == "us", q["cores"] > 4,
+                            missing="skip")) == [2]
+    with pytest.raises(ObjNotFound):
+        list(q_filter_all(hosts, q["cores"] > 0, missing="raise"))
+
+
+def test_predicate_policy_overrides_filter_policy(hosts):
+    pred = q_missing(q["region"] != "eu", "false")
+
+    assert ids(q_filter_all(hosts, pred, q["cores"] > 0,
+                            missing="raise")) == [2]
+
+
+def test_filter_policy_applies_inside_combinators(hosts):
+    pred = q_not(q_any(q["region"] == "eu", q["cores"] > 4))
+
+    assert ids(q_filter_all(hosts, pred)) == [3]
+    assert ids(q_filter_all(hosts, pred, missing="skip")) == []
+    assert ids(q_filter_all(hosts, q_not(q["cores"] > 4))) == [1, 3, 4]
+    assert ids(q_filter_all(hosts, q_not(q["cores"] > 4),
+                            missing="true")) == [1, 3]
+
+
+def test_filter_policy_leaves_opaque_callables(hosts):
+    results = q_filter_all(hosts, lambda host: host["id"] > 1,
+                           missing="raise")
+
+    assert ids(results) == [2, 3, 4]
+
+
+def test_describe_and_serialise():
+    pred = q_all(q_missing(q["region"] == "eu", "skip"), q.cores)
+
+    assert describe(pred) == (
+        "q_all(q_missing(q['region'] == 'eu', 'skip'), q.cores)"
+    )
+    assert describe(parse(to_text(pred))) == describe(pred)
+    assert describe(loads(dumps(pred))) == describe(pred)
+
+
+@pytest.mark.parametrize("missing", ["false", "true", "skip"])
+@pytest.mark.parametrize("make_pred", [
+    lambda missing: q_missing(q["region"] == "eu", missing),
+    lambda missing: q_not(q_missing(q["region"] == "eu", missing)),
+    lambda missing: q_missing(q_is_in(q["cores"], {2, 8}), missing),
+    lambda missing: q_not(q_missing(q["cores"] > 2, missing)),
+    lambda missing: q_all(q_missing(q["region"] == "eu", missing),
+                          q_missing(q["cores"] < 4, missing)),
+    lambda missing: q_not(q_all(q_missing(q["region"] == "eu", missing),
+                                q_missing(q["cores"] < 4, missing))),
+    lambda missing: q_not(q_any(q_missing(q["region"] == "us", missing),
+                                q_missing(q["cores"] > 4, missing))),
+])
+def test_columnar_matches_filters(hosts, make_pred, missing):
+    pred = make_pred(missing)
+    expected = [i for i, host in enumerate(hosts) if pred(host)]
+
+    with ColumnarSnapshot.create(hosts, [q["region"], q["cores"]]) as snapshot:
+        assert snapshot.filter(pred) == expected
+
+
+def test_columnar_raise(hosts):
+    with ColumnarSnapshot.create(hosts, [q["region"]]) as snapshot:
+        with pytest.raises(ObjNotFound):
+            snapshot.filter(q_missing(q["region"] == "eu", "raise"))
+        assert snapshot.filter(q_missing(q["region"] == "eu", "raise"),
+                               stop=2) == [0]
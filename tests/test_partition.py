@@ -0,0 +1,105 @@
+import pytest
+
+from query_filter import q, q_partition, q_partition_by
+from query_filter.partition import _dispatch_table, _router
+from query_filter.profiling import Profiler
+
+
+@pytest.fixture
+def hosts():
+    return [
+        {"name": "a", "region": "eu", "cores": 2},
+        {"name": "b", "region": "us", "cores": 8},
+        {"name": "c", "region": "eu", "cores": 16},
+        {"name": "d", "region": "ap", "cores": 4},
+        {"name": "e", "cores": 1},
+    ]
+
+
+def names(objects):
+    return [obj["name"] for obj in objects]
+
+
+def test_q_partition_first_matching_bucket(hosts):
+    buckets = q_partition(hosts, {"big": q["cores"] >= 8,
+                                  "eu": q["region"] == "eu"})
+
+    assert {name: names(bucket) for name, bucket in buckets.items()} == {
+        "big": ["b", "c"], "eu": ["a"]
+    }
+
+
+def test_q_partition_default(hosts):
+    buckets = q_partition(hosts, {"big": q["cores"] >= 8}, default="rest")
+
+    assert names(buckets["rest"]) == ["a", "d", "e"]
+
+
+def test_q_partition_default_is_a_bucket(hosts):
+    buckets = q_partition(hosts, {"small": q["cores"] < 4, "big": q["cores"]},
+                          default="small")
+
+    assert names(buckets["small"]) == ["a", "e"]
+    assert names(buckets["big"]) == ["b", "c", "d"]
+
+
+def test_q_partition_dispatches_equality_on_one_path(hosts):
+    buckets = {"eu": q["region"] == "eu", "us": q["region"] == "us",
+               "also_eu": q["region"] == "eu"}
+    route = _router(buckets, "other")
+
+    assert _dispatch_table(list(buckets.items())) is not None
+    assert [route(host) for host in hosts] == ["eu", "us", "eu", "other",
+                                               "other"]
+
+
+def test_q_partition_doesnt_dispatch_mixed_predicates(hosts):
+    buckets = {"eu": q["region"] == "eu", "big": q["cores"] == 8}
+
+    assert _dispatch_table(list(buckets.items())) is None
+
+
+def test_q_partition_dispatch_with_unhashable_values():
+    class Unhashable(list):
+        def __eq__(self, other):
+            return other == "x"
+
+    objects = [{"v": Unhashable()}, {"v": "x"}, {"v": "y"}]
+    buckets = q_partition(objects, {"x": q["v"] == "x", "y": q["v"] == "y"})
+
+    assert buckets == {"x": objects[:2], "y": [objects[2]]}
+
+
+def test_q_partition_lazy(hosts):
+    objects = iter(hosts)
+    buckets = q_partition(objects, {"eu": q["region"] == "eu",
+                                    "us": q["region"] == "us"}, lazy=True)
+
+    assert next(buckets["us"])["name"] == "b"
+    assert next(objects)["name"] == "c"
+    assert names(buckets["eu"]) == ["a"]
+    assert names(buckets["us"]) == []
+
+
+def test_q_partition_lazy_queues_other_buckets(hosts):
+    buckets = q_partition(hosts, {"eu": q["region"] == "eu"}, default="rest",
+                          lazy=True)
+
+    assert names(buckets["rest"]) == ["b", "d", "e"]
+    assert names(buckets["eu"]) == ["a", "c"]
+
+
+def test_q_partition_profiled(hosts):
+    with Profiler() as profiler:
+        buckets = q_partition(hosts, {"eu": q["region"] == "eu",
+                                      "us": q["region"] == "us"})
+
+    assert names(buckets["eu"]) == ["a", "c"]
+    assert [stats.calls for stats in profiler.stats()] == [5, 3]
+
+
+def test_q_partition_by(hosts):
+    buckets = q_partition_by(hosts, q["region"])
+
+    assert list(buckets) == ["eu", "us", "ap"]
+    assert names(buckets["eu"]) == ["a", "c"]
@@ -0,0 +1,106 @@
+import pytest
+
+from query_filter import Pipeline, q, q_distinct, q_filter_all
+from query_filter.pipeline import StageStats
+from query_filter.select import q_select
+
+
+@pytest.fixture
+def hosts():
+    return [
+        {"id": 1, "region": "eu", "cores": 2},
+        {"id": 2, "region": "us", "cores": 8},
+        {"id": 3, "region": "eu", "cores": 4},
+        {"id": 4, "cores": 16},
+        {"id": 5, "region": "us", "cores": 4},
+        {"id": 6, "region": "ap", "cores": 8},
+    ]
+
+
+def test_matches_chained_functions(hosts):
+    pipeline = (Pipeline(hosts)
+                .where(q["cores"] >= 4)
+                .select({"id": q["id"], "region": q["region"]})
+                .distinct(q["region"]))
+    rows = q_select(q_filter_all(hosts, q["cores"] >= 4),
+                    {"id": q["id"], "region": q["region"]})
+
+    assert list(pipeline) == list(q_distinct(rows, q["region"]))
+
+
+def test_stages_leave_pipeline_unchanged(hosts):
+    pipeline = Pipeline(hosts).where(q["region"] == "eu")
+    limited = pipeline.limit(1)
+
+    assert [host["id"] for host in pipeline] == [1, 3]
+    assert [host["id"] for host in limited] == [1]
+
+
+def test_consecutive_where_stages_are_fused(hosts):
+    pipeline = Pipeline(hosts).where(q["cores"] > 2).where(q["region"])
+
+    assert [host["id"] for host in pipeline] == [2, 3, 5, 6]
+    assert [stats.description for stats in pipeline.stats()] == [
+        "where(q['cores'] > 2, q['region'])",
+    ]
+
+
+def test_stats(hosts):
+    pipeline = (Pipeline(hosts)
+                .where(q["cores"] >= 4)
+                .select((q["region"],), output="tuple")
+                .distinct()
+                .limit(2))
+
+    assert list(pipeline) == [("us",), ("eu",)]
+    assert pipeline.stats() == [
+        StageStats("where(q['cores'] >= 4)", 3, 2),
+        StageStats("select(q['region'])", 2, 2),
+        StageStats("distinct()", 2, 2),
+        StageStats("limit(2)", 2, 2),
+    ]
+
+
+def test_stats_during_iteration(hosts):
+    pipeline = Pipeline(hosts).where(q["cores"] == 8)
+    results = iter(pipeline)
+    next(results)
+
+    assert pipeline.stats() == [StageStats("where(q['cores'] == 8)", 2, 1)]
+
+
+def test_limit_stops_reading_source(hosts):
+    source = iter(hosts)
+    pipeline = Pipeline(source).where(q["region"] == "eu").limit(1)
+
+    assert [host["id"] for host in pipeline] == [1]
+    assert next(source)["id"] == 2
+
+
+def test_limit_zero_reads_nothing(hosts):
+    source = iter(hosts)
+
+    assert list(Pipeline(source).limit(0)) == []
+    assert next(source)["id"] == 1
+
+
+def test_negative_limit(hosts):
+    with pytest.raises(ValueError):
+        Pipeline(hosts).limit(-1)
+
+
+def test_distinct_resets_each_iteration(hosts):
+    pipeline = Pipeline(hosts).distinct(q["cores"])
+
+    assert list(pipeline) == list(pipeline)
+
+
+def test_where_missing_policy(hosts):
+    pipeline = Pipeline(hosts).where(q["region"] != "eu", missing="true")
+
+    assert [host["id"] for host in pipeline] == [2, 4, 5, 6]
+
+
+def test_select_rejects_column_outputs(hosts):
+    with pytest.raises(ValueError):
+        Pipeline(hosts).select([q["id"]], output="columns")
@@ -0,0 +1,156 @@
+from decimal import Decimal
+
+import pytest
+
+from query_filter import q, q_any, q_filter_all, q_is_in, q_matches_regex
+from query_filter import planner
+from query_filter.columnar import ColumnarSnapshot
+from query_filter.index import Index
+from query_filter.membership import MembershipSet
+from query_filter.planner import Plan, plan_filter, q_filter_auto
+from query_filter.profiling import Profiler
+
+SIZE = 3000
+
+
+@pytest.fixture(autouse=True)
+def small_threshold(monkeypatch):
+    monkeypatch.setattr(planner, "SCAN_BELOW", 1000)
+
+
+@pytest.fixture
+def records():
+    return [{"id": i, "region": ["eu", "us", "ap"][i % 3],
+             "score": i * 7919 % 1000, "name": f"host-{i}"}
+            for i in range(SIZE)]
+
+
+@pytest.fixture
+def index(records, tmp_path):
+    paths = [q["id"], q["region"], q["score"]]
+    with Index.build(records, paths, str(tmp_path / "records.qfix")) as index:
+        yield index
+
+
+@pytest.fixture
+def snapshot(records):
+    paths = [q["id"], q["region"], q["score"], q["name"]]
+    with ColumnarSnapshot.create(records, paths) as snapshot:
+        yield snapshot
+
+
+PREDICATES = [
+    [q["id"] == 42],
+    [q["region"] == "eu", q["score"] < 500],
+    [q_any(q["region"] == "us", q["score"] >= 990)],
+    [q_matches_regex(q["name"], "7$"), lambda record: record["id"] % 2],
+]
+
+
+@pytest.mark.parametrize("strategy", planner.STRATEGIES)
+@pytest.mark.parametrize("preds", PREDICATES)
+def test_strategies_give_same_results(records, index, snapshot, strategy,
+                                      preds):
+    try:
+        results = q_filter_auto(records, *preds, index=index,
+                                snapshot=snapshot, strategy=strategy)
+    except ValueError:
+        pytest.skip(f"{strategy} can't evaluate these predicates")
+
+    assert results == list(q_filter_all(records, *preds))
+
+
+def test_chooses_index_for_selective_equality(records, index, snapshot):
+    plan = plan_filter(records, q["id"] == 42, index=index, snapshot=snapshot)
+
+    assert plan.strategy == "index"
+    assert plan.reason == "lowest estimated cost"
+    assert set(plan.costs) == {"scan", "index", "columnar"}
+    assert plan.sample_size == planner._SAMPLE_SIZE
+
+
+def test_scans_for_opaque_callables(records, index, snapshot):
+    plan = plan_filter(records, lambda record: record["id"] == 42,
+                       index=index, snapshot=snapshot)
+
+    assert plan.strategy == "scan"
+    assert set(plan.costs) == {"scan"}
+
+
+@pytest.mark.parametrize("objects, reason", [
+    (lambda records: records[:10], "small collection"),
+    (lambda records: iter(records), "not a sequence"),
+])
+def test_scans_without_planning(records, index, objects, reason):
+    plan = plan_filter(objects(records), q["id"] == 42, index=index)
+
+    assert plan == Plan("scan", reason)
+
+
+def test_scans_without_alternatives(records):
+    assert plan_filter(records, q["id"] == 42) == Plan(
+        "scan", "no index or snapshot"
+    )
+
+
+def test_stale_index_is_not_used(records, index):
+    plan = plan_filter(records[:-1], q["id"] == 42, index=index)
+
+    assert plan.strategy == "scan"
+
+
+def test_strategy_override(records, index):
+    plan = plan_filter(records, q["id"] == 42, index=index, strategy="scan")
+
+    assert plan == Plan("scan", "requested")
+
+
+@pytest.mark.parametrize("strategy", ["index", "columnar", "fastest"])
+def test_unavailable_strategy(records, index, strategy):
+    with pytest.raises(ValueError):
+        plan_filter(records, q["name"] == "host-1", index=index,
+                    strategy=strategy)
+
+
+def test_profiler_records_plans(records, index):
+    with Profiler() as profiler:
+        q_filter_auto(records, q["id"] == 42, index=index)
+        q_filter_auto(records[:10], q["id"] == 42, index=index)
+
+    assert [plan.strategy for plan in profiler.plans()] == ["index", "scan"]
+
+
+def test_profiler_excludes_planning(records, index):
+    pred = q["id"] == 42
+    with Profiler() as profiler:
+        q_filter_auto(records, pred, index=index, strategy="scan")
+        q_filter_auto(records, pred, index=index)
+
+    assert [plan.strategy for plan in profiler.plans()] == ["scan", "index"]
+    # Only the scan calls the predicate; the index answers it alone
+    assert [stats.calls for stats in profiler.stats()] == [SIZE]
+
+
+def test_index_strategy_with_non_builtin_numbers(records, index):
+    np = pytest.importorskip("numpy")
+    preds = [q["region"] == "eu", q["score"] < np.float64(500.5),
+             q_is_in(q["id"], {np.int64(3), Decimal(6), 9, 12})]
+    expected = list(q_filter_all(records, *preds))
+
+    assert expected
+    assert q_filter_auto(records, *preds, index=index,
+                         strategy="index") == expected
+    # The index can't answer any of these, rather than answering wrongly
+    with pytest.raises(ValueError):
+        q_filter_auto(records, q["id"] == np.int64(3), q["id"] < Decimal(5),
+                      index=index, strategy="index")
+
+
+def test_containers_the_index_cannot_iterate(records, index, tmp_path):
+    path = str(tmp_path / "ids.qfms")
+    with MembershipSet.build([4, 8, 15], path) as ids:
+        preds = [q_is_in(q["id"], ids), q_is_in(q["region"], "eus")]
+
+        assert q_filter_auto(records, *preds, index=index) == list(
+            q_filter_all(records, *preds)
+        )
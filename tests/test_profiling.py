@@ -0,0 +1,94 @@
+import pytest
+
+from query_filter import (q, q_filter_all, q_filter_any, q_filter_not_any,
+                          q_is_in)
+from query_filter.profiling import PredicateStats, Profiler, active_profiler
+
+
+@pytest.fixture
+def records():
+    return [
+        {"id": 1, "region": "eu-west-1", "size": 3},
+        {"id": 2, "region": "us-east-1", "size": 8},
+        {"id": 3, "size": 5},
+        {"id": 4, "region": "eu-west-1"},
+    ]
+
+
+def counts(stats):
+    return (stats.calls, stats.passed, stats.failed, stats.missing)
+
+
+def test_profiler_records_predicate_stats(records):
+    with Profiler() as profiler:
+        results = list(q_filter_all(records,
+                                    q["region"] == "eu-west-1",
+                                    q["size"] > 2))
+
+    assert results == [records[0]]
+    region_stats, size_stats = profiler.stats()
+    assert region_stats.description == "q['region'] == 'eu-west-1'"
+    assert counts(region_stats) == (4, 2, 1, 1)
+    assert size_stats.description == "q['size'] > 2"
+    assert counts(size_stats) == (2, 1, 0, 1)
+    assert region_stats.time > 0
+
+
+def test_profiler_with_any_and_not_any(records):
+    pred = q_is_in(q["region"], {"us-east-1"})
+
+    with Profiler() as profiler:
+        list(q_filter_any(records, pred))
+        list(q_filter_not_any(records, pred, q["size"]))
+
+    pred_stats, size_stats = profiler.stats()
+    assert counts(pred_stats) == (8, 2, 4, 2)
+    assert counts(size_stats) == (3, 2, 0, 1)
+
+
+def test_profiler_custom_predicate(records):
+    def has_even_id(record):
+        return record["id"] % 2 == 0
+
+    with Profiler() as profiler:
+        list(q_filter_all(records, has_even_id))
+
+    (stats,) = profiler.stats()
+    assert stats.description.endswith("has_even_id")
+    assert counts(stats) == (4, 2, 2, 0)
+
+
+def test_profiler_only_instruments_filters_created_while_active(records):
+    with Profiler() as profiler:
+        pass
+
+    list(q_filter_all(records, q["size"]))
+
+    assert profiler.stats() == []
+    assert active_profiler() is None
+
+
+def test_profiler_callback(records):
+    exported = []
+
+    with Profiler(callback=exported.append):
+        list(q_filter_all(records, q["size"]))
+
+    assert exported == [[PredicateStats(description="q['size']",
+                                        calls=4, passed=3, failed=0,
+                                        missing=1,
+                                        time=exported[0][0].time)]]
+
+
+def test_profiler_reset(records):
+    with Profiler() as profiler:
+        list(q_filter_all(records, q["size"]))
+        profiler.reset()
+
+    assert profiler.stats() == []
+
+
+def test_only_one_profiler_active():
+    with Profiler():
+        with pytest.raises(RuntimeError):
+            Profiler().start()
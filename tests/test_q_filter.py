@@ -1,7 +1,8 @@
 import pytest
 
-from query_filter import (q, q_all, q_any, q_contains, q_filter_all,
-                          q_filter_any, q_filter_not_any, q_not)
+from query_filter import (q, q_all, q_any, q_contains, q_distinct,
+                          q_filter_all, q_filter_any, q_filter_not_any,
+                          q_first, q_not, q_top_k)
 
 
 @pytest.fixture
@@ -230,3 +231,144 @@ def test_not_with_all(
                                        q["dose_mg"] > 400)))
 
     assert list(results) == expected
+
+
+def test_q_filter_all_with_limit(all_trials, trial_three, trial_four):
+    expected = [trial_three, trial_four]
+
+    results = q_filter_all(all_trials, ~q["survived"], limit=2)
+
+    assert list(results) == expected
+
+
+def test_q_filter_any_with_limit(all_trials, trial_one):
+    expected = [trial_one]
+
+    results = q_filter_any(all_trials,
+                           q["survived"],
+                           q_contains(q["date"], "2003"),
+                           limit=1)
+
+    assert list(results) == expected
+
+
+def test_q_filter_not_any_with_limit(all_trials, trial_three, trial_four,
+                                     trial_five):
+    expected = [trial_three, trial_four, trial_five]
+
+    results = q_filter_not_any(all_trials, q["survived"], limit=10)
+
+    assert list(results) == expected
+
+
+def test_limit_stops_consuming_objects(all_trials, trial_one):
+    objects = iter(all_trials)
+
+    results = list(q_filter_all(objects, q["dose_mg"] < 100, limit=1))
+
+    assert results == [trial_one]
+    assert next(objects) is all_trials[1]
+
+
+def test_q_first(all_trials, trial_three):
+    result = q_first(all_trials, ~q["survived"], q["dose_mg"] > 400)
+
+    assert result is trial_three
+
+
+def test_q_first_default(all_trials):
+    sentinel = object()
+
+    result = q_first(all_trials, q["dose_mg"] > 1000, default=sentinel)
+
+    assert result is sentinel
+
+
+def test_q_top_k(all_trials, trial_two, trial_three, trial_four):
+    expected = [trial_two, trial_three, trial_four]
+
+    results = q_top_k(all_trials, q["dose_mg"], 3)
+
+    assert results == expected
+
+
+def test_q_top_k_smallest_with_predicates(all_trials, trial_four, trial_five):
+    expected = [trial_five, trial_four]
+
+    results = q_top_k(all_trials, q["dose_mg"], 2, ~q["survived"],
+                      largest=False)
+
+    assert results == expected
+
+
+def test_q_top_k_skips_missing_keys(all_trials, trial_two):
+    objects = [{"id": 0}, *all_trials]
+
+    results = q_top_k(objects, q["dose_mg"], 1)
+
+    assert results == [trial_two]
+
+
+def test_q_filter_all_with_distinct(all_trials, trial_one, trial_three):
+    expected = [trial_one, trial_three]
+
+    results = q_filter_all(all_trials, q["dose_mg"] > 0,
+                           distinct=q["survived"])
+
+    assert list(results) == expected
+
+
+def test_q_filter_any_with_distinct_and_limit(all_trials, trial_one,
+                                              trial_two):
+    expected = [trial_one, trial_two]
+
+    results = q_filter_any(all_trials, q["survived"], q["dose_mg"] > 400,
+                           distinct=[q["survived"], q["date"]], limit=2)
+
+    assert list(results) == expected
+
+
+def test_q_distinct(all_trials, trial_one, trial_three):
+    objects = [*all_trials, *all_trials]
+    expected = [trial_one, trial_three]
+
+    results = q_distinct(objects, q["survived"])
+
+    assert list(results) == expected
+
+
+def test_q_distinct_multiple_keys(all_trials):
+    objects = [*all_trials, *all_trials]
+
+    results = q_distinct(objects, q["id"], q["survived"])
+
+    assert list(results) == all_trials
+
+
+def test_q_distinct_without_keys():
+    assert list(q_distinct([1, 2, 1, 3, 2])) == [1, 2, 3]
+
+
+def test_q_distinct_missing_values(trial_one):
+    objects = [{"id": 0}, trial_one, {"id": 6}]
+
+    results = q_distinct(objects, q["dose_mg"])
+
+    assert list(results) == [{"id": 0}, trial_one]
+
+
+def test_q_distinct_window():
+    objects = [{"id": i} for i in [1, 2, 1, 3, 4, 1, 4]]
+
+    results = q_distinct(objects, q["id"], window=2)
+
+    assert [obj["id"] for obj in results] == [1, 2, 3, 4, 1]
+
+
+def test_q_distinct_is_lazy(all_trials):
+    objects = iter(all_trials)
+
+    results = q_distinct(objects, q["survived"])
+
+    assert next(results) is all_trials[0]
+    assert next(objects) is all_trials[1]
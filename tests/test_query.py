@@ -1,7 +1,7 @@
 import pytest
 
 from query_filter import query
-from query_filter.filter import q_filter
+from query_filter.filter import q_all, q_any, q_filter, q_not
 
 # Using a Query instance to test the public API
 q = query.Query()
@@ -232,3 +232,17 @@ def test_retrieve_value_invalid_lookup_type():
     with pytest.raises(ValueError):
         query.retrieve_value(object(),
                              query.Lookup(lookup_type=3.14, key="irrelevant"))
+
+
+@pytest.mark.parametrize("pred, expected", [
+    (q["a"].b[0], "q['a'].b[0]"),
+    (q["a"] <= 1, "q['a'] <= 1"),
+    (~q.active, "~q.active"),
+    (query.q_is_in(q.state, ["Texas"]), "q_is_in(q.state, ['Texas'])"),
+    (query.q_matches_regex(q.name, r"^A"), "q_matches_regex(q.name, '^A')"),
+    (query.truthy(q.name), "q.name"),
+    (q_all(q.a, q_not(q.b == 2)), "q_all(q.a, q_not(q.b == 2))"),
+    (q_any(q.a, q.b), "q_any(q.a, q.b)"),
+])
+def test_describe(pred, expected):
+    assert query.describe(pred) == expected
@@ -0,0 +1,163 @@
+import json
+
+import pytest
+
+from query_filter import q, q_filter_all
+from query_filter.resumable import Checkpoint, q_filter_resumable
+
+RECORDS = [{"id": i, "region": ["eu", "us", "ap"][i % 3], "score": i % 7}
+           for i in range(100)]
+
+
+class Interrupted(Exception):
+    pass
+
+
+def decode_until(stop_id):
+    def decode(line):
+        record = json.loads(line)
+        if record["id"] == stop_id:
+            raise Interrupted
+        return record
+
+    return decode
+
+
+@pytest.fixture
+def paths(tmp_path):
+    source = tmp_path / "records.jsonl"
+    source.write_text("".join(json.dumps(record) + "\n"
+                              for record in RECORDS))
+    return source, tmp_path / "output.jsonl", tmp_path / "checkpoint.json"
+
+
+def read_output(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_filters_file(paths):
+    source, output, checkpoint = paths
+
+    result = q_filter_resumable(source, output, q["region"] == "eu",
+                                checkpoint_path=checkpoint, every=10)
+
+    expected = list(q_filter_all(RECORDS, q["region"] == "eu"))
+    assert read_output(output) == expected
+    assert result.read == 100
+    assert result.written == len(expected)
+    assert result.position == source.stat().st_size
+    assert result.output_size == output.stat().st_size
+    assert result.stats[0].calls == 100
+    assert result.stats[0].passed == len(expected)
+
+
+def test_copies_lines_unchanged(tmp_path):
+    source = tmp_path / "records.jsonl"
+    source.write_text('{"id": 1,  "ok": true}\n\n{"id": 2, "ok": false}')
+    output = tmp_path / "output.jsonl"
+
+    q_filter_resumable(source, output, q["id"] > 0,
+                       checkpoint_path=tmp_path / "checkpoint.json")
+
+    assert output.read_text() == '{"id": 1,  "ok": true}\n{"id": 2, "ok": false}\n'
+
+
+@pytest.mark.parametrize("interrupt_at", [5, 37, 99])
+def test_resumes_after_interruption(paths, tmp_path, interrupt_at):
+    source, output, checkpoint = paths
+    preds = [q["score"] > 2, q["region"] != "us"]
+    uninterrupted = q_filter_resumable(source, tmp_path / "expected.jsonl",
+                                       *preds,
+                                       checkpoint_path=tmp_path / "other.json")
+
+    with pytest.raises(Interrupted):
+        q_filter_resumable(source, output, *preds,
+                           checkpoint_path=checkpoint, every=10,
+                           decode=decode_until(interrupt_at))
+    if interrupt_at < 10:
+        assert not checkpoint.exists()
+    else:
+        saved = json.loads(checkpoint.read_text())
+        assert saved["read"] == interrupt_at // 10 * 10
+
+    result = q_filter_resumable(source, output, *preds,
+                                checkpoint_path=checkpoint, every=10)
+
+    assert output.read_bytes() == (tmp_path / "expected.jsonl").read_bytes()
+    assert (result.read, result.written, result.position) == (
+        uninterrupted.read, uninterrupted.written, uninterrupted.position
+    )
+    assert [(stats.calls, stats.passed) for stats in result.stats] == [
+        (stats.calls, stats.passed) for stats in uninterrupted.stats
+    ]
+
+
+def test_discards_output_after_checkpoint(paths):
+    source, output, checkpoint = paths
+    q_filter_resumable(source, output, q["id"] < 50,
+                       checkpoint_path=checkpoint)
+    expected = output.read_bytes()
+    with open(output, "ab") as file:
+        file.write(b'{"partial": ')
+
+    q_filter_resumable(source, output, q["id"] < 50,
+                       checkpoint_path=checkpoint)
+
+    assert output.read_bytes() == expected
+
+
+def test_resumes_appended_source(paths):
+    source, output, checkpoint = paths
+    q_filter_resumable(source, output, q["region"] == "eu",
+                       checkpoint_path=checkpoint)
+    with open(source, "a") as file:
+        file.write(json.dumps({"id": 100, "region": "eu"}) + "\n")
+
+    result = q_filter_resumable(source, output, q["region"] == "eu",
+                                checkpoint_path=checkpoint)
+
+    assert read_output(output)[-1] == {"id": 100, "region": "eu"}
+    assert result.read == 101
+
+
+def test_record_source(tmp_path):
+    output = tmp_path / "output.jsonl"
+    starts = []
+
+    def source(start):
+        starts.append(start)
+        return RECORDS[start:]
+
+    result = q_filter_resumable(source, output, q["score"] == 0,
+                                checkpoint_path=tmp_path / "checkpoint.json",
+                                every=25)
+
+    assert read_output(output) == list(q_filter_all(RECORDS,
+                                                    q["score"] == 0))
+    assert starts == [0]
+    assert result.position == 100
+
+
+def test_different_predicates(paths):
+    source, output, checkpoint = paths
+    q_filter_resumable(source, output, q["id"] < 50,
+                       checkpoint_path=checkpoint)
+
+    with pytest.raises(ValueError):
+        q_filter_resumable(source, output, q["id"] < 60,
+                           checkpoint_path=checkpoint)
+
+
+def test_checkpoint_contents(paths):
+    source, output, checkpoint = paths
+    q_filter_resumable(source, output, q["id"] < 50,
+                       checkpoint_path=checkpoint)
+
+    saved = json.loads(checkpoint.read_text())
+
+    assert saved["predicates"] == ["q['id'] < 50"]
+    assert saved["read"] == 100
+    assert saved["written"] == 50
+    assert set(saved["stats"][0]) >= {"calls", "passed", "missing"}
+    assert not checkpoint.with_name("checkpoint.json.tmp").exists()
+    assert isinstance(Checkpoint(**{**saved, "stats": []}), Checkpoint)
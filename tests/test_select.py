@@ -0,0 +1,82 @@
+from array import array
+
+import pytest
+
+from query_filter import q, q_select
+
+
+@pytest.fixture
+def instances():
+    return [
+        {"id": "i-1", "state": "running",
+         "network": {"subnet": "s-1", "ip": "10.0.0.1"}, "cores": 2},
+        {"id": "i-2", "state": "stopped",
+         "network": {"subnet": "s-2", "ip": "10.0.0.2"}, "cores": 4},
+        {"id": "i-3", "state": "running", "network": {"subnet": "s-1"},
+         "cores": 8},
+    ]
+
+
+@pytest.fixture
+def fields():
+    return {"id": q["id"], "subnet": q["network"]["subnet"],
+            "ip": q["network"]["ip"]}
+
+
+def test_q_select_dicts(instances, fields):
+    assert list(q_select(instances, fields)) == [
+        {"id": "i-1", "subnet": "s-1", "ip": "10.0.0.1"},
+        {"id": "i-2", "subnet": "s-2", "ip": "10.0.0.2"},
+        {"id": "i-3", "subnet": "s-1", "ip": None},
+    ]
+
+
+def test_q_select_where(instances, fields):
+    rows = q_select(instances, fields, where=[q["state"] == "running",
+                                              q["cores"] > 2],
+                    output="tuple")
+    assert list(rows) == [("i-3", "s-1", None)]
+
+
+def test_q_select_default(instances):
+    rows = q_select(instances, [q["network"]["ip"]], output="tuple",
+                    default="-")
+    assert list(rows) == [("10.0.0.1",), ("10.0.0.2",), ("-",)]
+
+
+def test_q_select_namedtuples(instances, fields):
+    (row, *_) = q_select(instances, fields, output="namedtuple")
+    assert row.id == "i-1"
+    assert row.subnet == "s-1"
+    assert row._fields == ("id", "subnet", "ip")
+
+
+def test_q_select_sequence_of_queries(instances):
+    (row, *_) = q_select(instances, [q["id"], q["cores"]])
+    assert row == {"q['id']": "i-1", "q['cores']": 2}
+
+
+def test_q_select_is_lazy(instances, fields):
+    objects = iter(instances)
+    rows = q_select(objects, fields)
+    assert next(rows)["id"] == "i-1"
+    assert next(objects)["id"] == "i-2"
+
+
+def test_q_select_columns(instances, fields):
+    columns = q_select(instances, fields, where=[q["state"] == "running"],
+                       output="columns")
+    assert columns == {"id": ["i-1", "i-3"], "subnet": ["s-1", "s-1"],
+                       "ip": ["10.0.0.1", None]}
+
+
+def test_q_select_arrays(instances):
+    columns = q_select(instances, {"id": q["id"], "cores": q["cores"]},
+                       output="arrays")
+    assert columns["cores"] == array("q", [2, 4, 8])
+    assert columns["id"] == ["i-1", "i-2", "i-3"]
+
+
+def test_q_select_invalid_output(instances, fields):
+    with pytest.raises(ValueError):
+        q_select(instances, fields, output="xml")
@@ -0,0 +1,158 @@
+import json
+import re
+
+import pytest
+
+from query_filter import (q, q_all, q_any, q_contains, q_filter, q_is,
+                          q_is_in, q_is_not, q_matches_regex, q_not)
+from query_filter.serialisation import (QuerySyntaxError, dumps, from_data,
+                                        loads, parse, parse_query, to_text)
+
+
+@pytest.fixture
+def records():
+    return [
+        {"id": 1, "name": "Ann", "tags": ["a"], "owner": {"team": "core"}},
+        {"id": 2, "name": "Bob", "tags": ["b"], "owner": None},
+        {"id": 3, "name": "Cat", "tags": [], "active": True},
+        {"id": 4, "name": "Dan", "active": False},
+    ]
+
+
+PREDICATES = [
+    q["id"] < 2,
+    q["id"] <= 2,
+    q["id"] == 2,
+    q["id"] != 2,
+    q["id"] > 2,
+    q["id"] >= 2,
+    q["active"],
+    ~q["active"],
+    q_is(q["owner"], None),
+    q_is_not(q["owner"], None),
+    q_contains(q["tags"], "a"),
+    q_is_in(q["name"], {"Ann", "Dan"}),
+    q_is_in(q["id"], (1, 3)),
+    q_matches_regex(q["name"], r"^[AB]"),
+    q["owner"]["team"] == "core",
+    q_all(q["id"] > 1, q_not(q["active"])),
+    q_any(q["id"] == 1, q_is_in(q["name"], ["Cat"])),
+]
+
+
+def matches(records, pred):
+    return [record["id"] for record in q_filter(records, pred)]
+
+
+@pytest.mark.parametrize("pred", PREDICATES)
+def test_text_round_trip(records, pred):
+    parsed = parse(to_text(pred))
+
+    assert matches(records, parsed) == matches(records, pred)
+
+
+@pytest.mark.parametrize("pred", PREDICATES)
+def test_json_round_trip(records, pred):
+    loaded = loads(dumps(pred))
+
+    assert matches(records, loaded) == matches(records, pred)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("q['id'] > 1 and not q['active']", [2, 4]),
+    ("q['id'] == 1 or q['name'] == 'Dan'", [1, 4]),
+    ("not q['tags']", [3, 4]),
+    ("q_is_in(q['id'], {-1, 3})", [3]),
+])
+def test_parse_boolean_operators(records, text, expected):
+    records[1]["active"] = False
+
+    assert matches(records, parse(text)) == expected
+
+
+def test_parse_query():
+    query = parse_query('q["a"].b[0]')
+
+    assert repr(query) == "q['a'].b[0]"
+
+
+def test_parse_is_cached():
+    text = "q['id'] == 12345"
+
+    assert parse(text) is parse(text)
+
+
+def test_loads_is_cached():
+    text = '{"op":"eq","path":["id"],"args":[1]}'
+
+    assert loads(text) is loads(text)
+
+
+def test_dumps_format():
+    data = json.loads(dumps(q_is_in(q["a"].b, {1})))
+
+    assert data == {"op": "is_in", "path": ["a", {"attr": "b"}],
+                    "args": [{"set": [1]}]}
+
+
+@pytest.mark.parametrize("text", [
+    "__import__('os').system('true')",
+    "q.__class__",
+    "q['a'] == open('x')",
+    "q['a'] < 1 < 2",
+    "q['a'] in [1]",
+    "q_is_in(q['a'], [1], extra=1)",
+    "len(q['a'])",
+    "r['a'] == 1",
+    "q[",
+    "q['a'] == q['b']",
+    "q.a == {[1]: 2}",
+    "q_is_in(q.a, {1, [2]})",
+    "q[[1]]",
+    "not " * 3000 + "q.a",
+])
+def test_parse_rejects_unsupported(text):
+    with pytest.raises(QuerySyntaxError):
+        parse(text)
+
+
+def test_parse_query_rejects_predicate():
+    with pytest.raises(QuerySyntaxError):
+        parse_query("q.a == 1")
+
+
+@pytest.mark.parametrize("text", [
+    "[]",
+    '{"op": "exec", "path": []}',
+    '{"op": "eq", "path": "a", "args": [1]}',
+    '{"op": "eq", "path": [{"item": 1}], "args": [1]}',
+    '{"op": "eq", "path": ["a"], "args": [{"frozenset": []}]}',
+    '{"op": "is_in", "path": ["a"], "args": [{"set": [[1]]}]}',
+    '{"op": "is_in", "path": ["a"], "args": [{"dict": [[1]]}]}',
+    '{"op": "truthy", "path": [["x"]]}',
+    '{"op": "truthy", "path": [{"attr": 1}]}',
+    "[" * 100_000 + "]" * 100_000,
+    "{",
+])
+def test_loads_rejects_invalid(text):
+    with pytest.raises(QuerySyntaxError):
+        loads(text)
+
+
+def test_from_data_rejects_deep_nesting():
+    data = {"op": "truthy", "path": ["a"]}
+    for _ in range(100_000):
+        data = {"op": "not", "preds": [data]}
+
+    with pytest.raises(QuerySyntaxError):
+        from_data(data)
+
+
+def test_custom_predicate_not_serialisable():
+    with pytest.raises(TypeError):
+        dumps(lambda obj: True)
+
+
+def test_to_text_rejects_unparseable_criteria():
+    with pytest.raises(QuerySyntaxError):
+        to_text(q_matches_regex(q.name, re.compile("a")))
@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from query_filter import q, q_merge, q_sort
+from query_filter.query import SortKey
+
+
+@pytest.fixture
+def people():
+    return [
+        {"name": "ada", "age": 36, "team": {"name": "core"}},
+        {"name": "bob", "age": 25, "team": {"name": "web"}},
+        {"name": "cy", "team": {"name": "core"}},
+        {"name": "dee", "age": 25, "team": {"name": "core"}},
+        {"name": "eve", "age": 41},
+    ]
+
+
+def names(objects):
+    return [obj["name"] for obj in objects]
+
+
+def test_negated_query_is_descending_key():
+    key = -q.a
+    assert isinstance(key, SortKey)
+    assert key.descending
+    assert tuple(key.query) == tuple(q.a)
+    assert not (+q.a).descending
+
+
+def test_q_sort_ascending(people):
+    assert names(q_sort(people, q["age"])) == ["bob", "dee", "ada", "eve",
+                                               "cy"]
+
+
+def test_q_sort_descending(people):
+    assert names(q_sort(people, -q["age"])) == ["eve", "ada", "bob", "dee",
+                                                "cy"]
+
+
+def test_q_sort_missing_first(people):
+    assert names(q_sort(people, q["age"], missing="first")) == [
+        "cy", "bob", "dee", "ada", "eve"
+    ]
+    assert names(q_sort(people, -q["age"], missing="first")) == [
+        "cy", "eve", "ada", "bob", "dee"
+    ]
+
+
+def test_q_sort_invalid_missing(people):
+    with pytest.raises(ValueError):
+        q_sort(people, q["age"], missing="middle")
+
+
+def test_q_sort_multiple_keys(people):
+    assert names(q_sort(people, q["team"]["name"], -q["name"])) == [
+        "dee", "cy", "ada", "bob", "eve"
+    ]
+    assert names(q_sort(people, -q["team"]["name"], q["age"])) == [
+        "bob", "dee", "ada", "cy", "eve"
+    ]
+
+
+def test_q_sort_is_stable(people):
+    assert names(q_sort(people, q["team"]["name"])) == [
+        "ada", "cy", "dee", "bob", "eve"
+    ]
+
+
+def test_q_sort_without_keys():
+    assert q_sort([3, 1, 2]) == [1, 2, 3]
+
+
+def test_q_sort_mixed_keys_match_sorted():
+    rows = [{"a": random.randrange(5), "b": random.randrange(5), "i": i}
+            for i in range(200)]
+    expected = sorted(rows, key=lambda row: (row["a"], -row["b"]))
+    assert q_sort(rows, q["a"], -q["b"]) == expected
+    assert q_sort(rows, q["a"], -q["b"], limit=10) == expected[:10]
+
+
+@pytest.mark.parametrize("limit", [0, 2, 10])
+def test_q_sort_limit(people, limit):
+    assert (q_sort(iter(people), -q["age"], q["name"], limit=limit)
+            == q_sort(people, -q["age"], q["name"])[:limit])
+
+
+def test_q_merge(people):
+    first = q_sort(people[:2], -q["age"])
+    second = q_sort(people[2:], -q["age"])
+    merged = q_merge([first, second], -q["age"])
+    assert names(merged) == names(q_sort(people, -q["age"]))
+
+
+def test_q_merge_is_lazy():
+    merged = q_merge([iter([{"a": 1}, {"a": 3}]), iter([{"a": 2}])], q["a"])
+    assert next(merged) == {"a": 1}
@@ -0,0 +1,284 @@
+import collections
+import operator
+
+import pytest
+
+from query_filter import query
+
+q = query.Query()
+
+try:
+    from query_filter import _speedups
+except ImportError:
+    _speedups = None
+
+requires_speedups = pytest.mark.skipif(_speedups is None,
+                                       reason="C extension not built")
+
+
+@pytest.fixture(params=["python", pytest.param("c", marks=requires_speedups)])
+def retrieve_value(request):
+    if request.param == "python":
+        return query._py_retrieve_value
+    query._setup_speedups(_speedups)
+    return _speedups.retrieve_value
+
+
+@pytest.fixture(params=["python", pytest.param("c", marks=requires_speedups)])
+def lookup_value(request):
+    if request.param == "python":
+        return query._py_lookup_value
+    query._setup_speedups(_speedups)
+    return _speedups.lookup_value
+
+
+@pytest.fixture(params=["python", pytest.param("c", marks=requires_speedups)])
+def predicate(request):
+    if request.param == "python":
+        return query._py_predicate
+    query._setup_speedups(_speedups)
+    return _speedups.Predicate
+
+
+@pytest.fixture(params=["python", pytest.param("c", marks=requires_speedups)])
+def combined(request):
+    if request.param == "python":
+        return query._py_combined
+    query._setup_speedups(_speedups)
+    return _speedups.Combined
+
+
+class Node:
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+
+
+@pytest.fixture
+def data():
+    return {
+        "users": [
+            {"name": "Tom", "age": 31, "tags": ["admin", "ops"]},
+            {"name": "Amy", "age": 28, "node": Node("leaf", Node("root"))},
+        ]
+    }
+
+
+def test_retrieve_value_nested(retrieve_value, data):
+    assert retrieve_value(data, *q["users"][1]["node"].parent.name) == "root"
+
+
+def test_retrieve_value_no_lookups(retrieve_value, data):
+    assert retrieve_value(data) is data
+
+
+@pytest.mark.parametrize("query_", [
+    q["groups"],
+    q["users"][2],
+    q["users"][0].name,
+    q["users"][0]["name"]["first"],
+    q["users"][1]["node"].grandparent,
+])
+def test_retrieve_value_not_found(retrieve_value, data, query_):
+    with pytest.raises(query.ObjNotFound):
+        retrieve_value(data, *query_)
+
+
+def test_retrieve_value_invalid_lookup_type(retrieve_value):
+    with pytest.raises(ValueError):
+        retrieve_value({}, query.Lookup(lookup_type=3.14, key="irrelevant"))
+
+
+def test_retrieve_value_propagates_other_errors(retrieve_value):
+    class Exploding:
+        @property
+        def value(self):
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        retrieve_value(Exploding(), *q.value)
+
+
+def test_lookup_value_found(lookup_value, data):
+    assert lookup_value(data, q["users"][-1]["name"]) == "Amy"
+
+
+@pytest.mark.parametrize("query_", [
+    q["groups"],
+    q["users"][2],
+    q["users"][-3],
+    q["users"]["0"],
+    q["users"][0].name,
+    q["users"][0]["name"]["first"],
+    q["users"][0]["tags"][[]],
+    q["users"][1]["node"].grandparent,
+    q["users"][1]["node"][0],
+])
+def test_lookup_value_missing(lookup_value, data, query_):
+    assert lookup_value(data, query_) is query.MISSING
+
+
+def test_lookup_value_uses_defaultdict_getitem(lookup_value):
+    data = collections.defaultdict(list)
+
+    result = lookup_value(data, q["absent"])
+
+    assert result == []
+    assert list(data) == ["absent"]
+
+
+def test_lookup_value_invalid_lookup_type(lookup_value):
+    with pytest.raises(ValueError):
+        lookup_value({}, [query.Lookup(lookup_type=3.14, key="irrelevant")])
+
+
+@pytest.mark.parametrize("func, criterion, expected", [
+    (operator.lt, 30, False),
+    (operator.le, 31, True),
+    (operator.eq, 31, True),
+    (operator.ne, 31, False),
+    (operator.gt, 30, True),
+    (operator.ge, 32, False),
+    (operator.is_, 31, True),
+    (operator.is_not, None, True),
+])
+def test_predicate_operators(predicate, data, func, criterion, expected):
+    pred = predicate(func, tuple(q["users"][0]["age"]), (criterion,))
+
+    assert pred(data) is expected
+
+
+def test_predicate_contains(predicate, data):
+    pred = predicate(operator.contains,
+                     tuple(q["users"][0]["tags"]), ("ops",))
+
+    assert pred(data) is True
+
+
+def test_predicate_custom_func(predicate, data):
+    def between(value, low, high):
+        return low <= value <= high
+
+    pred = predicate(between, tuple(q["users"][1]["age"]), (20, 30))
+
+    assert pred(data) is True
+
+
+def test_predicate_missing_value(predicate, data):
+    pred = predicate(operator.eq, tuple(q["users"][1]["tags"]), (["ops"],))
+
+    assert pred(data) is False
+
+
+def test_predicate_invalid_lookups(predicate, data):
+    pred = predicate(operator.is_, ("users",), (None,))
+
+    assert pred(data) is False
+
+
+def test_predicate_invalid_lookup_type(predicate, data):
+    pred = predicate(operator.eq,
+                     (query.Lookup(lookup_type=3.14, key="irrelevant"),),
+                     (None,))
+
+    with pytest.raises(ValueError):
+        pred(data)
+
+
+def test_predicate_attributes(predicate):
+    lookups = tuple(q["users"][0])
+
+    pred = predicate(operator.eq, lookups, (1,))
+
+    assert pred.func is operator.eq
+    assert pred.lookups == lookups
+    assert pred.criteria == (1,)
+
+
+@pytest.mark.parametrize("missing, expected", [
+    (None, False),
+    ("false", False),
+    ("true", True),
+    ("skip", query.UNKNOWN),
+])
+def test_predicate_missing_policy(predicate, missing, expected):
+    pred = predicate(operator.eq, tuple(q["a"]["b"]), (1,), missing)
+
+    assert pred.missing == missing
+    assert pred({"a": {"b": 1}}) is True
+    assert pred({"a": {"b": 2}}) is False
+    assert pred({"a": {}}) is expected
+    assert pred({}) is expected
+
+
+def test_predicate_missing_policy_raise(predicate):
+    pred = predicate(operator.eq, tuple(q["a"]["b"]), (1,), "raise")
+
+    assert pred({"a": {"b": 1}}) is True
+    with pytest.raises(query.ObjNotFound) as info:
+        pred({"a": {}})
+    assert info.value.args == (tuple(q["a"]["b"]),)
+
+
+def test_predicate_invalid_missing_policy(predicate):
+    with pytest.raises(ValueError):
+        predicate(operator.eq, tuple(q["a"]), (1,), "maybe")
+
+
+def constant(value):
+    return lambda obj: value
+
+
+@pytest.mark.parametrize("mode, results, expected", [
+    (query._COMBINE_EVERY, (True, 1), True),
+    (query._COMBINE_EVERY, (True, query.UNKNOWN), False),
+    (query._COMBINE_EVERY, (), True),
+    (query._COMBINE_SOME, (0, "a"), True),
+    (query._COMBINE_SOME, (query.UNKNOWN, False), False),
+    (query._COMBINE_SOME, (), False),
+    (query._COMBINE_NONE, (False, 0), True),
+    (query._COMBINE_NONE, (False, query.UNKNOWN), False),
+    (query._COMBINE_Q_ALL, (True, query.UNKNOWN), query.UNKNOWN),
+    (query._COMBINE_Q_ALL, (query.UNKNOWN, False), False),
+    (query._COMBINE_Q_ALL, (1, "a"), True),
+    (query._COMBINE_Q_ANY, (query.UNKNOWN, False), query.UNKNOWN),
+    (query._COMBINE_Q_ANY, (query.UNKNOWN, 1), True),
+    (query._COMBINE_Q_ANY, (0, ""), False),
+    (query._COMBINE_Q_NOT, (query.UNKNOWN,), query.UNKNOWN),
+    (query._COMBINE_Q_NOT, ("",), True),
+])
+def test_combined(combined, mode, results, expected):
+    pred = combined(mode, tuple(map(constant, results)))
+
+    assert pred({}) is expected
+
+
+def test_combined_short_circuits(combined):
+    def fail(obj):
+        raise AssertionError("evaluated")
+
+    assert combined(query._COMBINE_EVERY, (constant(False), fail))({}) is False
+    assert combined(query._COMBINE_SOME, (constant(True), fail))({}) is True
+
+
+def test_combined_propagates_errors(combined):
+    pred = combined(query._COMBINE_EVERY, (lambda obj: obj["a"],))
+
+    with pytest.raises(KeyError):
+        pred({})
+
+
+def test_combined_attributes(combined):
+    pred = combined(query._COMBINE_Q_ALL, ())
+    pred.combinator = "q_all"
+
+    assert pred.combinator == "q_all"
+
+
+@pytest.mark.parametrize("mode, preds", [
+    (query._COMBINE_Q_NOT, ()),
+    (99, ()),
+])
+def test_combined_invalid(combined, mode, preds):
+    with pytest.raises(ValueError):
+        combined(mode, preds)
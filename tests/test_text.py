@@ -0,0 +1,147 @@
+import random
+
+import pytest
+
+from query_filter import (q, q_filter, q_filter_all, q_fuzzy, q_icontains,
+                          q_missing, q_startswith)
+from query_filter.query import describe
+from query_filter.text import _AUTOMATON_TERMS
+
+
+@pytest.fixture
+def people():
+    return [
+        {"name": "Jon Smith", "city": "London"},
+        {"name": "John Smyth", "city": "Leeds"},
+        {"name": "Joan Smithers", "city": "Lisbon"},
+        {"name": "Ann Jones", "city": "Paris"},
+        {"name": None, "city": "Leeds"},
+        {"city": "Oslo"},
+    ]
+
+
+def levenshtein(a, b):
+    row = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        previous, row = row, [i]
+        for j, other in enumerate(b, 1):
+            row.append(min(row[j - 1] + 1, previous[j] + 1,
+                           previous[j - 1] + (char != other)))
+    return row[-1]
+
+
+@pytest.fixture(params=[3, _AUTOMATON_TERMS * 2])
+def term_count(request):
+    return request.param
+
+
+def test_startswith(people):
+    assert [p["city"] for p in q_filter(people, q_startswith(q["name"], "Jo"))
+            ] == ["London", "Leeds", "Lisbon"]
+    result = q_filter(people, q_startswith(q["city"], ["Le", "Osl", "Par"]))
+    assert [p["city"] for p in result] == ["Leeds", "Paris", "Leeds", "Oslo"]
+
+
+def test_startswith_byte_strings():
+    pred = q_startswith(q["data"], [b"\x89PNG", b"GIF8"])
+
+    assert pred({"data": b"GIF89a"})
+    assert not pred({"data": b"\xff\xd8\xff"})
+    assert not pred({"data": "GIF89a"})
+
+
+def test_icontains_ignores_case(people):
+    pred = q_icontains(q["name"], ["SMITH", "jones"])
+
+    assert [p["city"] for p in q_filter(people, pred)] == [
+        "London", "Lisbon", "Paris"
+    ]
+    assert q_icontains(q["word"], "STRASSE")({"word": "Straße"})
+
+
+def test_icontains_matches_any_term(term_count):
+    rng = random.Random(term_count)
+    terms = ["".join(rng.choices("abc", k=rng.randint(1, 4)))
+             for _ in range(term_count)]
+    values = ["".join(rng.choices("abcABC", k=rng.randint(0, 12)))
+              for _ in range(500)]
+    pred = q_icontains(q["value"], terms)
+
+    for value in values:
+        expected = any(term in value.lower() for term in terms)
+        assert pred({"value": value}) is expected, value
+
+
+def test_icontains_overlapping_terms():
+    pred = q_icontains(q["value"], ["abcd", "bce", "cex"] * _AUTOMATON_TERMS)
+
+    assert pred({"value": "xxABCEX"})
+    assert not pred({"value": "abcbcd"})
+    assert q_icontains(q["value"], ["", "a"])({"value": ""})
+
+
+def test_fuzzy(people):
+    terms = ["Jon Smith", "Ann Jonas"]
+
+    assert [p["city"] for p in q_filter(people, q_fuzzy(q["name"], terms))
+            ] == ["London", "Paris"]
+    assert [p["city"] for p in q_filter(
+        people, q_fuzzy(q["name"], terms, max_dist=2)
+    )] == ["London", "Leeds", "Paris"]
+    assert [p["city"] for p in q_filter(
+        people, q_fuzzy(q["name"], "Jon Smith", max_dist=0)
+    )] == ["London"]
+
+
+def test_fuzzy_matches_levenshtein_distance(term_count):
+    rng = random.Random(term_count)
+    terms = ["".join(rng.choices("abc", k=rng.randint(0, 5)))
+             for _ in range(term_count)]
+    values = ["".join(rng.choices("abc", k=rng.randint(0, 7)))
+              for _ in range(300)]
+
+    for max_dist in range(3):
+        pred = q_fuzzy(q["value"], terms, max_dist=max_dist)
+        for value in values:
+            expected = any(levenshtein(value, term) <= max_dist
+                           for term in terms)
+            assert pred({"value": value}) is expected, (value, max_dist)
+
+
+def test_non_strings_never_match():
+    for pred in (q_startswith(q["value"], "1"), q_icontains(q["value"], "1"),
+                 q_fuzzy(q["value"], "1")):
+        assert not pred({"value": 1})
+        assert not pred({"value": ["1"]})
+        assert not pred({"value": None})
+
+
+def test_missing_values(people):
+    pred = q_missing(q_icontains(q["name"], "smith"), "true")
+
+    assert [p["city"] for p in q_filter_all(people, pred)] == [
+        "London", "Lisbon", "Oslo"
+    ]
+
+
+def test_invalid_terms():
+    with pytest.raises(ValueError):
+        q_icontains(q["name"], [])
+    with pytest.raises(TypeError):
+        q_icontains(q["name"], [b"smith"])
+    with pytest.raises(TypeError):
+        q_fuzzy(q["name"], [1])
+    with pytest.raises(ValueError):
+        q_fuzzy(q["name"], "smith", max_dist=-1)
+
+
+def test_describe():
+    assert describe(q_startswith(q.name, ["Jo", "An"])) == (
+        "q_startswith(q.name, ('Jo', 'An'))"
+    )
+    assert describe(q_icontains(q["name"], "smith")) == (
+        "q_icontains(q['name'], 'smith')"
+    )
+    assert describe(q_fuzzy(q.name, "Jon", max_dist=2)) == (
+        "q_fuzzy(q.name, 'Jon', 2)"
+    )